@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# bench_access.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Benchmarks the main access paths over synthetic platedb/mangadb data.
+
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import itertools
+import random
+
+from common import (add_database_arguments, get_database_from_arguments, load_results,
+                    measure, print_result, record_queries, save_results)
+from generate import generate
+from peewee import JOIN, fn
+
+from sdssdb.database.explain import PlanStore, explain
+from sdssdb.database.unit_of_work import UnitOfWork
+from sdssdb.observatory import mangadb, platedb
+
+
+def plate_summaries_orm(plate_pks):
+    """Plate summaries following the backrefs, one query per relation."""
+
+    summaries = {}
+    for plate in platedb.Plate.select().where(platedb.Plate.pk << plate_pks):
+        n_exposures = 0
+        exposure_time = 0.
+        for plugging in plate.pluggings:
+            for observation in plugging.observations:
+                for exposure in observation.exposures:
+                    n_exposures += 1
+                    exposure_time += exposure.exposure_time or 0.
+        summaries[plate.plate_id] = (n_exposures, exposure_time)
+
+    return summaries
+
+
+def plate_summaries(plate_pks):
+    """Plate summaries with a single aggregated query."""
+
+    Plate = platedb.Plate
+    Exposure = platedb.Exposure
+
+    query = (Plate
+             .select(Plate.plate_id, fn.COUNT(Exposure.pk), fn.SUM(Exposure.exposure_time))
+             .join(platedb.Plugging)
+             .join(platedb.Observation)
+             .join(Exposure, JOIN.LEFT_OUTER)
+             .where(Plate.pk << plate_pks)
+             .group_by(Plate.plate_id)
+             .tuples())
+
+    return {plate_id: (count, total or 0.) for plate_id, count, total in query}
+
+
+def sn2_accumulation(plate_pks):
+    """Accumulated SN2 per plate and camera, from platedb and mangadb."""
+
+    Plugging = platedb.Plugging
+    CameraFrame = platedb.CameraFrame
+    Sn2Values = mangadb.Sn2Values
+
+    boss = (CameraFrame
+            .select(Plugging.plate, CameraFrame.camera, fn.SUM(CameraFrame.sn2))
+            .join(platedb.Exposure)
+            .join(platedb.Observation)
+            .join(Plugging)
+            .where(Plugging.plate << plate_pks)
+            .group_by(Plugging.plate, CameraFrame.camera)
+            .tuples())
+
+    manga = (Sn2Values
+             .select(Plugging.plate, fn.SUM(Sn2Values.b1_sn2), fn.SUM(Sn2Values.b2_sn2),
+                     fn.SUM(Sn2Values.r1_sn2), fn.SUM(Sn2Values.r2_sn2))
+             .join(mangadb.Exposure)
+             .join(platedb.Exposure)
+             .join(platedb.Observation)
+             .join(Plugging)
+             .where(Plugging.plate << plate_pks)
+             .group_by(Plugging.plate)
+             .tuples())
+
+    return list(boss), list(manga)
+
+
+def header_pivot(exposure_pks):
+    """Pivots the header values of the exposures into keyword columns."""
+
+    Value = platedb.ExposureHeaderValue
+    Keyword = platedb.ExposureHeaderKeyword
+
+    query = (Value
+             .select(Value.exposure, Keyword.label, Value.value)
+             .join(Keyword)
+             .where(Value.exposure << exposure_pks)
+             .tuples())
+
+    headers = {}
+    for exposure_pk, keyword, value in query:
+        headers.setdefault(exposure_pk, {})[keyword] = value
+
+    return headers
+
+
+def make_bulk_ingest(db, n_exposures):
+    """Returns a function that ingests new exposures with a `.UnitOfWork`."""
+
+    observation = platedb.Observation.select().first()
+    exposure_status = platedb.ExposureStatus.select().first()
+    cameras = list(platedb.Camera.select())
+    keywords = list(platedb.ExposureHeaderKeyword.select())
+    exposure_no = itertools.count(900000)
+
+    def bulk_ingest():
+        with UnitOfWork(db, max_size=None) as uow:
+            for __ in range(n_exposures):
+                exposure = uow.add(platedb.Exposure(observation=observation,
+                                                    exposure_status=exposure_status,
+                                                    exposure_no=next(exposure_no),
+                                                    exposure_time=900.))
+                for camera in cameras:
+                    uow.add(platedb.CameraFrame(exposure=exposure, camera=camera, sn2=1.))
+                for index, keyword in enumerate(keywords):
+                    uow.add(platedb.ExposureHeaderValue(exposure=exposure,
+                                                        exposure_header_keyword=keyword,
+                                                        index=index, value='0'))
+
+    return bulk_ingest
+
+
+def capture_plans(db, name, func, store, max_queries=5):
+    """Stores the plans of the first ``SELECT`` queries run by ``func``.
+
+    Returns a dictionary of query name to the changes from the baseline.
+
+    """
+
+    with record_queries(db) as statements:
+        func()
+
+    selects = [(sql, params) for sql, params in statements
+               if sql.lstrip().upper().startswith('SELECT')][:max_queries]
+
+    changes = {}
+    for ii, (sql, params) in enumerate(selects):
+        query_name = '{0}.{1}'.format(name, ii)
+        changes[query_name] = store.add(query_name, explain(db, sql, params), sql=sql,
+                                        save=False)
+
+    store.save()
+
+    return changes
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmarks the main access paths.')
+    parser.add_argument('--scale', type=float, default=1.)
+    parser.add_argument('--sample', type=int, default=50,
+                        help='Number of plates used in each access path.')
+    parser.add_argument('--ingest', type=int, default=100,
+                        help='Number of exposures ingested per run.')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=None, help='Saves the results as JSON.')
+    parser.add_argument('--compare', default=None,
+                        help='Compares with the results saved in a previous run.')
+    parser.add_argument('--label', default=None,
+                        help='A label for the run, e.g., the version being tested.')
+    parser.add_argument('--plans', default=None,
+                        help='A JSON file in which to store the query plans and '
+                             'against which to check for plan regressions. '
+                             'Requires PostgreSQL.')
+    add_database_arguments(parser)
+    args = parser.parse_args()
+
+    db = get_database_from_arguments(args)
+
+    counts = generate(db, scale=args.scale, force=args.force)
+    print(', '.join('{0}={1}'.format(name, count) for name, count in sorted(counts.items())))
+
+    rng = random.Random(0)
+    plate_pks = [pk for (pk, ) in platedb.Plate.select(platedb.Plate.pk).tuples()]
+    plate_pks = rng.sample(plate_pks, min(args.sample, len(plate_pks)))
+
+    exposure_pks = [pk for (pk, ) in (platedb.Exposure
+                                      .select(platedb.Exposure.pk)
+                                      .join(platedb.Observation)
+                                      .join(platedb.Plugging)
+                                      .where(platedb.Plugging.plate << plate_pks)
+                                      .tuples())]
+
+    benchmarks = (('plate_summaries_orm', lambda: plate_summaries_orm(plate_pks)),
+                  ('plate_summaries', lambda: plate_summaries(plate_pks)),
+                  ('sn2_accumulation', lambda: sn2_accumulation(plate_pks)),
+                  ('header_pivot', lambda: header_pivot(exposure_pks)),
+                  ('bulk_ingest', make_bulk_ingest(db, args.ingest)))
+
+    previous = load_results(args.compare) if args.compare else {}
+
+    results = {}
+    for name, func in benchmarks:
+        results[name] = measure(db, func, repeat=args.repeat)
+        print_result(name, results[name], previous.get(name, None))
+
+    if args.plans and args.database is not None:
+        store = PlanStore(args.plans)
+        for name, func in benchmarks:
+            if name == 'bulk_ingest':
+                continue
+            for query_name, changes in sorted(capture_plans(db, name, func, store).items()):
+                for change in changes:
+                    print('{0:>25}: {1}plan changed for {2}: {3} -> {4}'.format(
+                        query_name, 'REGRESSION, ' if change.regression else '',
+                        change.relation or 'the query', change.old, change.new))
+
+    if args.output:
+        save_results(args.output, results, label=args.label, scale=args.scale,
+                     sample=args.sample, counts=counts,
+                     database='sqlite' if args.database is None else 'postgresql')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# bench_history.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Benchmarks "status as of time" queries over a synthetic
+# PlateCompletionStatusHistory table.
+
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import datetime
+import random
+
+from common import (add_database_arguments, count_queries, create_tables,
+                    get_database_from_arguments, timeit)
+
+from sdssdb.observatory import platedb
+from sdssdb.observatory.history import get_history_index_sql
+
+
+MODELS = [platedb.PlateLocation, platedb.PlateCompletionStatus,
+          platedb.Plate, platedb.PlateCompletionStatusHistory]
+
+
+def generate_history(db, n_plates, n_changes, seed=42):
+    """Fills the history table with ``n_changes`` rows per plate."""
+
+    rng = random.Random(seed)
+    start = datetime.datetime(2014, 7, 1)
+
+    location = platedb.PlateLocation.create(label='APO')
+    statuses = [platedb.PlateCompletionStatus.create(label=label).pk
+                for label in ('Incomplete', 'Complete', 'Force Complete', 'Force Incomplete')]
+
+    with db.atomic():
+        platedb.Plate.insert_many(
+            [{'plate_id': plate_id, 'plate_location': location.pk}
+             for plate_id in range(1, n_plates + 1)]).execute()
+
+    plate_pks = [plate.pk for plate in platedb.Plate.select(platedb.Plate.pk)]
+
+    rows = [{'plate': plate_pk,
+             'plate_completion_status': rng.choice(statuses),
+             'timestamp': start + datetime.timedelta(seconds=rng.randint(0, 5 * 365 * 86400)),
+             'comment': ''}
+            for plate_pk in plate_pks for __ in range(n_changes)]
+
+    with db.atomic():
+        for ii in range(0, len(rows), 500):
+            platedb.PlateCompletionStatusHistory.insert_many(rows[ii:ii + 500]).execute()
+
+    return plate_pks
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmarks status as-of queries.')
+    parser.add_argument('--plates', type=int, default=5000)
+    parser.add_argument('--changes', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    add_database_arguments(parser)
+    args = parser.parse_args()
+
+    db = get_database_from_arguments(args)
+    create_tables(db, MODELS, force=args.force)
+
+    plate_pks = generate_history(db, args.plates, args.changes)
+    timestamp = datetime.datetime(2017, 1, 1)
+
+    History = platedb.PlateCompletionStatusHistory
+
+    def per_plate():
+        for plate_pk in plate_pks:
+            (History.select(History.plate_completion_status)
+             .where(History.plate == plate_pk, History.timestamp <= timestamp)
+             .order_by(History.timestamp.desc())
+             .first())
+
+    def as_of():
+        History.status_as_of(timestamp, plates=plate_pks)
+
+    print('{0} plates, {1} history rows'.format(len(plate_pks), History.select().count()))
+
+    for name, func in (('per-plate queries', per_plate), ('as_of', as_of)):
+        with count_queries(db) as n_queries:
+            func()
+        elapsed = timeit(func, repeat=args.repeat)
+        print('{0:>20}: {1:8.3f} s, {2} queries'.format(name, elapsed, n_queries[0]))
+
+    if args.database is not None:
+        sql = get_history_index_sql(History, History.plate)
+        print('index advice: {0}'.format(sql or 'a suitable index exists.'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# bench_templates.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Measures the per-call overhead saved by precompiled query templates.
+
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+
+from common import add_database_arguments, create_tables, get_database_from_arguments, timeit
+
+from sdssdb.database.templates import Param, QueryTemplate
+from sdssdb.observatory import mangadb, platedb
+
+
+MODELS = [platedb.Design, platedb.DesignField, platedb.DesignValue, platedb.PlateLocation,
+          platedb.Plate, mangadb.Plate]
+
+FIELDS = ('racen', 'deccen', 'platedesignversion', 'plateType', 'nInputs')
+
+
+def populate(db, n_designs=100, force=False):
+    """Creates designs with values for `FIELDS`, and a MaNGA plate for each."""
+
+    create_tables(db, MODELS, force=force)
+
+    with db.atomic():
+        location = platedb.PlateLocation.create(label='APO')
+        fields = [platedb.DesignField.create(label=label.lower()) for label in FIELDS]
+        for ii in range(n_designs):
+            design = platedb.Design.create()
+            platedb.DesignValue.insert_many([{'design': design, 'field': field,
+                                              'value': str(ii)} for field in fields]).execute()
+            plate = platedb.Plate.create(plate_id=8000 + ii, plate_location=location,
+                                         design=design)
+            mangadb.Plate.create(platedb_plate=plate, neverobserve=False)
+
+    return list(platedb.Design.select()), list(platedb.Plate.select())
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmarks precompiled query templates.')
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--prepare', action='store_true',
+                        help='Uses server-side prepared statements. Requires PostgreSQL.')
+    add_database_arguments(parser)
+    args = parser.parse_args()
+
+    db = get_database_from_arguments(args)
+    designs, plates = populate(db, force=args.force)
+
+    DesignField = platedb.DesignField
+    MangaPlate = mangadb.Plate
+
+    field_template = QueryTemplate(
+        lambda: DesignField.select().where(DesignField.label == Param('label')).limit(1),
+        prepare=args.prepare)
+    manga_template = QueryTemplate(
+        lambda: MangaPlate.select().where(MangaPlate.platedb_plate == Param('plate')).limit(1),
+        prepare=args.prepare)
+
+    labels = [FIELDS[ii % len(FIELDS)].lower() for ii in range(args.calls)]
+    plate_pks = [plates[ii % len(plates)].pk for ii in range(args.calls)]
+
+    def build_sql():
+        for label in labels:
+            db.get_sql_context().sql(DesignField.select()
+                                     .where(DesignField.label == label).limit(1)).query()
+
+    benchmarks = (
+        ('build_sql', build_sql),
+        ('field_query', lambda: [DesignField.select().where(DesignField.label == label).first()
+                                 for label in labels]),
+        ('field_template', lambda: [field_template.first(label=label) for label in labels]),
+        ('manga_plate_query', lambda: [MangaPlate.get_or_none(MangaPlate.platedb_plate == pk)
+                                       for pk in plate_pks]),
+        ('manga_plate_template', lambda: [manga_template.first(plate=pk) for pk in plate_pks]),
+        ('get_value_for_field', lambda: [designs[ii % len(designs)].get_value_for_field(label)
+                                         for ii, label in enumerate(labels)]))
+
+    for name, func in benchmarks:
+        elapsed = timeit(func, repeat=args.repeat)
+        print('{0:>25}: {1:8.2f} us/call'.format(name, elapsed / args.calls * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# bench_workers.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Runs the observatory models in thread and process pools, checking that
+# each worker uses its own connection.
+
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from bench_access import header_pivot
+from common import SCHEMAS, add_database_arguments
+from generate import MODELS, generate
+
+from sdssdb.database.database import SDSSDatabase, SnapshotDatabase
+from sdssdb.observatory import platedb
+
+
+def open_database(database=None, path=None, **params):
+    """Returns an `.SDSSDatabase` or, if ``database=None``, a file-based SQLite one.
+
+    An in-memory SQLite database cannot be shared with other processes,
+    so the SQLite data is kept in a `.SnapshotDatabase` in ``path``.
+
+    """
+
+    if database is None:
+        return SnapshotDatabase(path)
+
+    db = SDSSDatabase()
+    db.connect_from_parameters(database=database, **params)
+
+    return db
+
+
+def init_worker(params):
+    """Pool initializer. Opens the database in the worker and binds the models."""
+
+    open_database(**params).bind(MODELS)
+
+
+def get_connection_id():
+    """Returns the process and an identifier of the connection of the caller."""
+
+    db = platedb.Exposure._meta.database
+
+    if isinstance(db, SnapshotDatabase):
+        return (os.getpid(), id(db.connection()))
+
+    return (os.getpid(), db.execute_sql('SELECT pg_backend_pid()').fetchone()[0])
+
+
+def task(exposure_pks):
+    """A unit of work: pivots the headers of some exposures."""
+
+    return get_connection_id(), len(header_pivot(exposure_pks))
+
+
+def run(executor, chunks):
+
+    t0 = time.time()
+    results = list(executor.map(task, chunks))
+    elapsed = time.time() - t0
+
+    connections = set(connection for connection, __ in results)
+    n_rows = sum(n_rows for __, n_rows in results)
+
+    return elapsed, len(connections), n_rows
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Runs the models in thread and '
+                                                 'process pools.')
+    parser.add_argument('--scale', type=float, default=1.)
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--chunk', type=int, default=50,
+                        help='Number of exposures per task.')
+    parser.add_argument('--start-method', default='fork',
+                        choices=multiprocessing.get_all_start_methods())
+    add_database_arguments(parser)
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp() if args.database is None else None
+
+    params = {'database': args.database, 'path': path}
+    if args.database is not None:
+        params.update(host=args.host, port=args.port)
+        if args.user:
+            params['user'] = args.user
+
+    try:
+
+        db = open_database(**params)
+        if args.database is not None:
+            for schema in SCHEMAS:
+                db.execute_sql('CREATE SCHEMA IF NOT EXISTS {0}'.format(schema))
+
+        generate(db, scale=args.scale, force=args.force)
+
+        exposure_pks = [pk for (pk, ) in platedb.Exposure.select(platedb.Exposure.pk).tuples()]
+        chunks = [exposure_pks[ii:ii + args.chunk]
+                  for ii in range(0, len(exposure_pks), args.chunk)]
+
+        # Connections are closed before forking so that the workers start
+        # clean, but an SDSSDatabase left open is also reset in the child.
+        if isinstance(db, SnapshotDatabase):
+            db.close()
+
+        # Workers forked from this process inherit the bound models. An
+        # SDSSDatabase resets its connection state after the fork, so only
+        # a SQLite database or other start methods need the initializer.
+        if args.start_method != 'fork' or args.database is None:
+            initializer, initargs = init_worker, (params, )
+        else:
+            initializer, initargs = None, ()
+
+        context = multiprocessing.get_context(args.start_method)
+
+        modes = (('serial', lambda: ThreadPoolExecutor(1)),
+                 ('threads', lambda: ThreadPoolExecutor(args.workers)),
+                 ('processes', lambda: ProcessPoolExecutor(args.workers, mp_context=context,
+                                                           initializer=initializer,
+                                                           initargs=initargs)))
+
+        print('{0} tasks, {1} workers, start method {2}'.format(len(chunks), args.workers,
+                                                                args.start_method))
+
+        for name, get_executor in modes:
+            with get_executor() as executor:
+                elapsed, n_connections, n_rows = run(executor, chunks)
+            print('{0:>25}: {1:8.3f} s, {2:3d} connections, {3} exposures'.format(
+                name, elapsed, n_connections, n_rows))
+
+        # multiprocessing.Pool follows the same pattern.
+        with context.Pool(args.workers, initializer=initializer, initargs=initargs) as pool:
+            elapsed, n_connections, n_rows = run(pool, chunks)
+        print('{0:>25}: {1:8.3f} s, {2:3d} connections, {3} exposures'.format(
+            'multiprocessing.Pool', elapsed, n_connections, n_rows))
+
+    finally:
+        if path is not None:
+            shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# common.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Shared helpers for the sdssdb benchmarks.
+
+
+from __future__ import absolute_import, division, print_function
+
+import contextlib
+import datetime
+import json
+import re
+import time
+
+from peewee import PostgresqlDatabase, SqliteDatabase
+
+
+SCHEMAS = ('platedb', 'mangadb')
+
+
+def get_database(database=None, **params):
+    """Returns a database in which to run the benchmarks.
+
+    If ``database`` is `None`, an in-memory SQLite database is returned,
+    with in-memory databases attached as the ``platedb`` and ``mangadb``
+    schemas. Otherwise, connects to that PostgreSQL database. Never point
+    the benchmarks to a production database: they create and drop tables.
+
+    """
+
+    if database is None:
+        db = SqliteDatabase(':memory:')
+        db.connect()
+        for schema in SCHEMAS:
+            db.execute_sql("ATTACH DATABASE ':memory:' AS {0}".format(schema))
+    else:
+        db = PostgresqlDatabase(database, **params)
+        db.connect()
+        for schema in SCHEMAS:
+            db.execute_sql('CREATE SCHEMA IF NOT EXISTS {0}'.format(schema))
+
+    return db
+
+
+def create_tables(db, models, force=False):
+    """Binds ``models`` to ``db`` and (re)creates their tables.
+
+    Raises `RuntimeError` if any of the tables already exists and has
+    rows, unless ``force=True``, so that the benchmarks are not run by
+    mistake against a database with real data.
+
+    """
+
+    db.bind(models)
+
+    if not force:
+        non_empty = ['{0}.{1}'.format(model._meta.schema, model._meta.table_name)
+                     for model in models
+                     if model.table_exists() and model.select().exists()]
+        if len(non_empty) > 0:
+            raise RuntimeError('refusing to drop the tables {0}, which are not empty. '
+                               'Use --force to drop them.'.format(', '.join(non_empty)))
+
+    db.drop_tables(models, safe=True)
+
+    if not isinstance(db, SqliteDatabase):
+        db.create_tables(models)
+        return
+
+    # SQLite does not accept schema-qualified foreign key references.
+    for model in models:
+        sql, params = db.get_sql_context().sql(model._schema._create_table(safe=True)).query()
+        db.execute_sql(re.sub(r'REFERENCES "\w+"\.', 'REFERENCES ', sql), params)
+
+
+@contextlib.contextmanager
+def count_queries(db):
+    """Counts the queries executed by ``db`` inside the context.
+
+    Yields a list whose only element is updated with the number of
+    queries when the context exits.
+
+    """
+
+    counter = [0]
+    execute_sql = db.execute_sql
+
+    def counting_execute_sql(*args, **kwargs):
+        counter[0] += 1
+        return execute_sql(*args, **kwargs)
+
+    db.execute_sql = counting_execute_sql
+
+    try:
+        yield counter
+    finally:
+        del db.execute_sql
+
+
+@contextlib.contextmanager
+def record_queries(db):
+    """Records the SQL and parameters of the queries executed inside the context."""
+
+    statements = []
+    execute_sql = db.execute_sql
+
+    def recording_execute_sql(sql, params=None, *args, **kwargs):
+        statements.append((sql, params))
+        return execute_sql(sql, params, *args, **kwargs)
+
+    db.execute_sql = recording_execute_sql
+
+    try:
+        yield statements
+    finally:
+        del db.execute_sql
+
+
+def reset_sequences(db, models):
+    """Sets the pk sequences after inserting rows with explicit pks."""
+
+    if isinstance(db, SqliteDatabase):
+        return
+
+    for model in models:
+        pk = model._meta.primary_key
+        if model._meta.composite_key or not pk.field_type == 'AUTO':
+            continue
+        table = '{0}.{1}'.format(model._meta.schema, model._meta.table_name)
+        db.execute_sql('SELECT setval(pg_get_serial_sequence(%s, %s), '
+                       'COALESCE((SELECT max({1}) FROM {0}), 0) + 1, false)'.format(
+                           table, pk.column_name), (table, pk.column_name))
+
+
+def timeit(func, repeat=3):
+    """Runs ``func`` ``repeat`` times and returns the best time, in seconds."""
+
+    times = []
+    for __ in range(repeat):
+        t0 = time.perf_counter() if hasattr(time, 'perf_counter') else time.time()
+        func()
+        t1 = time.perf_counter() if hasattr(time, 'perf_counter') else time.time()
+        times.append(t1 - t0)
+
+    return min(times)
+
+
+def measure(db, func, repeat=3):
+    """Measures the time, number of queries, and peak memory of ``func``.
+
+    The number of queries and the peak memory allocated by Python (from
+    `tracemalloc`, if available) are measured in a first run; the time is
+    the best of ``repeat`` further runs.
+
+    """
+
+    try:
+        import tracemalloc
+    except ImportError:
+        tracemalloc = None
+
+    if tracemalloc is not None:
+        tracemalloc.start()
+
+    try:
+        with count_queries(db) as n_queries:
+            func()
+        peak = tracemalloc.get_traced_memory()[1] if tracemalloc is not None else None
+    finally:
+        if tracemalloc is not None:
+            tracemalloc.stop()
+
+    return {'time': timeit(func, repeat=repeat),
+            'queries': n_queries[0],
+            'peak_memory': peak}
+
+
+def print_result(name, result, previous=None):
+    """Prints a result from `measure`, compared with a previous one."""
+
+    memory = result['peak_memory']
+    line = '{0:>25}: {1:8.4f} s, {2:6d} queries, {3:>10} peak memory'.format(
+        name, result['time'], result['queries'],
+        '{0:.1f} MB'.format(memory / 1024.**2) if memory is not None else '-')
+
+    if previous is not None and previous.get('time'):
+        line += ' ({0:+.0%} time, {1:+d} queries)'.format(
+            result['time'] / previous['time'] - 1, result['queries'] - previous['queries'])
+
+    print(line)
+
+
+def save_results(path, results, **meta):
+    """Saves the results of a benchmark run as JSON, with metadata."""
+
+    data = dict(meta, date=datetime.datetime.utcnow().isoformat(), results=results)
+
+    with open(path, 'w') as fd:
+        json.dump(data, fd, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    """Loads the results saved with `save_results`."""
+
+    with open(path) as fd:
+        return json.load(fd)['results']
+
+
+def add_database_arguments(parser):
+    """Adds the database connection options to an argument parser."""
+
+    parser.add_argument('--database', default=None,
+                        help='PostgreSQL database to use. If not set, uses '
+                             'an in-memory SQLite database.')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5432)
+    parser.add_argument('--user', default=None)
+    parser.add_argument('--force', action='store_true',
+                        help='Drops the benchmark tables even if they contain rows.')
+
+
+def get_database_from_arguments(args):
+    """Returns a database from the parsed command line arguments."""
+
+    params = {}
+    if args.database is not None:
+        params = {'host': args.host, 'port': args.port}
+        if args.user:
+            params['user'] = args.user
+
+    return get_database(args.database, **params)
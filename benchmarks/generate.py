@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# generate.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Generates synthetic, scalable platedb and mangadb data for the benchmarks.
+
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import itertools
+import random
+
+from common import (add_database_arguments, create_tables, get_database_from_arguments,
+                    reset_sequences)
+
+from sdssdb.observatory import mangadb, platedb
+
+
+#: The models filled by `generate`, in dependency order.
+MODELS = [platedb.PlateLocation, platedb.Survey, platedb.Instrument, platedb.Camera,
+          platedb.PluggingStatus, platedb.ObservationStatus, platedb.ExposureStatus,
+          platedb.ExposureFlavor, platedb.ExposureHeaderKeyword, platedb.ObjectType,
+          platedb.PlateHoleType, platedb.Cartridge, platedb.Plate, platedb.Plugging,
+          platedb.Observation, platedb.Exposure, platedb.CameraFrame,
+          platedb.ExposureHeaderValue, platedb.PlateHolesFile, platedb.PlateHole,
+          platedb.PlPlugmapM, platedb.Fiber, mangadb.ExposureStatus, mangadb.Exposure,
+          mangadb.Sn2Values]
+
+CAMERAS = ('b1', 'b2', 'r1', 'r2')
+
+KEYWORDS = ('AIRMASS', 'ALT', 'AZ', 'BOREOFF', 'CCDTEMP', 'DATE-OBS', 'DUSTA', 'EXPTIME',
+            'FLAVOR', 'FOCUS', 'GUIDER1', 'HARTMANN', 'MJD', 'OBJSYS', 'PRESSURE',
+            'RADECSYS', 'ROTPOS', 'SEEING', 'TAI-BEG', 'TEMP')
+
+#: Number of rows per parent at scale 1.
+DEFAULTS = {'plates': 100,
+            'pluggings_per_plate': 2,
+            'exposures_per_plugging': 4,
+            'header_values_per_exposure': len(KEYWORDS),
+            'holes_per_plate': 500,
+            'fibers_per_plugging': 300}
+
+
+class _Inserter(object):
+    """Assigns consecutive pks and bulk inserts rows in batches."""
+
+    def __init__(self, db, batch_size=1000):
+
+        self.db = db
+        self.batch_size = batch_size
+        self.counts = {}
+
+        self._next_pk = {}
+
+    def insert(self, model, rows):
+        """Inserts an iterable of row dictionaries. Returns the new pks."""
+
+        pks = []
+        batch = []
+
+        for row in rows:
+            pk = self._next_pk.get(model, 1)
+            self._next_pk[model] = pk + 1
+            row['pk'] = pk
+            pks.append(pk)
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                model.insert_many(batch).execute()
+                batch = []
+
+        if len(batch) > 0:
+            model.insert_many(batch).execute()
+
+        name = '{0}.{1}'.format(model._meta.schema, model._meta.table_name)
+        self.counts[name] = self.counts.get(name, 0) + len(pks)
+
+        return pks
+
+
+def generate(db, scale=1., seed=42, batch_size=1000, force=False, **kwargs):
+    """Fills ``db`` with synthetic data.
+
+    The number of plates is ``scale`` times ``DEFAULTS['plates']``; the
+    number of child rows per parent can be overridden with keyword
+    arguments with the same names as in `DEFAULTS`. Roughly half of the
+    plates are MaNGA plates, whose exposures have `mangadb.Exposure` and
+    `mangadb.Sn2Values` rows. The tables are (re)created first; if any of
+    them has rows, ``force=True`` is required (see `common.create_tables`).
+
+    Returns
+    -------
+    counts : dict
+        The number of rows inserted for each model.
+
+    """
+
+    params = dict(DEFAULTS, **kwargs)
+    n_plates = max(1, int(round(params['plates'] * scale)))
+
+    rng = random.Random(seed)
+
+    create_tables(db, MODELS, force=force)
+    inserter = _Inserter(db, batch_size=batch_size)
+    insert = inserter.insert
+
+    with db.atomic():
+
+        location, = insert(platedb.PlateLocation, [{'label': 'APO'}])
+        surveys = insert(platedb.Survey, [{'label': 'MaNGA', 'plateplan_name': 'manga'},
+                                          {'label': 'APOGEE-2', 'plateplan_name': 'apogee2'}])
+        instrument, = insert(platedb.Instrument, [{'label': 'BOSS'}])
+        cameras = insert(platedb.Camera, [{'label': label, 'instrument': instrument}
+                                          for label in CAMERAS])
+        plugging_status, = insert(platedb.PluggingStatus, [{'label': 'Good'}])
+        observation_status, = insert(platedb.ObservationStatus, [{'label': 'Good'}])
+        exposure_status, = insert(platedb.ExposureStatus, [{'label': 'Good'}])
+        flavor, = insert(platedb.ExposureFlavor, [{'label': 'Science'}])
+        keywords = insert(platedb.ExposureHeaderKeyword, [{'label': keyword}
+                                                          for keyword in KEYWORDS])
+        object_type, = insert(platedb.ObjectType, [{'label': 'SCIENCE'}])
+        hole_type, = insert(platedb.PlateHoleType, [{'label': 'BOSS'}])
+        cartridges = insert(platedb.Cartridge, [{'number': number, 'online': True}
+                                                for number in range(1, 18)])
+        manga_status, = insert(mangadb.ExposureStatus, [{'label': 'Good'}])
+
+        plates = insert(platedb.Plate, [{'plate_id': 7000 + ii, 'plate_location': location}
+                                        for ii in range(n_plates)])
+
+        holes_files = insert(platedb.PlateHolesFile,
+                             [{'filename': 'plateHoles-{0:06d}.par'.format(7000 + ii),
+                               'plate': plate_pk} for ii, plate_pk in enumerate(plates)])
+        holes = insert(platedb.PlateHole,
+                       ({'plate_holes_file': holes_file_pk,
+                         'catalog_object_pk': rng.randint(1, 10 * n_plates *
+                                                          params['holes_per_plate']),
+                         'object_type': object_type, 'plate_hole_type': hole_type,
+                         'xfocal': rng.uniform(-320, 320), 'yfocal': rng.uniform(-320, 320),
+                         'tmass_j': rng.gauss(12, 1), 'tmass_h': rng.gauss(11.5, 1),
+                         'tmass_k': rng.gauss(11, 1), 'apogee_target1': 0, 'apogee_target2': 0}
+                        for holes_file_pk in holes_files
+                        for __ in range(params['holes_per_plate'])))
+
+        pluggings = []
+        plugging_plate = {}
+        for plate_pk in plates:
+            new = insert(platedb.Plugging, [{'plate': plate_pk, 'status': plugging_status,
+                                             'cartridge': rng.choice(cartridges),
+                                             'fscan_mjd': 57000, 'fscan': ii + 1}
+                                            for ii in range(params['pluggings_per_plate'])])
+            pluggings += new
+            plugging_plate.update({plugging_pk: plate_pk for plugging_pk in new})
+
+        plugmaps = insert(platedb.PlPlugmapM, [{'plugging': plugging_pk,
+                                                'filename': 'plPlugMapM-{0}.par'.format(pk),
+                                                'checked_in': True}
+                                               for pk, plugging_pk in enumerate(pluggings)])
+
+        # Fibers are plugged in the first holes of the plate of the plugging.
+        holes_per_plate = params['holes_per_plate']
+        first_hole = {plate_pk: holes[ii * holes_per_plate] for ii, plate_pk in enumerate(plates)}
+        insert(platedb.Fiber,
+               ({'pl_plugmap_m': plugmap_pk, 'fiber': fiber_id,
+                 'plate_hole': first_hole[plugging_plate[plugging_pk]] +
+                 fiber_id % holes_per_plate}
+                for plugmap_pk, plugging_pk in zip(plugmaps, pluggings)
+                for fiber_id in range(1, params['fibers_per_plugging'] + 1)))
+
+        observations = insert(platedb.Observation,
+                              [{'plugging': plugging_pk, 'observation_status': observation_status,
+                                'mjd': 57000 + rng.randint(0, 2000)}
+                               for plugging_pk in pluggings])
+
+        exposure_no = itertools.count(100000)
+        exposure_plate = {}
+        exposures = []
+        for observation_pk, plugging_pk in zip(observations, pluggings):
+            plate_pk = plugging_plate[plugging_pk]
+            new = insert(platedb.Exposure,
+                         [{'observation': observation_pk, 'exposure_no': next(exposure_no),
+                           'survey': surveys[plate_pk % 2], 'exposure_status': exposure_status,
+                           'exposure_flavor': flavor, 'exposure_time': 900.,
+                           'start_time': 4.8e9 + rng.uniform(0, 1e8)}
+                          for __ in range(params['exposures_per_plugging'])])
+            exposures += new
+            exposure_plate.update({exposure_pk: plate_pk for exposure_pk in new})
+
+        insert(platedb.CameraFrame, ({'exposure': exposure_pk, 'camera': camera_pk,
+                                      'sn2': rng.uniform(0, 5)}
+                                     for exposure_pk in exposures for camera_pk in cameras))
+
+        n_values = params['header_values_per_exposure']
+        insert(platedb.ExposureHeaderValue,
+               ({'exposure': exposure_pk, 'index': index,
+                 'exposure_header_keyword': keywords[index % len(keywords)],
+                 'value': '{0:.4f}'.format(rng.uniform(0, 100))}
+                for exposure_pk in exposures for index in range(n_values)))
+
+        manga_exposures = insert(mangadb.Exposure,
+                                 [{'platedb_exposure': exposure_pk, 'status': manga_status,
+                                   'seeing': rng.uniform(0.8, 2.)}
+                                  for exposure_pk in exposures
+                                  if exposure_plate[exposure_pk] % 2 == 0])
+
+        insert(mangadb.Sn2Values, ({'exposure': manga_exposure_pk,
+                                    'b1_sn2': rng.uniform(0, 5), 'b2_sn2': rng.uniform(0, 5),
+                                    'r1_sn2': rng.uniform(0, 5), 'r2_sn2': rng.uniform(0, 5)}
+                                   for manga_exposure_pk in manga_exposures))
+
+    reset_sequences(db, MODELS)
+
+    return inserter.counts
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Generates synthetic platedb/mangadb data.')
+    parser.add_argument('--scale', type=float, default=1.)
+    parser.add_argument('--seed', type=int, default=42)
+    add_database_arguments(parser)
+    args = parser.parse_args()
+
+    db = get_database_from_arguments(args)
+
+    for name, count in generate(db, scale=args.scale, seed=args.seed,
+                                force=args.force).items():
+        print('{0:>25}: {1}'.format(name, count))
+
+
+if __name__ == '__main__':
+    main()
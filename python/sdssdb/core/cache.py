@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# cache.py
+#
+# Created by agent on 18 Oct 2026.
+
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import threading
+
+
+__all__ = ('LRUCache', )
+
+
+_missing = object()
+
+
+class LRUCache(object):
+    """A thread-safe, bounded, least-recently-used mapping.
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of items to keep. When the cache is full, the
+        least recently used item is evicted. If `None`, the cache is
+        unbounded.
+
+    """
+
+    def __init__(self, maxsize=128):
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._data = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Returns the value for ``key``, marking it as recently used."""
+
+        with self._lock:
+            value = self._data.pop(key, _missing)
+            if value is _missing:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Sets the value for ``key``, evicting old items if needed."""
+
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+    def get_or_set(self, key, factory):
+        """Returns the value for ``key``, calling ``factory()`` on a miss."""
+
+        value = self.get(key, _missing)
+        if value is _missing:
+            value = factory()
+            self.set(key, value)
+
+        return value
+
+    def pop(self, key, default=None):
+        """Removes ``key`` from the cache and returns its value."""
+
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        """Empties the cache and resets the counters."""
+
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def hit_ratio(self):
+        """The fraction of lookups that were hits."""
+
+        total = self.hits + self.misses
+
+        return self.hits / total if total > 0 else 0.
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# compat.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Python 2 and 3 compatibility helpers.
+
+
+from __future__ import absolute_import, division, print_function
+
+import datetime
+
+
+__all__ = ('string_types', 'FixedOffset')
+
+
+try:
+    string_types = (basestring, )
+except NameError:
+    string_types = (str, )
+
+
+class FixedOffset(datetime.tzinfo):
+    """A time zone with a fixed offset from UTC, in minutes.
+
+    Equivalent to `datetime.timezone`, which is not available in Python 2.
+
+    """
+
+    def __init__(self, minutes):
+
+        self.minutes = minutes
+        self._offset = datetime.timedelta(minutes=minutes)
+
+    def __getinitargs__(self):
+        return (self.minutes, )
+
+    def __repr__(self):
+        return '{0}({1})'.format(self.__class__.__name__, self.minutes)
+
+    def utcoffset(self, dt):
+        return self._offset
+
+    def dst(self, dt):
+        return datetime.timedelta(0)
+
+    def tzname(self, dt):
+
+        if self.minutes == 0:
+            return 'UTC'
+
+        sign = '-' if self.minutes < 0 else '+'
+        hours, minutes = divmod(abs(self.minutes), 60)
+
+        return 'UTC{0}{1:02d}:{2:02d}'.format(sign, hours, minutes)
@@ -39,9 +39,9 @@ def get_config():
     """Returns a dictionary object with sdss_peewee's configuration options."""
 
     user_path = pathlib.Path.home() / '.sdssdb'
-    user = user_path.exists() and yaml.load(open(str(user_path), 'r'))
+    user = user_path.exists() and yaml.safe_load(open(str(user_path), 'r'))
 
     default_path = pathlib.Path(__file__).parents[3] / 'etc/sdssdb.yaml'
-    default = yaml.load(open(str(default_path), 'r'))
+    default = yaml.safe_load(open(str(default_path), 'r'))
 
     return merge(user, default)
@@ -0,0 +1,411 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# metrics.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# A registry of counters, histograms, and gauges with a Prometheus renderer.
+
+
+from __future__ import absolute_import, division, print_function
+
+import abc
+import bisect
+import threading
+import weakref
+
+
+__all__ = ('Counter', 'Histogram', 'Gauge', 'MetricsRegistry', 'registry',
+           'start_http_server', 'DEFAULT_BUCKETS')
+
+
+#: The default histogram buckets, in seconds.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1., 2.5, 5., 10.)
+
+
+def _add_values(total, values):
+
+    for key, value in values.items():
+        total[key] = total.get(key, 0) + value
+
+
+class _Shards(object):
+    """Per-thread dictionaries of values that are summed when collected.
+
+    Each thread only updates its own dictionary, so updates need no lock.
+    When the values are collected, the dictionaries of the threads that
+    have finished are added to a base dictionary and dropped, so that
+    short-lived threads do not make collection slower over time.
+
+    """
+
+    def __init__(self):
+
+        self._local = threading.local()
+        self._shards = []
+        self._base = {}
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Returns the dictionary of the current thread."""
+
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append((weakref.ref(threading.current_thread()), values))
+            return values
+
+    def collect(self):
+        """Returns the sum of the values of all the threads."""
+
+        with self._lock:
+            live = []
+            for thread_ref, values in self._shards:
+                thread = thread_ref()
+                if thread is not None and thread.is_alive():
+                    live.append((thread_ref, values))
+                else:
+                    # The thread has finished, so its values no longer change.
+                    _add_values(self._base, values)
+            self._shards = live
+            total = dict(self._base)
+
+        for __, values in live:
+            # dict.copy() does not release the GIL, so it is safe against
+            # concurrent updates from the owning thread.
+            _add_values(total, values.copy())
+
+        return total
+
+    def reset(self):
+
+        with self._lock:
+            self._shards = []
+            self._base = {}
+        self._local = threading.local()
+
+
+# A base class with abc.ABCMeta as metaclass, in Python 2 and 3.
+_ABC = abc.ABCMeta(str('_ABC'), (object, ), {})
+
+
+class _Metric(_ABC):
+
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    @abc.abstractmethod
+    def samples(self):
+        """Returns a list of ``(suffix, labels, value)``, with a dictionary of labels."""
+
+        pass
+
+    def reset(self):
+        pass
+
+
+class Counter(_Metric):
+    """A monotonically increasing value, optionally with labels.
+
+    Label values are passed positionally, in the order of ``labelnames``::
+
+        queries = registry.counter('queries_total', 'Queries.', ('table', ))
+        queries.inc('platedb.plate')
+
+    """
+
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+
+        super(Counter, self).__init__(name, help, labelnames=labelnames)
+
+        self._shards = _Shards()
+
+    def inc(self, *labels, **kwargs):
+        """Increments the counter by ``amount`` (one by default)."""
+
+        values = self._shards.get()
+        values[labels] = values.get(labels, 0) + kwargs.get('amount', 1)
+
+    def get(self, *labels):
+        """Returns the current value for ``labels``."""
+
+        return self._shards.collect().get(labels, 0)
+
+    def samples(self):
+        suffix = '' if self.name.endswith('_total') else '_total'
+
+        return [(suffix, dict(zip(self.labelnames, labels)), value)
+                for labels, value in sorted(self._shards.collect().items())]
+
+    def reset(self):
+        self._shards.reset()
+
+
+class Histogram(_Metric):
+    """A distribution of observed values in cumulative buckets."""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+
+        super(Histogram, self).__init__(name, help, labelnames=labelnames)
+
+        self.buckets = tuple(sorted(buckets))
+        self._shards = _Shards()
+
+    def observe(self, value, *labels):
+        """Records a value."""
+
+        values = self._shards.get()
+
+        bucket = (labels, bisect.bisect_left(self.buckets, value))
+        values[bucket] = values.get(bucket, 0) + 1
+
+        count = (labels, 'count')
+        values[count] = values.get(count, 0) + 1
+
+        total = (labels, 'sum')
+        values[total] = values.get(total, 0) + value
+
+    def samples(self):
+
+        values = self._shards.collect()
+        all_labels = sorted(set(labels for labels, __ in values))
+
+        samples = []
+        for labels in all_labels:
+            label_dict = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for index, upper in enumerate(self.buckets + (float('inf'), )):
+                cumulative += values.get((labels, index), 0)
+                samples.append(('_bucket', dict(label_dict, le=_format_value(upper)),
+                                cumulative))
+            samples.append(('_sum', label_dict, values.get((labels, 'sum'), 0)))
+            samples.append(('_count', label_dict, values.get((labels, 'count'), 0)))
+
+        return samples
+
+    def reset(self):
+        self._shards.reset()
+
+
+class Gauge(_Metric):
+    """A value read from a callback when the metrics are collected.
+
+    The callback returns a number or, if the gauge has labels, a
+    dictionary of label value tuples to numbers.
+
+    """
+
+    type = 'gauge'
+
+    def __init__(self, name, help, callback, labelnames=()):
+
+        super(Gauge, self).__init__(name, help, labelnames=labelnames)
+
+        self.callback = callback
+
+    def samples(self):
+
+        value = self.callback()
+        if not isinstance(value, dict):
+            value = {(): value}
+
+        return [('', dict(zip(self.labelnames, labels)), value)
+                for labels, value in sorted(value.items()) if value is not None]
+
+
+def _format_value(value):
+
+    if value == float('inf'):
+        return '+Inf'
+    elif isinstance(value, bool):
+        return str(int(value))
+    elif isinstance(value, float) and value.is_integer():
+        return str(value)
+
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+class MetricsRegistry(object):
+    """A collection of metrics that can be read or rendered together.
+
+    Counters and histograms are updated without locks, in per-thread
+    shards that are summed when the metrics are collected, so they are
+    cheap enough to leave on in production. Gauges are evaluated on
+    collection. Use `collect` to read the metrics from Python, or
+    `render_prometheus` (or `start_http_server`) to expose them to
+    Prometheus.
+
+    """
+
+    def __init__(self):
+
+        self._metrics = {}
+        self._caches = {}
+        self._lock = threading.Lock()
+
+        self.gauge('sdssdb_cache_hits', 'Hits of the registered caches since last cleared.',
+                   lambda: self._get_cache_values('hits'), labelnames=('cache', ))
+        self.gauge('sdssdb_cache_misses', 'Misses of the registered caches since last cleared.',
+                   lambda: self._get_cache_values('misses'), labelnames=('cache', ))
+        self.gauge('sdssdb_cache_hit_ratio', 'Hit ratio of the registered caches.',
+                   lambda: self._get_cache_values('hit_ratio'), labelnames=('cache', ))
+        self.gauge('sdssdb_cache_size', 'Number of items in the registered caches.',
+                   lambda: self._get_cache_values(len), labelnames=('cache', ))
+
+    def _add(self, metric):
+
+        with self._lock:
+            if metric.name in self._metrics:
+                existing = self._metrics[metric.name]
+                if type(existing) is not type(metric):
+                    raise ValueError('metric {0!r} already registered with a different '
+                                     'type.'.format(metric.name))
+                return existing
+            self._metrics[metric.name] = metric
+
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        """Returns a new `Counter`, or the existing one with the same name."""
+
+        return self._add(Counter(name, help, labelnames=labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Returns a new `Histogram`, or the existing one with the same name."""
+
+        return self._add(Histogram(name, help, labelnames=labelnames, buckets=buckets))
+
+    def gauge(self, name, help, callback, labelnames=()):
+        """Adds a `Gauge` whose value is returned by ``callback``."""
+
+        return self._add(Gauge(name, help, callback, labelnames=labelnames))
+
+    def register_cache(self, name, cache):
+        """Reports the hits, misses, hit ratio, and size of a cache.
+
+        ``cache`` can be any object with ``hits``, ``misses``, and
+        ``hit_ratio`` attributes and a length, such as an `.LRUCache`.
+
+        """
+
+        with self._lock:
+            self._caches[name] = cache
+
+    def _get_cache_values(self, attribute):
+
+        with self._lock:
+            caches = list(self._caches.items())
+
+        values = {}
+        for name, cache in caches:
+            values[(name, )] = attribute(cache) if callable(attribute) \
+                else getattr(cache, attribute)
+
+        return values
+
+    def collect(self):
+        """Returns the current value of all the metrics.
+
+        Returns
+        -------
+        metrics : dict
+            A dictionary of metric name to a list of ``(sample_name,
+            labels, value)``, where ``labels`` is a dictionary.
+
+        """
+
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+
+        return {name: [(name + suffix, labels, value)
+                       for suffix, labels, value in metric.samples()]
+                for name, metric in metrics}
+
+    def render_prometheus(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+
+        with self._lock:
+            metrics = dict(self._metrics)
+
+        lines = []
+        for name, samples in sorted(self.collect().items()):
+            metric = metrics[name]
+            lines.append('# HELP {0} {1}'.format(name, metric.help))
+            lines.append('# TYPE {0} {1}'.format(name, metric.type))
+            for sample_name, labels, value in samples:
+                if len(labels) > 0:
+                    sample_name += '{' + ','.join(
+                        '{0}="{1}"'.format(key, _escape(value))
+                        for key, value in sorted(labels.items())) + '}'
+                lines.append('{0} {1}'.format(sample_name, _format_value(value)))
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Resets the counters and histograms to zero."""
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        for metric in metrics:
+            metric.reset()
+
+
+#: The registry used by sdssdb.
+registry = MetricsRegistry()
+
+
+def start_http_server(port, host='', registry=registry):
+    """Serves the metrics of ``registry`` at ``http://host:port/metrics``.
+
+    The server runs in a daemon thread, which is returned together with
+    the server.
+
+    """
+
+    try:
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+    except ImportError:
+        from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer((host, port), MetricsHandler)
+
+    thread = threading.Thread(target=server.serve_forever, name='sdssdb-metrics')
+    thread.daemon = True
+    thread.start()
+
+    return server, thread
@@ -10,15 +10,28 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import absolute_import
 
+import contextlib
+import os
+import random
+import re
 import socket
+import threading
+import time
 import warnings
+import weakref
 
-from peewee import PostgresqlDatabase, OperationalError
+from peewee import Model, OperationalError, PostgresqlDatabase, SqliteDatabase
 
 from sdssdb import config
+from sdssdb.core.metrics import registry
 
+from .explain import explain, query_name
+from .fields import register_numpy_arrays
+from .identity_map import IdentityMap
+from .unit_of_work import UnitOfWork
 
-__all__ = ('SDSSDatabase', 'ObservatoryDatabase')
+
+__all__ = ('SDSSDatabase', 'ObservatoryDatabase', 'SnapshotDatabase')
 
 
 class Dotable(dict):
@@ -51,13 +64,211 @@ class Dotable(dict):
         return list(self.keys())
 
 
+#: The databases whose connection state must be reset in a forked child.
+_databases = weakref.WeakSet()
+
+_query_labels = ('statement', 'table', 'model')
+
+_queries = registry.counter('sdssdb_queries_total', 'Queries executed.', _query_labels)
+_query_errors = registry.counter('sdssdb_query_errors_total', 'Queries that raised an error.',
+                                 _query_labels)
+_query_duration = registry.histogram('sdssdb_query_duration_seconds',
+                                     'Execution time of a sample of the queries. The _count '
+                                     'is the number of sampled queries; see '
+                                     'sdssdb_queries_total for all of them.', _query_labels)
+
+_connections_opened = registry.counter('sdssdb_connections_opened_total',
+                                       'Connections opened.', ('database', ))
+_connection_errors = registry.counter('sdssdb_connection_errors_total',
+                                      'Failed connection attempts.', ('database', ))
+_reconnects = registry.counter('sdssdb_reconnects_total',
+                               'Lost connections that were opened again.', ('database', ))
+
+_session_hits = registry.counter('sdssdb_identity_map_hits_total',
+                                 'Lookups served by identity-map sessions.')
+_session_misses = registry.counter('sdssdb_identity_map_misses_total',
+                                   'Lookups not found in identity-map sessions.')
+
+
+def _get_open_connections():
+
+    open_connections = {}
+    for database in list(_databases):
+        if database.database is None:
+            continue
+        key = (str(database.database), )
+        open_connections[key] = open_connections.get(key, 0) + database._open_connections
+
+    return open_connections
+
+
+registry.gauge('sdssdb_connections_open', 'Connections currently open, across threads.',
+               _get_open_connections, labelnames=('database', ))
+
+_write_table_re = re.compile(r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+'
+                             r'(?:"?(\w+)"?\.)?"?(\w+)"?', re.IGNORECASE)
+_select_table_re = re.compile(r'\bFROM\s+(?:"?(\w+)"?\.)?"?(\w+)"?', re.IGNORECASE)
+
+
+def _detach_connection(conn):
+    """Redirects the socket of a connection inherited from the parent to /dev/null.
+
+    When a psycopg2 connection is closed or garbage collected, libpq sends
+    a termination message through its socket. In a forked child the
+    socket is shared with the parent, and the message would end the
+    parent's session. Once the child's copy of the socket points to
+    /dev/null the connection can be discarded safely. Returns `False` if
+    the connection cannot be detached.
+
+    """
+
+    try:
+        fd = conn.fileno()
+    except Exception:
+        return False
+
+    devnull = os.open(os.devnull, os.O_RDWR)
+    try:
+        os.dup2(devnull, fd)
+    except OSError:
+        return False
+    finally:
+        os.close(devnull)
+
+    return True
+
+
+def _before_fork():
+    # Keep the connections of all the threads alive in the child until they
+    # are detached. Otherwise those of threads other than the one forking
+    # are garbage collected, and closed, when the child discards the threads.
+    for database in list(_databases):
+        database._fork_connections = list(database._connections)
+
+
+def _after_fork_in_parent():
+    for database in list(_databases):
+        database._fork_connections = []
+
+
+def _reset_after_fork():
+    for database in list(_databases):
+        database._reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=_before_fork, after_in_parent=_after_fork_in_parent,
+                        after_in_child=_reset_after_fork)
+
+
 class SDSSDatabase(PostgresqlDatabase):
+    """A PostgreSQL database configured from the sdssdb profiles.
+
+    Connections are kept per thread and per process. Each thread opens its
+    own connection on first use. The `connected` flag, which tells whether
+    the database has been initialised, is shared by all the threads. In a
+    process created with ``fork``, the connections inherited from the
+    parent are detached, by pointing the child's copy of their sockets to
+    ``/dev/null``, so that discarding them does not terminate the parent's
+    sessions, and the child connects again on first use. The reset happens
+    on fork where `os.register_at_fork` is available. Otherwise it is
+    detected on the next query, and only the connection of the thread that
+    forked is detached.
+
+    Workers of `multiprocessing` or `concurrent.futures` pools can
+    therefore use the models directly with the ``fork`` start method. With
+    ``spawn`` or ``forkserver`` the worker imports sdssdb again, so the
+    database must be configured in the pool initializer, e.g.::
+
+        def init_worker(profile):
+            database.connect_from_config(profile)
+
+        with multiprocessing.Pool(os.cpu_count(), initializer=init_worker,
+                                  initargs=('apo', )) as pool:
+            results = pool.map(process_plate, plate_ids)
+
+    See ``benchmarks/bench_workers.py`` for a complete example.
+
+    """
 
     def __init__(self):
 
+        self._pid = os.getpid()
+        self._connections = weakref.WeakSet()
+        self._fork_connections = []
+        self._inherited_connections = []
+        self._open_connections = 0
+
+        #: Whether to count queries and connections in `sdssdb.core.metrics.registry`.
+        #: Queries run on a `SnapshotDatabase` are not counted.
+        self.collect_metrics = True
+        #: The fraction of the queries whose execution time is measured.
+        self.metrics_sample_rate = 0.1
+        #: Whether new connections decode numeric arrays into NumPy arrays.
+        #: See `sdssdb.database.fields.register_numpy_arrays`.
+        self.numpy_arrays = True
+        self._table_models = None
+        self._query_labels = {}
+
         super(SDSSDatabase, self).__init__(None)
         self.connected = False
 
+        _databases.add(self)
+
+        self._plan_sampling = None
+        self._sampling_state = threading.local()
+
+    def _reset_after_fork(self):
+        """Discards the connection state inherited from the parent process."""
+
+        conns = list(self._fork_connections)
+        if self._state.conn is not None and self._state.conn not in conns:
+            conns.append(self._state.conn)
+
+        # Connections that cannot be detached are kept, unused, for the life
+        # of the child, since closing them would end the parent's session.
+        for conn in conns:
+            if not _detach_connection(conn):
+                self._inherited_connections.append(conn)
+
+        self._state = type(self._state)()
+        self._lock = threading.RLock()
+        self._connections = weakref.WeakSet()
+        self._fork_connections = []
+        self._open_connections = 0
+        self._pid = os.getpid()
+
+    def is_closed(self):
+
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+
+        return super(SDSSDatabase, self).is_closed()
+
+    def _initialize_connection(self, conn):
+
+        super(SDSSDatabase, self)._initialize_connection(conn)
+
+        if self.numpy_arrays:
+            register_numpy_arrays(conn)
+
+        try:
+            self._connections.add(conn)
+        except TypeError:  # The connection does not support weak references.
+            pass
+
+        with self._lock:
+            self._open_connections += 1
+        if self.collect_metrics:
+            _connections_opened.inc(str(self.database))
+
+    def _close(self, conn):
+
+        with self._lock:
+            self._open_connections = max(self._open_connections - 1, 0)
+
+        super(SDSSDatabase, self)._close(conn)
+
     def _test_connection(self):
         """Checks whether the connection is correct."""
 
@@ -69,6 +280,8 @@ class SDSSDatabase(PostgresqlDatabase):
             warnings.warn('failed to connect to database {0}. '
                           'Setting database to None.'.format(self.database),
                           UserWarning)
+            if self.collect_metrics:
+                _connection_errors.inc(str(self.database))
             self.init(None)
             self.connected = False
 
@@ -91,16 +304,157 @@ class SDSSDatabase(PostgresqlDatabase):
     def check_connection(self):
         """Checks whether the connection is open or can be connected."""
 
-        if self.connected and self.connection().closed == 0:
-            return True
+        if self.connected and not self.is_closed():
+            if self._state.conn.closed == 0:
+                return True
+            # The connection was lost. Discard it before connecting again.
+            self._state.reset()
+            with self._lock:
+                self._open_connections = max(self._open_connections - 1, 0)
+            if self.collect_metrics:
+                _reconnects.inc(str(self.database))
 
         try:
-            self.connect()
+            self.connect(reuse_if_open=True)
             self.connected = True
             return True
         except OperationalError:
+            if self.collect_metrics:
+                _connection_errors.inc(str(self.database))
             return False
 
+    def unit_of_work(self, max_size=1000, max_age=None):
+        """Returns a `.UnitOfWork` that batches inserts into this database.
+
+        Use it as a context manager; the buffered instances are flushed
+        when the context exits. See `.UnitOfWork` for details.
+
+        """
+
+        return UnitOfWork(self, max_size=max_size, max_age=max_age)
+
+    def explain(self, query, params=None, analyze=True, buffers=True):
+        """Returns the ``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`` of a query.
+
+        See `sdssdb.database.explain.explain`.
+
+        """
+
+        return explain(self, query, params=params, analyze=analyze, buffers=buffers)
+
+    def capture_plan(self, name, query, store, analyze=True):
+        """Captures the plan of a query and adds it to a `.PlanStore`.
+
+        Returns the changes with respect to the baseline plan stored for
+        ``name``; see `sdssdb.database.explain.compare_plans`.
+
+        """
+
+        if hasattr(query, '__sql__'):
+            sql = self.get_sql_context().sql(query).query()[0]
+        else:
+            sql = query
+
+        return store.add(name, self.explain(query, analyze=analyze), sql=sql)
+
+    def sample_slow_queries(self, store, threshold=1., sample_rate=0.1, analyze=False):
+        """Captures the plans of a sample of the slow ``SELECT`` queries.
+
+        Queries that take longer than ``threshold`` seconds are explained
+        with probability ``sample_rate`` and added to ``store``, named by
+        `~sdssdb.database.explain.query_name`. By default the plans are
+        captured without ``ANALYZE`` so that slow queries are not run
+        twice. Call with ``store=None`` to stop sampling.
+
+        """
+
+        if store is None:
+            self._plan_sampling = None
+        else:
+            self._plan_sampling = (store, threshold, sample_rate, analyze)
+
+    def _get_query_labels(self, sql):
+        """Returns the statement, table, and model labels of a query."""
+
+        labels = self._query_labels.get(sql, None)
+        if labels is None:
+            if len(self._query_labels) >= 1000:
+                self._query_labels = {}
+            labels = self._query_labels[sql] = self._parse_query_labels(sql)
+
+        return labels
+
+    def _parse_query_labels(self, sql):
+
+        statement = sql.lstrip()[:6].upper()
+
+        if statement == 'SELECT':
+            match = _select_table_re.search(sql)
+        elif statement in ('INSERT', 'UPDATE', 'DELETE'):
+            match = _write_table_re.match(sql)
+        else:
+            return ('OTHER', '', '')
+
+        if match is None:
+            return (statement, '', '')
+
+        schema, table = match.groups()
+
+        if self._table_models is None:
+            get_models = getattr(self, 'get_models', None)
+            self._table_models = {
+                (model._meta.schema, model._meta.table_name): model.__name__
+                for model in (get_models() if get_models is not None else [])}
+
+        return (statement, table if schema is None else schema + '.' + table,
+                self._table_models.get((schema, table), ''))
+
+    def execute_sql(self, sql, params=None, *args, **kwargs):
+
+        sampling = self._plan_sampling
+        if getattr(self._sampling_state, 'active', False):
+            sampling = None
+
+        labels = self._get_query_labels(sql) if self.collect_metrics else None
+        timed = sampling is not None or (labels is not None and
+                                         random.random() < self.metrics_sample_rate)
+
+        t0 = time.time() if timed else None
+
+        try:
+            cursor = super(SDSSDatabase, self).execute_sql(sql, params, *args, **kwargs)
+        except Exception:
+            if labels is not None:
+                _query_errors.inc(*labels)
+            raise
+
+        elapsed = time.time() - t0 if timed else None
+
+        if labels is not None:
+            _queries.inc(*labels)
+            if elapsed is not None:
+                _query_duration.observe(elapsed, *labels)
+
+        if sampling is None:
+            return cursor
+
+        store, threshold, sample_rate, analyze = sampling
+        if (elapsed >= threshold and sql.lstrip().upper().startswith('SELECT') and
+                random.random() < sample_rate):
+            self._sampling_state.active = True
+            try:
+                # In a savepoint, so that a failed EXPLAIN does not abort the
+                # transaction of the caller.
+                with self.atomic():
+                    plan = explain(self, sql, params, analyze=analyze)
+                store.add(query_name(sql), plan, sql=sql)
+            except Exception as ee:
+                warnings.warn('failed to capture plan: {0}'.format(ee), UserWarning)
+            finally:
+                self._sampling_state.active = False
+
+        return cursor
+
     @staticmethod
     def list_profiles():
         """Returns a list of profiles."""
@@ -118,12 +472,20 @@ class ObservatoryDatabase(SDSSDatabase):
 
         super(ObservatoryDatabase, self).__init__()
 
+        # Recent versions of peewee store their autoconnect option in the
+        # instance, which hides the autoconnect method. The method is truthy,
+        # so peewee still connects on first use without the attribute.
+        self.__dict__.pop('autoconnect', None)
+
         if location is None:
             self.set_location()
         else:
             self.location = location
 
         self.models = Dotable({})
+        self.snapshot = None
+
+        self._sessions = threading.local()
 
         if autoconnect:
             self.autoconnect()
@@ -131,6 +493,118 @@ class ObservatoryDatabase(SDSSDatabase):
         if self.connected and admin:
             self.become_admin()
 
+    def connect_from_config(self, config_key):
+        """Initialises the database from the config file.
+
+        If the profile defines a ``snapshot`` path instead of connection
+        parameters, the models are bound to that `.SnapshotDatabase`.
+
+        """
+
+        if 'snapshot' in config[config_key]:
+            self.use_snapshot(config[config_key]['snapshot'])
+        else:
+            self.use_snapshot(None)
+            super(ObservatoryDatabase, self).connect_from_config(config_key)
+
+    @contextlib.contextmanager
+    def session(self):
+        """Opens an identity-map session for the current thread.
+
+        Within the session, instances loaded with a plain ``select()`` and
+        those returned by ``Model.get`` or ``Model.get_by_id`` are cached by
+        primary key. Later lookups by primary key, including foreign key
+        dereferences such as ``plugging.plate``, return the cached instance
+        without a query, and plain selects return the cached instance for the
+        rows already loaded. Writes executed through this database invalidate
+        the instances of the affected table. Nested sessions share the outer
+        identity map. ::
+
+            with database.session() as session:
+                for plugging in Plugging.select():
+                    print(plugging.plate.plate_id, plugging.cartridge.number)
+                print(session.hits, session.misses)
+
+        Yields
+        ------
+        identity_map : `.IdentityMap`
+            The identity map, with ``hits``, ``misses``, and ``hit_ratio``.
+
+        """
+
+        stack = self._sessions.__dict__.setdefault('stack', [])
+
+        identity_map = stack[-1] if len(stack) > 0 else IdentityMap()
+        stack.append(identity_map)
+
+        try:
+            yield identity_map
+        finally:
+            stack.pop()
+            if len(stack) == 0 and self.collect_metrics:
+                _session_hits.inc(amount=identity_map.hits)
+                _session_misses.inc(amount=identity_map.misses)
+
+    def get_session(self):
+        """Returns the `.IdentityMap` of the current session, or `None`."""
+
+        stack = getattr(self._sessions, 'stack', None)
+
+        return stack[-1] if stack else None
+
+    def execute_sql(self, sql, params=None, *args, **kwargs):
+
+        cursor = super(ObservatoryDatabase, self).execute_sql(sql, params, *args, **kwargs)
+
+        identity_map = self.get_session()
+        if identity_map is not None:
+            identity_map.invalidate_sql(sql)
+
+        return cursor
+
+    def get_models(self):
+        """Returns a list of all the models in ``self.models``."""
+
+        models = []
+        for module in self.models.values():
+            for name in dir(module):
+                obj = getattr(module, name)
+                if (isinstance(obj, type) and issubclass(obj, Model) and
+                        obj.__module__ == module.__name__):
+                    models.append(obj)
+
+        return models
+
+    def use_snapshot(self, path):
+        """Binds the models to a local snapshot, or back to this database.
+
+        Parameters
+        ----------
+        path : str or None
+            The path to a snapshot created with
+            `sdssdb.observatory.snapshot.create_snapshot`. If `None`, the
+            models are bound to this database again.
+
+        """
+
+        self.snapshot = SnapshotDatabase(path) if path is not None else None
+        self.bind_models()
+
+    def bind_models(self):
+        """Binds the models to the snapshot, if in use, or to this database."""
+
+        self._table_models = None
+        self._query_labels = {}
+
+        models = self.get_models()
+        if len(models) == 0:
+            return
+
+        if self.snapshot is not None:
+            self.snapshot.bind(models)
+        else:
+            self.bind(models)
+
     def dsn_parameters(self):
         """Returns the DSN parameters of the connection."""
 
@@ -194,3 +668,93 @@ class ObservatoryDatabase(SDSSDatabase):
         """Becomes the non-admin user."""
 
         self._become(config['apo_user'])
+
+
+class SnapshotDatabase(SqliteDatabase):
+    """A local, read-mostly SQLite copy of some schemas of an SDSS database.
+
+    A snapshot is a directory with a ``snapshot.db`` SQLite file, which
+    stores metadata about the snapshot, and one file per schema (e.g.,
+    ``platedb.db``), which is attached on connection with the name of the
+    schema. Models with ``schema = 'platedb'`` can then be bound to the
+    snapshot without changes. Queries run on a snapshot are not counted in
+    `sdssdb.core.metrics.registry`.
+
+    Parameters
+    ----------
+    path : str
+        The directory of the snapshot. It is created if it does not exist.
+    schemas : tuple
+        The schemas to attach.
+    kwargs : dict
+        Other parameters to pass to `peewee.SqliteDatabase`.
+
+    """
+
+    def __init__(self, path, schemas=('platedb', 'mangadb'), **kwargs):
+
+        self.path = os.path.realpath(os.path.expanduser(path))
+        self.schemas = tuple(schemas)
+
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+
+        super(SnapshotDatabase, self).__init__(os.path.join(self.path, 'snapshot.db'), **kwargs)
+
+    def _initialize_connection(self, conn):
+
+        super(SnapshotDatabase, self)._initialize_connection(conn)
+
+        for schema in self.schemas:
+            conn.execute('ATTACH DATABASE ? AS "{0}"'.format(schema),
+                         (os.path.join(self.path, schema + '.db'), ))
+
+        conn.execute('CREATE TABLE IF NOT EXISTS snapshot_info '
+                     '(key TEXT PRIMARY KEY, value TEXT)')
+
+    def get_info(self, key=None):
+        """Returns a metadata value, or a dictionary with all of them."""
+
+        if key is None:
+            return dict(self.execute_sql('SELECT key, value FROM snapshot_info').fetchall())
+
+        row = self.execute_sql('SELECT value FROM snapshot_info WHERE key = ?',
+                               (key, )).fetchone()
+
+        return row[0] if row is not None else None
+
+    def set_info(self, key, value):
+        """Sets a metadata value."""
+
+        self.execute_sql('INSERT OR REPLACE INTO snapshot_info (key, value) VALUES (?, ?)',
+                         (key, None if value is None else str(value)))
+
+    def create_model_tables(self, models, indexes=True):
+        """Creates the tables, and optionally the indexes, for ``models``.
+
+        The ``CREATE`` statements are adapted to SQLite: foreign key
+        references cannot be schema-qualified, indexes are created in the
+        schema of their table, and arrays are stored as text.
+
+        """
+
+        for model in models:
+            create_table = model._schema._create_table(safe=True)
+            sql, params = self.get_sql_context().sql(create_table).query()
+            sql = re.sub(r'REFERENCES "\w+"\.', 'REFERENCES ', sql)
+            sql = re.sub(r'\w+\[\]', 'TEXT', sql)
+            self.execute_sql(sql, params)
+
+        if indexes:
+            self.create_model_indexes(models)
+
+    def create_model_indexes(self, models):
+        """Creates the indexes for ``models``."""
+
+        for model in models:
+            for index in model._schema._create_indexes(safe=True):
+                sql, params = self.get_sql_context().sql(index).query()
+                # SQLite expects the schema in the name of the index, not the table.
+                sql = re.sub(r'INDEX (?:IF NOT EXISTS )?"(\w+)" ON "(\w+)"\.',
+                             r'INDEX IF NOT EXISTS "\2"."\1" ON ', sql)
+                self.execute_sql(sql, params)
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# explain.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Captures, stores, and compares PostgreSQL query plans.
+
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+
+from peewee import PostgresqlDatabase
+
+from sdssdb.core.compat import string_types
+
+
+__all__ = ('explain', 'normalize_plan', 'compare_plans', 'PlanChange', 'PlanStore',
+           'query_name')
+
+
+#: The keys of a plan node that define its shape. Costs, row counts,
+#: timings, and buffers are not included.
+PLAN_KEYS = ('Node Type', 'Relation Name', 'Index Name', 'Join Type', 'Strategy',
+             'Parent Relationship')
+
+#: Node types that read a relation using an index.
+INDEX_SCANS = ('Index Scan', 'Index Only Scan', 'Bitmap Heap Scan', 'Bitmap Index Scan')
+
+#: A difference between two plans. ``regression`` is `True` for changes
+#: that usually make a query slower, such as an index scan replaced by a
+#: sequential scan.
+PlanChange = collections.namedtuple('PlanChange', ['relation', 'old', 'new', 'regression'])
+
+
+def query_name(sql):
+    """Returns a stable name for a SQL statement, ignoring literal values."""
+
+    normalized = re.sub(r'\s+', ' ', re.sub(r"'[^']*'|\b\d+\b", '?', sql)).strip()
+
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def explain(database, query, params=None, analyze=True, buffers=True):
+    """Returns the ``EXPLAIN (FORMAT JSON)`` output for a query.
+
+    Parameters
+    ----------
+    database : `peewee.PostgresqlDatabase`
+        The database in which to run ``EXPLAIN``.
+    query : `peewee.Query` or str
+        A peewee query or a SQL string with ``params``.
+    analyze : bool
+        Whether to run the query (``ANALYZE``) and collect actual times. A
+        statement that is not a ``SELECT`` is run in a transaction that is
+        rolled back.
+    buffers : bool
+        Whether to collect buffer usage. Requires ``analyze``.
+
+    Returns
+    -------
+    plan : dict
+        The first element of the JSON output, with the ``Plan`` tree and,
+        if ``analyze=True``, the ``Planning Time`` and ``Execution Time``.
+
+    """
+
+    if not isinstance(database, PostgresqlDatabase):
+        raise RuntimeError('EXPLAIN capture requires a PostgreSQL database.')
+
+    if isinstance(query, string_types):
+        sql = query
+    else:
+        sql, params = database.get_sql_context().sql(query).query()
+
+    options = ['FORMAT JSON']
+    if analyze:
+        options.append('ANALYZE')
+        if buffers:
+            options.append('BUFFERS')
+
+    explain_sql = 'EXPLAIN ({0}) {1}'.format(', '.join(options), sql)
+
+    if analyze and not sql.lstrip().upper().startswith('SELECT'):
+        with database.atomic() as transaction:
+            result = database.execute_sql(explain_sql, params).fetchone()[0]
+            transaction.rollback()
+    else:
+        result = database.execute_sql(explain_sql, params).fetchone()[0]
+
+    if isinstance(result, string_types):
+        result = json.loads(result)
+
+    return result[0]
+
+
+def normalize_plan(plan):
+    """Returns the shape of a plan, without costs, timings, or buffers.
+
+    Accepts the output of `explain` or a ``Plan`` node. The result is a
+    nested dictionary with the `PLAN_KEYS` of each node and its children
+    in ``Plans``.
+
+    """
+
+    node = plan.get('Plan', plan)
+
+    normalized = {key: node[key] for key in PLAN_KEYS if key in node}
+
+    children = [normalize_plan(child) for child in node.get('Plans', [])]
+    if len(children) > 0:
+        normalized['Plans'] = children
+
+    return normalized
+
+
+def _get_stats(plan):
+    """Returns the timing and buffer statistics of a plan."""
+
+    node = plan.get('Plan', {})
+
+    stats = {'planning_time': plan.get('Planning Time', None),
+             'execution_time': plan.get('Execution Time', None),
+             'rows': node.get('Actual Rows', node.get('Plan Rows', None)),
+             'shared_hit_blocks': node.get('Shared Hit Blocks', None),
+             'shared_read_blocks': node.get('Shared Read Blocks', None)}
+
+    return stats
+
+
+def _iter_nodes(node):
+
+    yield node
+    for child in node.get('Plans', []):
+        for descendant in _iter_nodes(child):
+            yield descendant
+
+
+def _get_access_paths(normalized):
+    """Returns a mapping of relation to a sorted list of its scan nodes."""
+
+    access = collections.defaultdict(list)
+    for node in _iter_nodes(normalized):
+        if 'Relation Name' in node:
+            access[node['Relation Name']].append(
+                node['Node Type'] + (' using ' + node['Index Name'] if 'Index Name' in node
+                                     else ''))
+
+    return {relation: sorted(paths) for relation, paths in access.items()}
+
+
+def compare_plans(old, new):
+    """Compares two normalized plans.
+
+    Returns
+    -------
+    changes : list
+        A list of `PlanChange` for each relation whose access path changed.
+        If only other nodes changed (e.g., the join strategy), a single
+        change with ``relation=None`` and the two plans. Empty if both
+        plans have the same shape.
+
+    """
+
+    if old == new:
+        return []
+
+    old_access = _get_access_paths(old)
+    new_access = _get_access_paths(new)
+
+    changes = []
+    for relation in sorted(set(old_access) | set(new_access)):
+
+        old_paths = old_access.get(relation, [])
+        new_paths = new_access.get(relation, [])
+        if old_paths == new_paths:
+            continue
+
+        lost_index = any(path.startswith(INDEX_SCANS) for path in old_paths) and \
+            not any(path.startswith(INDEX_SCANS) for path in new_paths)
+        regression = lost_index and any(path == 'Seq Scan' for path in new_paths)
+
+        changes.append(PlanChange(relation, old_paths, new_paths, regression))
+
+    if len(changes) == 0:
+        changes.append(PlanChange(None, old, new, False))
+
+    return changes
+
+
+class PlanStore(object):
+    """A JSON file with the history of normalized plans of named queries.
+
+    Each record has the normalized plan, the SQL, the time of the capture,
+    and the statistics of the run (planning and execution time, rows, and
+    shared buffers hit and read). The first record of a query is its
+    baseline until `.set_baseline` is called.
+
+    Parameters
+    ----------
+    path : str
+        The path to the JSON file. It is created on the first `.add`.
+    max_history : int
+        Maximum number of records to keep per query, besides the baseline.
+
+    """
+
+    def __init__(self, path, max_history=20):
+
+        self.path = os.path.realpath(os.path.expanduser(path))
+        self.max_history = max_history
+
+        self._lock = threading.Lock()
+
+        if os.path.exists(self.path):
+            with open(self.path) as fd:
+                self.data = json.load(fd)
+        else:
+            self.data = {}
+
+    def __contains__(self, name):
+        return name in self.data
+
+    def save(self):
+        """Writes the store to disk."""
+
+        with self._lock:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as fd:
+                json.dump(self.data, fd, indent=1, sort_keys=True)
+            os.rename(tmp_path, self.path)
+
+    def add(self, name, plan, sql=None, save=True):
+        """Adds the output of `explain` for a query.
+
+        Returns
+        -------
+        changes : list
+            The changes with respect to the baseline. See `compare_plans`.
+
+        """
+
+        record = {'plan': normalize_plan(plan),
+                  'sql': sql,
+                  'captured': datetime.datetime.utcnow().isoformat(),
+                  'stats': _get_stats(plan)}
+
+        with self._lock:
+            entry = self.data.setdefault(name, {'baseline': record, 'history': []})
+            entry['history'] = (entry['history'] + [record])[-self.max_history:]
+            changes = compare_plans(entry['baseline']['plan'], record['plan'])
+
+        if save:
+            self.save()
+
+        return changes
+
+    def get_baseline(self, name):
+        return self.data[name]['baseline']
+
+    def get_history(self, name):
+        return list(self.data[name]['history'])
+
+    def set_baseline(self, name, index=-1):
+        """Makes a record in the history the baseline of a query."""
+
+        with self._lock:
+            self.data[name]['baseline'] = self.data[name]['history'][index]
+
+        self.save()
+
+    def compare(self, name, against='baseline'):
+        """Compares the last plan of a query with the baseline or the previous one."""
+
+        history = self.data[name]['history']
+
+        if against == 'baseline':
+            reference = self.data[name]['baseline']
+        elif against == 'previous':
+            if len(history) < 2:
+                return []
+            reference = history[-2]
+        else:
+            raise ValueError('against must be baseline or previous.')
+
+        return compare_plans(reference['plan'], history[-1]['plan'])
+
+    def regressions(self):
+        """Returns the queries whose last plan regressed from the baseline."""
+
+        return {name: changes
+                for name, changes in ((name, self.compare(name)) for name in sorted(self.data))
+                if any(change.regression for change in changes)}
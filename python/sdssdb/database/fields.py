@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# fields.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Custom peewee fields for PostgreSQL types used in the SDSS databases.
+
+
+from __future__ import absolute_import, division, print_function
+
+import enum
+import json
+import threading
+import weakref
+
+import numpy
+from peewee import Field, IntegerField, Node, PostgresqlDatabase
+from playhouse.postgres_ext import ArrayField
+
+from sdssdb.core.compat import string_types
+
+
+__all__ = ('NumpyArrayField', 'register_numpy_arrays', 'EnumField')
+
+
+class NumpyArrayField(ArrayField):
+    """A PostgreSQL ARRAY field whose values are NumPy arrays.
+
+    Supports the same operators as `playhouse.postgres_ext.ArrayField`,
+    including ``contains`` (``@>``), ``contains_any`` (``&&``, overlap),
+    ``contained_by`` (``<@``), and item access and slicing.
+
+    Parameters
+    ----------
+    field_class : `peewee.Field`
+        The field class of the array elements.
+    dtype : `numpy.dtype` or None
+        The dtype of the returned arrays. If `None`, the dtype is inferred
+        from the values returned by the database driver.
+    kwargs : dict
+        Other parameters to pass to
+        `~playhouse.postgres_ext.ArrayField`. Unlike the parent class, no
+        index is created by default.
+
+    In databases other than PostgreSQL (e.g., a local SQLite snapshot) the
+    arrays are stored as JSON strings.
+
+    """
+
+    def __init__(self, field_class=IntegerField, dtype=None, *args, **kwargs):
+
+        self.dtype = dtype
+
+        kwargs.setdefault('index', False)
+        super(NumpyArrayField, self).__init__(field_class, *args, **kwargs)
+
+    def db_value(self, value):
+
+        if isinstance(value, numpy.ndarray):
+            value = value.tolist()
+
+        if value is None or isinstance(value, string_types):
+            return value
+
+        if not isinstance(self.model._meta.database, PostgresqlDatabase):
+            return json.dumps(list(value))
+
+        return super(NumpyArrayField, self).db_value(value)
+
+    def python_value(self, value):
+
+        if value is None or isinstance(value, Node):
+            return value
+
+        if isinstance(value, numpy.ndarray):
+            return value if self.dtype is None else value.astype(self.dtype, copy=False)
+
+        if isinstance(value, string_types):
+            value = json.loads(value)
+
+        return numpy.array(value, dtype=self.dtype)
+
+
+def _make_numpy_caster(name, base_caster, dtype):
+    """Creates a psycopg2 typecaster that parses an array into NumPy."""
+
+    import psycopg2.extensions
+
+    def cast(value, cursor):
+
+        if value is None:
+            return None
+
+        body = value[1:-1]
+
+        if body == '':
+            return numpy.zeros(0, dtype=dtype)
+
+        # Fall back to the standard caster for nested arrays or NULLs.
+        if '{' in body or 'NULL' in body:
+            values = base_caster(value, cursor)
+            if dtype.kind == 'f':
+                return numpy.array(values, dtype=numpy.float64).astype(dtype)
+            return numpy.array(values)
+
+        return numpy.array(body.split(','), dtype=dtype)
+
+    return psycopg2.extensions.new_type(base_caster.values, name, cast)
+
+
+def register_numpy_arrays(conn_or_curs=None):
+    """Makes psycopg2 decode numeric arrays directly into NumPy arrays.
+
+    The array literal returned by the server is split and converted by
+    NumPy in a single step, instead of building a list of Python objects
+    first. `NumpyArrayField` accepts either representation, but note that
+    once registered all numeric arrays returned by ``conn_or_curs``,
+    including those from raw SQL, are NumPy arrays. `.SDSSDatabase`
+    registers them on each new connection, unless its ``numpy_arrays``
+    attribute is `False`.
+
+    Parameters
+    ----------
+    conn_or_curs : object or None
+        The psycopg2 connection or cursor for which to register the
+        typecasters. If `None`, they are registered globally.
+
+    """
+
+    import psycopg2.extensions
+
+    casters = ((psycopg2.extensions.INTEGERARRAY, numpy.dtype(numpy.int32)),
+               (psycopg2.extensions.LONGINTEGERARRAY, numpy.dtype(numpy.int64)),
+               (psycopg2.extensions.FLOATARRAY, numpy.dtype(numpy.float64)))
+
+    for base_caster, dtype in casters:
+        caster = _make_numpy_caster('NUMPY_' + base_caster.name, base_caster, dtype)
+        psycopg2.extensions.register_type(caster, conn_or_curs)
+
+
+class EnumField(Field):
+    """A field for PostgreSQL enumerated (``CREATE TYPE ... AS ENUM``) types.
+
+    The labels of the enum are read from ``pg_enum`` the first time a
+    query selecting the field is run on a given connection, and cached for
+    the life of the connection. Note that the labels are read with an
+    additional query on the same connection, and therefore within any
+    transaction in progress. Values are
+    returned as members of a Python `enum.Enum` whose names and values are
+    the labels. The members are also strings, so they compare equal to
+    their labels. Filters can use either the label or the enum member,
+    e.g., ``Gprobe.fiber_type == 'GUIDE'``.
+
+    If the connection has been closed, the enum loaded last is used. If
+    the database is not PostgreSQL, or the labels cannot be loaded, values
+    are returned as plain strings.
+
+    """
+
+    field_type = 'TEXT'
+
+    def __init__(self, *args, **kwargs):
+
+        super(EnumField, self).__init__(*args, **kwargs)
+
+        # Keyed by connection, without keeping closed connections alive.
+        self._enums = weakref.WeakKeyDictionary()
+        self._enum = None
+        self._lock = threading.Lock()
+
+    def _load_enum(self, conn):
+        """Loads the enum labels for the column using ``conn``."""
+
+        cursor = conn.cursor()
+        cursor.execute('SELECT t.typname, e.enumlabel '
+                       'FROM pg_attribute a '
+                       'JOIN pg_class c ON c.oid = a.attrelid '
+                       'JOIN pg_namespace n ON n.oid = c.relnamespace '
+                       'JOIN pg_type t ON t.oid = a.atttypid '
+                       'JOIN pg_enum e ON e.enumtypid = t.oid '
+                       'WHERE n.nspname = %s AND c.relname = %s AND a.attname = %s '
+                       'ORDER BY e.enumsortorder',
+                       (self.model._meta.schema or 'public',
+                        self.model._meta.table_name, self.column_name))
+        rows = cursor.fetchall()
+        cursor.close()
+
+        if len(rows) == 0:
+            return None
+
+        return enum.Enum(str(rows[0][0]), [(str(label), label) for __, label in rows],
+                         type=str)
+
+    def get_enum(self, reload=False):
+        """Returns the Python enum for the current connection.
+
+        Returns `None` if the database is not PostgreSQL or the column is
+        not an enum.
+
+        """
+
+        database = self.model._meta.database
+        if not isinstance(database, PostgresqlDatabase):
+            return None
+
+        if database.is_closed():
+            return self._enum
+
+        conn = database.connection()
+
+        if not reload and conn in self._enums:
+            return self._enums[conn]
+
+        with self._lock:
+            enum_class = self._enums[conn] = self._load_enum(conn)
+            if enum_class is not None:
+                self._enum = enum_class
+
+        return enum_class
+
+    @property
+    def labels(self):
+        """The list of labels of the enum, in sort order."""
+
+        enum_class = self.get_enum()
+        if enum_class is None:
+            return None
+
+        return [member.value for member in enum_class]
+
+    def db_value(self, value):
+
+        if isinstance(value, enum.Enum):
+            return value.value
+
+        return value
+
+    @property
+    def python_value(self):
+        """Returns a function that converts database values to enum members.
+
+        peewee reads ``python_value`` once per query, when it sets up the
+        converters of the cursor, so the enum is resolved once per query
+        and not for each value. On the first query of each connection
+        this runs the ``pg_enum`` query described in `EnumField`; later
+        queries use the cached enum, and only query ``pg_enum`` again if a
+        value is not one of its labels.
+
+        """
+
+        enum_class = self.get_enum()
+
+        def convert(value):
+
+            if value is None or enum_class is None:
+                return value
+
+            try:
+                return enum_class(value)
+            except ValueError:
+                # The enum may have gained a new label since it was cached.
+                return self.get_enum(reload=True)(value)
+
+        return convert
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# identity_map.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# A per-session cache of model instances keyed by primary key.
+
+
+from __future__ import absolute_import, division, print_function
+
+import re
+import threading
+
+from peewee import OP, Expression, ModelObjectCursorWrapper, Node
+
+
+__all__ = ('IdentityMap', 'IdentityMapCursorWrapper', 'get_pk_lookup')
+
+
+_write_re = re.compile(r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+'
+                       r'(?:"?(\w+)"?\.)?"?(\w+)"?', re.IGNORECASE)
+
+_invalidate_all_re = re.compile(r'^\s*(?:WITH|TRUNCATE|COPY|ALTER|DROP|CREATE|INSERT|UPDATE|'
+                                r'DELETE)\b', re.IGNORECASE)
+
+
+def get_pk_lookup(model, query):
+    """Returns the pk if ``query`` is ``model.pk == value``, or `None`."""
+
+    if not isinstance(query, Expression) or query.op != OP.EQ:
+        return None
+
+    if query.lhs is not model._meta.primary_key or isinstance(query.rhs, Node):
+        return None
+
+    return query.rhs
+
+
+class IdentityMap(object):
+    """A cache of model instances by model and primary key.
+
+    Within a session each row is represented by a single instance, so
+    that reaching the same row through different foreign key paths does
+    not query the database again. Use it through
+    `.ObservatoryDatabase.session`.
+
+    """
+
+    def __init__(self):
+
+        self.hits = 0
+        self.misses = 0
+
+        self._instances = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return sum(len(instances) for instances in self._instances.values())
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.
+
+    def get(self, model, pk):
+        """Returns the cached instance of ``model`` with ``pk``, or `None`."""
+
+        with self._lock:
+            instance = self._instances.get(model, {}).get(pk, None)
+            if instance is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return instance
+
+    def add(self, instance):
+        """Adds an instance. Returns the instance already cached, if any."""
+
+        pk = instance._pk
+        if pk is None:
+            return instance
+
+        with self._lock:
+            return self._instances.setdefault(type(instance), {}).setdefault(pk, instance)
+
+    def invalidate(self, schema=None, table=None):
+        """Removes the instances of a table, or all of them if ``table=None``."""
+
+        with self._lock:
+
+            if table is None:
+                self._instances.clear()
+                return
+
+            for model in list(self._instances):
+                if (model._meta.table_name == table and
+                        (schema is None or model._meta.schema == schema)):
+                    self._instances.pop(model)
+
+    def invalidate_sql(self, sql):
+        """Invalidates the instances that a write statement may have changed.
+
+        ``INSERT``, ``UPDATE``, and ``DELETE`` invalidate their table.
+        Other statements that may change data (DDL, ``TRUNCATE``,
+        ``COPY``, and ``WITH`` queries, which may contain writes)
+        invalidate everything. ``SELECT`` and transaction control
+        statements are ignored.
+
+        """
+
+        match = _write_re.match(sql)
+        if match is not None:
+            self.invalidate(schema=match.group(1), table=match.group(2))
+        elif _invalidate_all_re.match(sql):
+            self.invalidate()
+
+
+class IdentityMapCursorWrapper(ModelObjectCursorWrapper):
+    """Returns the instance in an `IdentityMap` for each row, if there is one.
+
+    Rows with all the fields of the model are added to the map, and the
+    instance already in the map for the same pk, if any, is returned in
+    their place. Partial rows are returned as new instances.
+
+    """
+
+    def __init__(self, cursor, model, select, identity_map):
+
+        super(IdentityMapCursorWrapper, self).__init__(cursor, model, select, model)
+
+        self.identity_map = identity_map
+
+    def process_row(self, row):
+
+        instance = super(IdentityMapCursorWrapper, self).process_row(row)
+
+        if len(instance.__data__) < len(self.model._meta.sorted_fields):
+            return instance
+
+        return self.identity_map.add(instance)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# index_advisor.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Compares the access paths of the models with the live indexes.
+
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import re
+
+from peewee import ForeignKeyField, PostgresqlDatabase
+
+
+__all__ = ('ExpectedIndex', 'LiveIndex', 'IndexAdvice', 'get_expected_indexes',
+           'get_live_indexes', 'get_table_stats', 'get_index_sql', 'advise',
+           'print_advice')
+
+
+#: An index implied by a model: a foreign key, an indexed field, or one
+#: of the ``Meta.indexes``.
+ExpectedIndex = collections.namedtuple('ExpectedIndex',
+                                       ['model', 'schema', 'table', 'columns',
+                                        'unique', 'reason'])
+
+#: An index that exists on the server, with its usage statistics.
+LiveIndex = collections.namedtuple('LiveIndex',
+                                   ['schema', 'table', 'name', 'columns', 'unique',
+                                    'primary', 'scans', 'size'])
+
+#: An advice. ``kind`` is ``'missing'`` or ``'unused'``.
+IndexAdvice = collections.namedtuple('IndexAdvice',
+                                     ['kind', 'schema', 'table', 'columns', 'sql',
+                                      'details'])
+
+
+def get_expected_indexes(models):
+    """Returns the indexes implied by the fields and metadata of ``models``.
+
+    Every foreign key is expected to be indexed, since it is used to
+    resolve backrefs and joins, as is every field with ``index=True`` or
+    ``unique=True`` and every entry in ``Meta.indexes``. Primary keys are
+    not included.
+
+    """
+
+    expected = []
+
+    for model in models:
+
+        meta = model._meta
+        schema = meta.schema or 'public'
+        seen = set()
+
+        def add(columns, unique, reason):
+            if tuple(columns) in seen:
+                return
+            seen.add(tuple(columns))
+            expected.append(ExpectedIndex(model, schema, meta.table_name, tuple(columns),
+                                          unique, reason))
+
+        for field in meta.sorted_fields:
+            if field.primary_key:
+                continue
+            if isinstance(field, ForeignKeyField):
+                add([field.column_name], field.unique,
+                    'foreign key to {0}'.format(field.rel_model._meta.table_name))
+            elif field.index or field.unique:
+                add([field.column_name], field.unique, 'indexed field')
+
+        for index in meta.indexes:
+            if isinstance(index, (list, tuple)) and len(index) == 2:
+                fields, unique = index
+                columns = [meta.fields[name].column_name if name in meta.fields else name
+                           for name in fields]
+                add(columns, unique, 'Meta.indexes')
+
+    return expected
+
+
+def get_live_indexes(database, schemas):
+    """Returns the indexes that exist in ``schemas``.
+
+    Reads the catalogue (``pg_index``, which backs ``pg_indexes``) and
+    the usage statistics in ``pg_stat_user_indexes``. The columns are
+    those returned by ``pg_get_indexdef``, so the columns of an
+    expression index are the expressions (e.g., ``lower(name)``) and are
+    never mistaken for plain columns.
+
+    Returns
+    -------
+    indexes : dict
+        A dictionary of ``(schema, table)`` to a list of `LiveIndex`.
+
+    """
+
+    cursor = database.execute_sql(
+        'SELECT n.nspname, t.relname, i.relname, ix.indisunique, ix.indisprimary, '
+        'ARRAY(SELECT pg_get_indexdef(ix.indexrelid, k.ord, true) '
+        'FROM generate_series(1, ix.indnatts) AS k(ord) ORDER BY k.ord), '
+        'COALESCE(s.idx_scan, 0), pg_relation_size(i.oid) '
+        'FROM pg_index ix '
+        'JOIN pg_class t ON t.oid = ix.indrelid '
+        'JOIN pg_class i ON i.oid = ix.indexrelid '
+        'JOIN pg_namespace n ON n.oid = t.relnamespace '
+        'LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = i.oid '
+        'WHERE n.nspname = ANY(%s)', (list(schemas), ))
+
+    indexes = collections.defaultdict(list)
+    for schema, table, name, unique, primary, columns, scans, size in cursor.fetchall():
+        indexes[(schema, table)].append(LiveIndex(schema, table, name, tuple(columns),
+                                                  unique, primary, scans, size))
+
+    return indexes
+
+
+def get_table_stats(database, schemas):
+    """Returns the scan statistics of the tables in ``schemas``.
+
+    Returns
+    -------
+    stats : dict
+        A dictionary of ``(schema, table)`` to a dictionary with the
+        ``seq_scan``, ``seq_tup_read``, ``idx_scan``, and ``n_live_tup``
+        values from ``pg_stat_user_tables``.
+
+    """
+
+    cursor = database.execute_sql(
+        'SELECT schemaname, relname, seq_scan, seq_tup_read, '
+        'COALESCE(idx_scan, 0), n_live_tup '
+        'FROM pg_stat_user_tables WHERE schemaname = ANY(%s)', (list(schemas), ))
+
+    return {(row[0], row[1]): dict(zip(('seq_scan', 'seq_tup_read', 'idx_scan', 'n_live_tup'),
+                                       row[2:]))
+            for row in cursor.fetchall()}
+
+
+def _get_statement_calls(database):
+    """Returns the queries and calls in ``pg_stat_statements``, if installed."""
+
+    installed = database.execute_sql("SELECT 1 FROM pg_extension "
+                                      "WHERE extname = 'pg_stat_statements'").fetchone()
+    if installed is None:
+        return None
+
+    return database.execute_sql('SELECT query, calls FROM pg_stat_statements').fetchall()
+
+
+def _mentions(query, names):
+    """Whether ``query`` mentions all of ``names`` as whole words."""
+
+    return all(re.search(r'\b{0}\b'.format(re.escape(name)), query, re.IGNORECASE)
+               for name in names)
+
+
+def get_index_sql(schema, table, columns, unique=False):
+    """Returns the ``CREATE INDEX`` statement for ``columns``."""
+
+    return ('CREATE {unique}INDEX CONCURRENTLY {table}_{name}_idx ON {schema}.{table} '
+            'USING btree ({columns});'.format(unique='UNIQUE ' if unique else '',
+                                              table=table, schema=schema,
+                                              name='_'.join(columns),
+                                              columns=', '.join(columns)))
+
+
+def _is_covered(columns, live_indexes):
+    """Whether an index with ``columns`` as its leading columns exists."""
+
+    return any(index.columns[:len(columns)] == tuple(columns) for index in live_indexes)
+
+
+def advise(database, models, min_size=8 * 1024 ** 2):
+    """Flags missing and unused indexes for ``models``.
+
+    An expected index (see `get_expected_indexes`) is missing if no live
+    index starts with its columns. Missing indexes are sorted by the rows
+    read by sequential scans on their table and, if ``pg_stat_statements``
+    is installed, include the number of calls of the recorded statements
+    that mention the table and column.
+
+    A live index is flagged as unused if it has never been scanned since
+    the statistics were last reset, is not unique or a primary key, and is
+    larger than ``min_size`` bytes.
+
+    Returns
+    -------
+    advice : list
+        A list of `IndexAdvice`.
+
+    """
+
+    if not isinstance(database, PostgresqlDatabase):
+        raise RuntimeError('the index advisor requires a PostgreSQL database.')
+
+    expected = get_expected_indexes(models)
+    schemas = sorted(set(index.schema for index in expected))
+
+    live = get_live_indexes(database, schemas)
+    stats = get_table_stats(database, schemas)
+    statements = _get_statement_calls(database)
+
+    missing = []
+    for index in expected:
+
+        key = (index.schema, index.table)
+        if key not in stats or _is_covered(index.columns, live[key]):
+            continue
+
+        details = dict(reason=index.reason, **stats[key])
+
+        if statements is not None:
+            details['statement_calls'] = sum(
+                calls for query, calls in statements
+                if _mentions(query, (index.table, ) + index.columns))
+
+        missing.append(IndexAdvice('missing', index.schema, index.table, index.columns,
+                                   get_index_sql(index.schema, index.table, index.columns,
+                                                 unique=index.unique), details))
+
+    missing.sort(key=lambda advice: (-advice.details['seq_tup_read'],
+                                     advice.table, advice.columns))
+
+    unused = []
+    for (schema, table), indexes in sorted(live.items()):
+        if (schema, table) not in stats:
+            continue
+        for index in indexes:
+            if index.unique or index.primary or index.scans > 0 or index.size < min_size:
+                continue
+            unused.append(IndexAdvice('unused', schema, table, index.columns,
+                                      'DROP INDEX CONCURRENTLY {0}.{1};'.format(schema,
+                                                                                index.name),
+                                      {'name': index.name, 'size': index.size}))
+
+    return missing + unused
+
+
+def print_advice(advice):
+    """Prints the output of `advise` in a human-readable form."""
+
+    for item in advice:
+        if item.kind == 'missing':
+            comment = '-- missing: {0} ({1} seq scans, {2} rows read'.format(
+                item.details['reason'], item.details['seq_scan'], item.details['seq_tup_read'])
+            if 'statement_calls' in item.details:
+                comment += ', {0} statement calls'.format(item.details['statement_calls'])
+            print(comment + ')')
+            print(item.sql)
+        else:
+            print('-- unused: never scanned, {0:.1f} MB. Review before dropping.'.format(
+                item.details['size'] / 1024. ** 2))
+            print('-- ' + item.sql)
+
+
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Suggests indexes for the observatory '
+                                                 'models.')
+    parser.add_argument('--profile', default=None, help='The connection profile to use.')
+    args = parser.parse_args()
+
+    from sdssdb.observatory import database
+
+    if args.profile:
+        database.connect_from_config(args.profile)
+
+    print_advice(advise(database, database.get_models()))
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# rows.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Lightweight, read-only rows for large model queries.
+
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import threading
+
+from peewee import BaseModelCursorWrapper, ModelSelect
+
+from .identity_map import IdentityMapCursorWrapper
+
+
+__all__ = ('RowModelSelect', 'RowCursorWrapper', 'get_row_class')
+
+
+ROW_SLOTS = 'slots'
+
+_row_classes = {}
+_row_classes_lock = threading.Lock()
+
+
+def get_row_class(model, columns):
+    """Returns the read-only row class for ``model`` with ``columns``.
+
+    The class is a `collections.namedtuple` named ``<Model>Row``, so rows
+    have no per-instance ``__dict__``, support attribute and index access,
+    and cannot be modified. Classes are created once per model and set of
+    columns. The repr includes the ``pk`` and the model's ``print_fields``
+    and ``label``, if selected.
+
+    """
+
+    key = (model, tuple(columns))
+
+    row_class = _row_classes.get(key, None)
+    if row_class is not None:
+        return row_class
+
+    base = collections.namedtuple(model.__name__ + 'Row', columns, rename=True)
+
+    repr_fields = ['pk'] + list(getattr(model, 'print_fields', [])) + ['label']
+    repr_items = []
+    for name in repr_fields:
+        if name in base._fields and name not in [item[0] for item in repr_items]:
+            repr_items.append((name, base._fields.index(name)))
+
+    repr_format = '<{0}: {1}>'.format(
+        base.__name__,
+        ', '.join('{0}={{{1}!r}}'.format(name, index) for name, index in repr_items))
+
+    def __repr__(self):
+        return repr_format.format(*self)
+
+    row_class = type(base.__name__, (base, ), {'__slots__': (),
+                                               '__repr__': __repr__,
+                                               '__str__': __repr__,
+                                               '_model': model})
+
+    with _row_classes_lock:
+        return _row_classes.setdefault(key, row_class)
+
+
+class RowCursorWrapper(BaseModelCursorWrapper):
+    """Returns each row of a model query as a `get_row_class` instance."""
+
+    def initialize(self):
+
+        self._initialize_columns()
+
+        self.row_class = get_row_class(self.model, self.columns)
+        self.converter_items = [(index, converter)
+                                for index, converter in enumerate(self.converters)
+                                if converter is not None]
+
+    def process_row(self, row):
+
+        if len(self.converter_items) > 0:
+            row = list(row)
+            for index, converter in self.converter_items:
+                row[index] = converter(row[index])
+
+        return tuple.__new__(self.row_class, row)
+
+
+class RowModelSelect(ModelSelect):
+    """A `peewee.ModelSelect` with a read-only `.rows` result mode.
+
+    If the database of the model has an open identity-map session (see
+    `.ObservatoryDatabase.session`), selects without joins return the
+    instances in the session's `.IdentityMap`.
+
+    """
+
+    @ModelSelect.copy
+    def rows(self, as_rows=True):
+        """Returns the results as compact, read-only rows.
+
+        Each row is an instance of the class returned by `get_row_class`
+        for the selected columns, instead of a full model instance with
+        dirty tracking and a per-instance ``__dict__``. Foreign key columns
+        contain the pk of the related row. Use it for large read-only
+        scans. ::
+
+            for plate in Plate.select().where(Plate.plate_id > 8000).rows():
+                print(plate.plate_id, plate.design)
+
+        """
+
+        self._row_type = ROW_SLOTS if as_rows else None
+
+    def _get_cursor_wrapper(self, cursor):
+
+        if self._row_type == ROW_SLOTS:
+            return RowCursorWrapper(cursor, self.model, self._returning)
+
+        return super(RowModelSelect, self)._get_cursor_wrapper(cursor)
+
+    def _get_model_cursor_wrapper(self, cursor):
+
+        if len(self._from_list) == 1 and not self._joins:
+            get_session = getattr(self.model._meta.database, 'get_session', None)
+            identity_map = get_session() if get_session is not None else None
+            if identity_map is not None:
+                return IdentityMapCursorWrapper(cursor, self.model, self._returning,
+                                                identity_map)
+
+        return super(RowModelSelect, self)._get_model_cursor_wrapper(cursor)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# templates.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Parameterised model queries compiled to SQL once and run many times.
+
+
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import re
+import threading
+import weakref
+
+from peewee import Node, PostgresqlDatabase
+
+
+__all__ = ('Param', 'QueryTemplate')
+
+
+#: The names of the statements prepared in each connection.
+_prepared = weakref.WeakKeyDictionary()
+_prepared_lock = threading.Lock()
+
+#: The SQLSTATE of ``invalid_sql_statement_name``, raised by ``EXECUTE``
+#: if the statement is not prepared in the session.
+_INVALID_STATEMENT_NAME = '26000'
+
+
+def _get_pgcode(error):
+    """Returns the SQLSTATE of a psycopg2 error, or of one wrapped by peewee."""
+
+    return getattr(error, 'pgcode', None) or getattr(getattr(error, 'orig', None), 'pgcode', None)
+
+
+class Param(Node):
+    """A named placeholder in a `QueryTemplate`.
+
+    Use it as the right-hand side of a comparison with a field, e.g.,
+    ``DesignField.label == Param('label')``. The value passed for it is
+    converted with the field's ``db_value``, as in a normal query. Only
+    scalar values are supported; ``IN`` lists are not.
+
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __sql__(self, ctx):
+        ctx._values.append(_Slot(self.name, ctx.state.converter))
+        return ctx.literal(ctx.state.param or '?')
+
+
+class _Slot(object):
+    """A placeholder in the compiled parameters, with its converter."""
+
+    __slots__ = ('name', 'converter')
+
+    def __init__(self, name, converter):
+        self.name = name
+        self.converter = converter
+
+    def convert(self, value):
+        return self.converter(value) if self.converter else value
+
+
+class _CursorExecutor(object):
+    """Stands in for the database in ``Query.execute``, returning a cursor.
+
+    This reads an already executed cursor with the cursor wrapper of the
+    query, as peewee would, without running the query again.
+
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, query, **kwargs):
+        return self.cursor
+
+
+class _Compiled(object):
+    """The SQL and parameters of a template for a database."""
+
+    def __init__(self, query, sql, params):
+
+        self.query = query
+        self.sql = sql
+        self.params = params
+
+        self.names = set(param.name for param in params if isinstance(param, _Slot))
+
+        # Named after the SQL so that all the processes share the name.
+        self.statement_name = 'sdssdb_' + hashlib.sha1(sql.encode('utf-8')).hexdigest()[:16]
+
+        counter = iter(range(1, len(params) + 1))
+        self.prepare_sql = 'PREPARE {0} AS {1}'.format(
+            self.statement_name, re.sub(r'%s', lambda __: '$' + str(next(counter)), sql))
+        self.execute_sql = 'EXECUTE {0}{1}'.format(
+            self.statement_name,
+            ' ({0})'.format(', '.join(['%s'] * len(params))) if len(params) > 0 else '')
+
+    def bind(self, values):
+        """Returns the parameters with the placeholders replaced."""
+
+        missing = self.names - set(values)
+        if len(missing) > 0:
+            raise ValueError('missing template parameters: {0}.'.format(
+                ', '.join(sorted(missing))))
+
+        return [param.convert(values[param.name]) if isinstance(param, _Slot) else param
+                for param in self.params]
+
+    def wrap(self, cursor):
+        """Returns the results of ``cursor`` as the query would return them."""
+
+        return self.query.clone().execute(_CursorExecutor(cursor))
+
+
+class QueryTemplate(object):
+    """A model query declared once and run with different parameters.
+
+    Building a peewee query and generating its SQL has a cost on every
+    call that, for small lookups by an indexed key, can be larger than
+    running the query itself. A template builds the query and its SQL only
+    once per database, and each call only converts the parameters and
+    executes the SQL. ::
+
+        design_field_by_label = QueryTemplate(
+            lambda: DesignField.select().where(DesignField.label == Param('label')))
+
+        design_field = design_field_by_label.first(label='racen')
+
+    The results are read as the query built by ``build`` would return them
+    (model instances, unless ``build`` calls ``.dicts()`` or similar).
+
+    Parameters
+    ----------
+    build : callable
+        A function with no arguments that returns the query, using `Param`
+        for the values that change between calls. It is called on first use
+        so that it can reference models defined later in the module.
+    prepare : bool
+        If `True` and the database is PostgreSQL, the statement is
+        ``PREPARE``d once per connection and run with ``EXECUTE``, which
+        also avoids parsing and planning it on the server. Prepared
+        statements use a generic plan after a few executions, which is
+        adequate for lookups by a unique key. If the statement has been
+        dropped from the session (e.g., by ``DISCARD ALL``), it is prepared
+        again and the call retried once, unless the error happened inside
+        a transaction, which is then aborted.
+
+    """
+
+    def __init__(self, build, prepare=False):
+
+        self.build = build
+        self.prepare = prepare
+
+        self._model = None
+        self._compiled = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def compile(self, database=None):
+        """Returns the compiled template for ``database``.
+
+        If ``database`` is `None`, the database to which the model of the
+        query is bound is used. If the model is bound to a different
+        database later, the template is compiled again for it.
+
+        """
+
+        if self._model is None:
+            self._model = self.build().model
+
+        if database is None:
+            database = self._model._meta.database
+
+        compiled = self._compiled.get(database, None)
+        if compiled is None:
+            query = self.build()
+            sql, params = database.get_sql_context().sql(query).query()
+            compiled = _Compiled(query, sql, params)
+            with self._lock:
+                self._compiled[database] = compiled
+
+        return compiled
+
+    def _execute(self, values):
+
+        compiled = self.compile()
+        database = self._model._meta.database
+
+        params = compiled.bind(values)
+
+        if not self.prepare or not isinstance(database, PostgresqlDatabase):
+            return compiled, database.execute_sql(compiled.sql, params)
+
+        connection = database.connection()
+        try:
+            with _prepared_lock:
+                prepared = _prepared.setdefault(connection, set())
+        except TypeError:  # The connection does not support weak references.
+            return compiled, database.execute_sql(compiled.sql, params)
+
+        if compiled.statement_name not in prepared:
+            database.execute_sql(compiled.prepare_sql)
+            prepared.add(compiled.statement_name)
+
+        try:
+            return compiled, database.execute_sql(compiled.execute_sql, params)
+        except Exception as ee:
+            if _get_pgcode(ee) != _INVALID_STATEMENT_NAME:
+                raise
+            prepared.discard(compiled.statement_name)
+            if database.in_transaction():
+                raise
+
+        database.rollback()
+
+        database.execute_sql(compiled.prepare_sql)
+        prepared.add(compiled.statement_name)
+
+        return compiled, database.execute_sql(compiled.execute_sql, params)
+
+    def execute(self, **values):
+        """Runs the query and returns a list with the results."""
+
+        compiled, cursor = self._execute(values)
+
+        return list(compiled.wrap(cursor))
+
+    def first(self, **values):
+        """Runs the query and returns the first result, or `None`."""
+
+        compiled, cursor = self._execute(values)
+
+        for row in compiled.wrap(cursor):
+            return row
+
+        return None
+
+    def scalar(self, **values):
+        """Runs the query and returns the first column of the first row."""
+
+        compiled, cursor = self._execute(values)
+        row = cursor.fetchone()
+
+        return row[0] if row is not None else None
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# unit_of_work.py
+#
+# Created by agent on 18 Oct 2026.
+
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import threading
+import time
+
+from peewee import PostgresqlDatabase, sort_models
+
+
+__all__ = ('UnitOfWork', )
+
+
+class UnitOfWork(object):
+    """Buffers new model instances and inserts them in batches.
+
+    Instances are added with `.add` and inserted when `.flush` is called,
+    when the buffer reaches ``max_size`` instances, when an instance is
+    added and the oldest buffered instance is older than ``max_age``
+    seconds, or when the context manager exits without an exception.
+
+    A flush runs in a single transaction. Models are inserted in
+    dependency order (parents before children) using one multi-row
+    ``INSERT`` per model and set of columns. On PostgreSQL, the primary
+    keys of the new instances are reserved from the sequence of the table
+    with a single query before the insert, and assigned to the instances
+    and to any foreign keys that point to them, so children can reference
+    parents that are still in the buffer, e.g.::
+
+        with database.unit_of_work(max_size=500) as uow:
+            observation = uow.add(Observation(...))
+            exposure = uow.add(Exposure(observation=observation, ...))
+            uow.add(CameraFrame(exposure=exposure, ...))
+
+    The pks are not read back with ``RETURNING``, since the order of the
+    returned rows is not guaranteed to match the order of the inserted
+    ones. For other databases, or tables whose primary key has no
+    sequence, the instances are saved one at a time, still within one
+    transaction, unless all their primary keys are already set.
+
+    If the flush fails, the transaction is rolled back, the instances are
+    restored to their state before the flush, and they stay in the buffer,
+    so `.flush` can be called again.
+
+    Note that time-based flushing happens only when instances are added,
+    or when `.flush_if_due` is called; there is no background thread.
+
+    Parameters
+    ----------
+    database : `peewee.Database`
+        The database in which to insert the instances.
+    max_size : int or None
+        The number of buffered instances that triggers a flush.
+    max_age : float or None
+        The age, in seconds, of the oldest buffered instance after which
+        the buffer is flushed.
+
+    """
+
+    def __init__(self, database, max_size=1000, max_age=None):
+
+        self.database = database
+        self.max_size = max_size
+        self.max_age = max_age
+
+        self.n_flushes = 0
+        self.n_inserted = 0
+
+        self._buffer = []
+        self._buffered_ids = set()
+        self._first_added = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        if exc_type is None:
+            self.flush()
+        else:
+            self.discard()
+
+    def add(self, *instances):
+        """Adds instances to the buffer. Returns the last instance added."""
+
+        with self._lock:
+
+            for instance in instances:
+                if id(instance) in self._buffered_ids:
+                    continue
+                if len(self._buffer) == 0:
+                    self._first_added = time.time()
+                self._buffer.append(instance)
+                self._buffered_ids.add(id(instance))
+
+            if self.max_size is not None and len(self._buffer) >= self.max_size:
+                self.flush()
+            else:
+                self.flush_if_due()
+
+        return instances[-1] if len(instances) > 0 else None
+
+    def flush_if_due(self):
+        """Flushes the buffer if the oldest instance is older than ``max_age``."""
+
+        with self._lock:
+            if (self.max_age is not None and self._first_added is not None and
+                    time.time() - self._first_added >= self.max_age):
+                self.flush()
+
+    def discard(self):
+        """Empties the buffer without inserting anything."""
+
+        with self._lock:
+            self._buffer = []
+            self._buffered_ids = set()
+            self._first_added = None
+
+    def flush(self):
+        """Inserts all the buffered instances in a single transaction.
+
+        Returns the number of instances inserted.
+
+        """
+
+        with self._lock:
+
+            if len(self._buffer) == 0:
+                return 0
+
+            by_model = collections.OrderedDict()
+            for instance in self._buffer:
+                by_model.setdefault(type(instance), []).append(instance)
+
+            # The pks and foreign keys assigned during the flush are only
+            # valid if the transaction commits.
+            saved = [(instance, dict(instance.__data__), set(instance._dirty))
+                     for instance in self._buffer]
+
+            try:
+                with self.database.atomic():
+                    for model in sort_models(list(by_model.keys())):
+                        self._insert_model(model, by_model[model])
+            except Exception:
+                for instance, data, dirty in saved:
+                    instance.__data__.clear()
+                    instance.__data__.update(data)
+                    instance._dirty.clear()
+                    instance._dirty.update(dirty)
+                raise
+
+            n_inserted = len(self._buffer)
+
+            self.n_flushes += 1
+            self.n_inserted += n_inserted
+            self.discard()
+
+            return n_inserted
+
+    @staticmethod
+    def _resolve_foreign_keys(instance):
+        """Copies the pks of related instances into their foreign keys."""
+
+        for name, related in instance.__rel__.items():
+            field = instance._meta.fields[name]
+            value = getattr(related, field.rel_field.name)
+            if value is not None and instance.__data__.get(name) is None:
+                instance.__data__[name] = value
+
+    def _reserve_pks(self, model, n_pks):
+        """Reserves ``n_pks`` primary keys from the sequence of a table.
+
+        Returns `None` if the database is not PostgreSQL or the primary
+        key of ``model`` is not backed by a sequence.
+
+        """
+
+        if not isinstance(self.database, PostgresqlDatabase):
+            return None
+
+        table = '"{0}"'.format(model._meta.table_name)
+        if model._meta.schema:
+            table = '"{0}".{1}'.format(model._meta.schema, table)
+
+        sequence = self.database.execute_sql(
+            'SELECT pg_get_serial_sequence(%s, %s)',
+            (table, model._meta.primary_key.column_name)).fetchone()[0]
+
+        if sequence is None:
+            return None
+
+        cursor = self.database.execute_sql('SELECT nextval(%s) FROM generate_series(1, %s)',
+                                           (sequence, n_pks))
+
+        return [pk for (pk, ) in cursor.fetchall()]
+
+    def _insert_model(self, model, instances):
+        """Inserts the instances of a model, grouped by columns."""
+
+        for instance in instances:
+            self._resolve_foreign_keys(instance)
+
+        pk_field = model._meta.primary_key
+
+        # The rows returned by INSERT ... RETURNING are not guaranteed to be
+        # in the order of the VALUES, so the pks of new instances are
+        # reserved first and inserted explicitly.
+        if not model._meta.composite_key:
+            new = [instance for instance in instances
+                   if instance.__data__.get(pk_field.name) is None]
+            pks = self._reserve_pks(model, len(new)) if len(new) > 0 else []
+            if pks is None:
+                for instance in instances:
+                    instance.save(force_insert=True)
+                return
+            for instance, pk in zip(new, pks):
+                instance.__data__[pk_field.name] = pk
+
+        groups = collections.OrderedDict()
+        for instance in instances:
+            row = {model._meta.fields[name]: value
+                   for name, value in instance.__data__.items()}
+            groups.setdefault(tuple(sorted(field.name for field in row)), []).append(
+                (instance, row))
+
+        for group in groups.values():
+            model.insert_many([row for __, row in group]).execute()
+            for instance, __ in group:
+                instance._dirty.clear()
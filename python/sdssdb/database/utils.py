@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# utils.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Helpers shared by the modules that query the models.
+
+
+from __future__ import absolute_import, division, print_function
+
+import numbers
+
+from peewee import Case, DecimalField, FloatField, fn
+
+from sdssdb.core.compat import string_types
+
+
+__all__ = ('get_checksum_columns', 'get_pks')
+
+
+def get_pks(instances_or_pks):
+    """Returns a list of primary keys from instances or primary keys.
+
+    ``instances_or_pks`` can be a single model instance or primary key, or
+    an iterable (a list, a query, an array) of them, which can be mixed.
+
+    """
+
+    if (hasattr(instances_or_pks, 'pk') or
+            isinstance(instances_or_pks, (numbers.Integral, ) + string_types)):
+        instances_or_pks = [instances_or_pks]
+
+    return [int(getattr(value, 'pk', value)) for value in instances_or_pks]
+
+
+def get_checksum_columns(fields, where=None, scale=1000000):
+    """Returns aggregates that change when the values of ``fields`` change.
+
+    For each field, the expressions are the ``COUNT`` and the ``SUM`` of
+    its values, computed in the database. Floating point values are
+    rounded to integers after multiplying them by ``scale``, so that the
+    sums are exact and do not depend on the order in which the rows are
+    aggregated. The result can be compared with a stored one to detect
+    inserts, deletes, and updates without a timestamp column, but changes
+    smaller than ``1 / scale`` or that cancel out in the sum are missed.
+
+    Parameters
+    ----------
+    fields : list
+        The fields (or other integer or float expressions) to checksum.
+    where : `peewee.Expression` or None
+        If set, only the rows that match it are aggregated.
+    scale : int
+        The factor applied to floating point values before rounding.
+
+    Returns
+    -------
+    columns : list
+        A list of ``2 * len(fields)`` expressions to add to a select.
+
+    """
+
+    columns = []
+
+    for field in fields:
+
+        value = field
+        if isinstance(field, (FloatField, DecimalField)):
+            value = fn.ROUND(field * scale).cast('BIGINT')
+
+        if where is not None:
+            value = Case(None, [(where, value)])
+
+        columns += [fn.COUNT(value).coerce(False), fn.SUM(value).coerce(False)]
+
+    return columns
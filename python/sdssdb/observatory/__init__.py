@@ -4,6 +4,8 @@ import re
 from peewee import Model
 
 from ..database.database import ObservatoryDatabase
+from ..database.identity_map import get_pk_lookup
+from ..database.rows import RowModelSelect
 
 
 database = ObservatoryDatabase()
@@ -16,6 +18,45 @@ class BaseModel(Model):
     class Meta:
         database = database
 
+    @classmethod
+    def _get_session(cls):
+        """Returns the identity map of the current session, if any."""
+
+        get_session = getattr(cls._meta.database, 'get_session', None)
+
+        return get_session() if get_session is not None else None
+
+    @classmethod
+    def select(cls, *fields):
+        """Returns a select query, which supports the read-only ``.rows()`` mode.
+
+        See `sdssdb.database.rows.RowModelSelect.rows`.
+
+        """
+
+        is_default = not fields
+        if not fields:
+            fields = cls._meta.sorted_fields
+
+        return RowModelSelect(cls, fields, is_default=is_default)
+
+    @classmethod
+    def get(cls, *query, **filters):
+
+        identity_map = cls._get_session()
+        if identity_map is None or len(query) != 1 or len(filters) > 0:
+            return super(BaseModel, cls).get(*query, **filters)
+
+        pk = get_pk_lookup(cls, query[0])
+        if pk is None:
+            return super(BaseModel, cls).get(*query, **filters)
+
+        instance = identity_map.get(cls, pk)
+        if instance is None:
+            instance = identity_map.add(super(BaseModel, cls).get(*query))
+
+        return instance
+
     def __str__(self):
         """A custom repr for observatory models.
 
@@ -27,11 +68,11 @@ class BaseModel(Model):
 
         fields = ['pk={0!r}'.format(self.get_id())]
 
-        for extra_field in ['label']:
-            if extra_field not in self.print_fields:
-                self.print_fields.append(extra_field)
+        print_fields = list(self.print_fields)
+        if 'label' not in print_fields:
+            print_fields.append('label')
 
-        for ff in self.print_fields:
+        for ff in print_fields:
             if hasattr(self, ff):
                 fields.append('{0}={1!r}'.format(ff, getattr(self, ff)))
 
@@ -41,3 +82,8 @@ class BaseModel(Model):
 from . import mangadb, platedb  # noqa
 
 database.models.update({'mangadb': mangadb, 'platedb': platedb})
+
+# The models are bound to the database in their Meta. They only need to be
+# rebound if the profile selected on connection uses a snapshot.
+if database.snapshot is not None:
+    database.bind_models()
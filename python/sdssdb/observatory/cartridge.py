@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# cartridge.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Parsed, cached views of the broken fibers in each cartridge.
+
+
+from __future__ import absolute_import, division, print_function
+
+import re
+import threading
+import time
+import warnings
+
+import numpy
+
+from sdssdb.core.cache import LRUCache
+from sdssdb.core.metrics import registry
+
+from . import platedb
+
+
+__all__ = ('parse_broken_fibers', 'get_broken_fiber_mask', 'is_usable', 'get_cartridge_masks',
+           'usable_fibers', 'get_cartridges_with_broken_fibers', 'invalidate')
+
+
+_range_re = re.compile(r'^(\d+)-(\d+)$')
+
+
+def parse_broken_fibers(text):
+    """Parses a ``Cartridge.broken_fibers`` string into fiber ids.
+
+    Fiber ids can be separated by commas, semicolons, or whitespace, and
+    ranges can be given as ``first-last``. Tokens that cannot be parsed
+    are ignored with a warning.
+
+    Returns
+    -------
+    fiber_ids : `numpy.ndarray`
+        A sorted array of unique broken fiber ids.
+
+    """
+
+    if not text:
+        return numpy.zeros(0, dtype=numpy.int32)
+
+    fiber_ids = []
+    for token in re.split(r'[,;\s]+', text.strip()):
+        if token == '':
+            continue
+        elif token.isdigit():
+            fiber_ids.append(int(token))
+        elif _range_re.match(token):
+            first, last = map(int, _range_re.match(token).groups())
+            fiber_ids += range(first, last + 1)
+        else:
+            warnings.warn('cannot parse broken fiber {0!r}. Ignoring it.'.format(token),
+                          UserWarning)
+
+    return numpy.unique(numpy.array(fiber_ids, dtype=numpy.int32))
+
+
+#: Parsed masks, keyed by the ``broken_fibers`` text they were parsed from.
+_mask_cache = LRUCache(maxsize=256)
+registry.register_cache('broken_fiber_mask', _mask_cache)
+
+
+def get_broken_fiber_mask(text):
+    """Returns a boolean mask, indexed by fiber id, of the broken fibers.
+
+    The mask has length ``max(broken_fiber_id) + 1`` and is read-only.
+    Masks are cached by the text they were parsed from, so a changed
+    ``broken_fibers`` value is always parsed again.
+
+    """
+
+    def parse():
+        fiber_ids = parse_broken_fibers(text)
+        mask = numpy.zeros(fiber_ids.max() + 1 if len(fiber_ids) > 0 else 0, dtype=bool)
+        mask[fiber_ids] = True
+        mask.flags.writeable = False
+        return mask
+
+    return _mask_cache.get_or_set(text or '', parse)
+
+
+def is_usable(mask, fiber_ids):
+    """Returns a boolean array indicating which ``fiber_ids`` are usable."""
+
+    fiber_ids = numpy.asarray(fiber_ids, dtype=numpy.int64)
+
+    usable = numpy.ones(fiber_ids.shape, dtype=bool)
+    in_mask = (fiber_ids >= 0) & (fiber_ids < len(mask))
+    usable[in_mask] = ~mask[fiber_ids[in_mask]]
+
+    return usable
+
+
+class _CartridgeTable(object):
+    """A cached copy of the number and broken fibers of all cartridges.
+
+    Saving or deleting a `.Cartridge` instance invalidates the copy, but
+    bulk updates and changes made by other processes do not, so it is
+    also reloaded when it is older than ``ttl`` seconds.
+
+    """
+
+    def __init__(self, ttl=60.):
+
+        self.ttl = ttl
+        self.broken_fibers = None
+        self.loaded_at = None
+
+        self._lock = threading.Lock()
+
+    def load(self):
+
+        Cartridge = platedb.Cartridge
+
+        rows = list(Cartridge
+                    .select(Cartridge.number, Cartridge.broken_fibers)
+                    .where(Cartridge.number.is_null(False))
+                    .tuples())
+
+        broken_fibers = dict(rows)
+
+        with self._lock:
+            self.broken_fibers = broken_fibers
+            self.loaded_at = time.time()
+
+        return broken_fibers
+
+    def get(self, refresh=False):
+
+        with self._lock:
+            broken_fibers, loaded_at = self.broken_fibers, self.loaded_at
+
+        if (refresh or broken_fibers is None or
+                (self.ttl is not None and time.time() - loaded_at >= self.ttl)):
+            broken_fibers = self.load()
+
+        return broken_fibers
+
+    def invalidate(self):
+
+        with self._lock:
+            self.broken_fibers = None
+
+
+_cartridge_table = _CartridgeTable()
+
+
+def invalidate():
+    """Invalidates the cached cartridge table.
+
+    Called automatically when a `.Cartridge` is saved or deleted.
+
+    """
+
+    _cartridge_table.invalidate()
+
+
+def get_cartridge_masks(refresh=False):
+    """Returns a dictionary of cartridge number to broken fiber mask.
+
+    All cartridges are loaded with a single query, which is cached until
+    `invalidate` is called, ``refresh=True``, or for at most one minute.
+
+    """
+
+    return {number: get_broken_fiber_mask(text)
+            for number, text in _cartridge_table.get(refresh=refresh).items()}
+
+
+def usable_fibers(cartridge_number, fiber_ids, refresh=False):
+    """Returns which of ``fiber_ids`` are usable on a cartridge.
+
+    Parameters
+    ----------
+    cartridge_number : int
+        The cartridge number (not its pk).
+    fiber_ids : array_like
+        The fiber ids to check.
+    refresh : bool
+        Whether to reload the cartridge table from the database.
+
+    Returns
+    -------
+    usable : `numpy.ndarray`
+        A boolean array with the same shape as ``fiber_ids``.
+
+    """
+
+    broken_fibers = _cartridge_table.get(refresh=refresh)
+
+    if cartridge_number not in broken_fibers:
+        raise ValueError('cartridge {0} not found.'.format(cartridge_number))
+
+    return is_usable(get_broken_fiber_mask(broken_fibers[cartridge_number]), fiber_ids)
+
+
+def get_cartridges_with_broken_fibers(min_broken, refresh=False):
+    """Returns the numbers of the cartridges with more than ``min_broken`` broken fibers."""
+
+    masks = get_cartridge_masks(refresh=refresh)
+
+    return sorted(number for number, mask in masks.items() if mask.sum() > min_broken)
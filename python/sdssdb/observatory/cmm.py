@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# cmm.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Vectorised analysis of the CMM measurements of plate holes.
+
+
+from __future__ import absolute_import, division, print_function
+
+import numpy
+
+from sdssdb.database.utils import get_pks
+
+from . import platedb
+
+
+__all__ = ('get_hole_measurements', 'fit_transformation', 'analyse_cmm')
+
+
+HOLE_MEAS_COLUMNS = ('cmm_meas', 'plate_hole', 'nomx', 'nomy', 'nomdia',
+                     'measx', 'measy', 'diaerr', 'residx', 'residy', 'residr',
+                     'qpresidx', 'qpresidy', 'qpresidr')
+
+ANALYSIS_DTYPE = [('cmm_meas_pk', numpy.int64),
+                  ('n_holes', numpy.int64),
+                  ('mean_residx', numpy.float64),
+                  ('mean_residy', numpy.float64),
+                  ('rms_residr', numpy.float64),
+                  ('max_residr', numpy.float64),
+                  ('rms_diaerr', numpy.float64),
+                  ('max_diaerr', numpy.float64),
+                  ('frac_out_of_tolerance', numpy.float64),
+                  ('fitoffsetx', numpy.float64),
+                  ('fitoffsety', numpy.float64),
+                  ('fitrot', numpy.float64),
+                  ('fitscale', numpy.float64),
+                  ('fitqpmag', numpy.float64),
+                  ('fitqpang', numpy.float64),
+                  ('rms_fit_resid', numpy.float64)]
+
+
+def get_hole_measurements(cmm_meas):
+    """Returns the `.HoleMeas` for one or many `.CmmMeas` as column arrays.
+
+    Parameters
+    ----------
+    cmm_meas : `.CmmMeas` or int or list
+        One or a list of `.CmmMeas` instances or pks.
+
+    Returns
+    -------
+    columns : dict
+        A dictionary of column name to `numpy.ndarray`. The foreign key
+        columns ``cmm_meas`` and ``plate_hole`` contain pks. Null values
+        are returned as NaN.
+
+    """
+
+    HoleMeas = platedb.HoleMeas
+
+    fields = [getattr(HoleMeas, column) for column in HOLE_MEAS_COLUMNS]
+    query = (HoleMeas
+             .select(*fields)
+             .where(HoleMeas.cmm_meas << get_pks(cmm_meas))
+             .order_by(HoleMeas.cmm_meas, HoleMeas.pk))
+
+    data = numpy.array(list(query.tuples()), dtype=numpy.float64).reshape(-1, len(fields))
+
+    columns = {column: data[:, ii] for ii, column in enumerate(HOLE_MEAS_COLUMNS)}
+    for column in ('cmm_meas', 'plate_hole'):
+        columns[column] = numpy.where(numpy.isnan(columns[column]), -1,
+                                      columns[column]).astype(numpy.int64)
+
+    return columns
+
+
+def fit_transformation(nomx, nomy, measx, measy, groups=None, n_groups=None):
+    """Fits offset, rotation, scale, and quadrupole terms to measured holes.
+
+    The model is ::
+
+        measx = offsetx + s (cos(t) x - sin(t) y) + q (cos(2p) x + sin(2p) y)
+        measy = offsety + s (sin(t) x + cos(t) y) + q (sin(2p) x - cos(2p) y)
+
+    where ``(x, y)`` are the nominal positions, ``s`` the scale, ``t`` the
+    rotation, and ``q`` and ``p`` the quadrupole magnitude and angle. The
+    model is linear in ``s cos(t)``, ``s sin(t)``, ``q cos(2p)``, and
+    ``q sin(2p)``, so all groups are fitted at once by accumulating and
+    solving the normal equations of each group. Holes with non-finite
+    values are ignored.
+
+    Parameters
+    ----------
+    nomx, nomy, measx, measy : array_like
+        The nominal and measured positions of the holes.
+    groups : array_like or None
+        An integer array, with values from 0 to ``n_groups - 1``, that
+        assigns each hole to an independent fit. If `None`, all holes are
+        fitted together.
+    n_groups : int or None
+        The number of groups. Defaults to ``groups.max() + 1``.
+
+    Returns
+    -------
+    fit : `numpy.ndarray`
+        An array of shape ``(n_groups, 6)`` with the offset in x and y, the
+        rotation in degrees, the scale, and the quadrupole magnitude and
+        angle (in degrees) for each group.
+    residuals : `numpy.ndarray`
+        An array of shape ``(n_holes, 2)`` with the residuals in x and y
+        after the fit.
+
+    """
+
+    nomx, nomy, measx, measy = (numpy.asarray(value, dtype=numpy.float64)
+                                for value in (nomx, nomy, measx, measy))
+
+    if groups is None:
+        groups = numpy.zeros(len(nomx), dtype=numpy.intp)
+    groups = numpy.asarray(groups, dtype=numpy.intp)
+    if n_groups is None:
+        n_groups = groups.max() + 1 if len(groups) > 0 else 0
+
+    valid = numpy.isfinite(nomx) & numpy.isfinite(nomy) & \
+        numpy.isfinite(measx) & numpy.isfinite(measy)
+
+    zeros = numpy.zeros_like(nomx)
+    ones = numpy.ones_like(nomx)
+
+    # Design matrices for the x and y equations, with parameters
+    # (offsetx, offsety, s cos(t), s sin(t), q cos(2p), q sin(2p)).
+    design_x = numpy.array([ones, zeros, nomx, -nomy, nomx, nomy]).T
+    design_y = numpy.array([zeros, ones, nomy, nomx, -nomy, nomx]).T
+
+    design_x[~valid] = 0
+    design_y[~valid] = 0
+    obs_x = numpy.where(valid, measx, 0)
+    obs_y = numpy.where(valid, measy, 0)
+
+    normal = numpy.zeros((n_groups, 6, 6))
+    numpy.add.at(normal, groups, numpy.einsum('ni,nj->nij', design_x, design_x) +
+                 numpy.einsum('ni,nj->nij', design_y, design_y))
+
+    rhs = numpy.zeros((n_groups, 6))
+    numpy.add.at(rhs, groups, design_x * obs_x[:, numpy.newaxis] +
+                 design_y * obs_y[:, numpy.newaxis])
+
+    params = numpy.full((n_groups, 6), numpy.nan)
+    solvable = numpy.linalg.matrix_rank(normal) == 6
+    if solvable.any():
+        params[solvable] = numpy.linalg.solve(normal[solvable],
+                                              rhs[solvable][..., numpy.newaxis])[..., 0]
+
+    hole_params = params[groups]
+    residuals = numpy.array([measx - (design_x * hole_params).sum(axis=1),
+                             measy - (design_y * hole_params).sum(axis=1)]).T
+    residuals[~valid] = numpy.nan
+
+    offsetx, offsety, scos, ssin, qcos, qsin = params.T
+
+    fit = numpy.array([offsetx, offsety,
+                       numpy.degrees(numpy.arctan2(ssin, scos)),
+                       numpy.hypot(scos, ssin),
+                       numpy.hypot(qcos, qsin),
+                       numpy.degrees(numpy.arctan2(qsin, qcos)) / 2.]).T
+
+    return fit, residuals
+
+
+def _group_reduce(values, groups, n_groups, func):
+    """Applies a ufunc reduction per group, ignoring non-finite values."""
+
+    mask = numpy.isfinite(values)
+    initial = {numpy.add: 0., numpy.fmax: -numpy.inf}[func]
+
+    result = numpy.full(n_groups, initial)
+    func.at(result, groups[mask], values[mask])
+
+    return result
+
+
+def analyse_cmm(cmm_meas, position_tolerance, diameter_tolerance=None):
+    """Computes residual statistics and refits the CMM transformation.
+
+    Parameters
+    ----------
+    cmm_meas : `.CmmMeas` or int or list
+        One or a list of `.CmmMeas` instances or pks. The hole
+        measurements for all of them are retrieved in a single query.
+    position_tolerance : float
+        The maximum acceptable radial residual ``residr``, in the same
+        units as the hole positions.
+    diameter_tolerance : float or None
+        The maximum acceptable absolute ``diaerr``. If `None`, the
+        diameter is not considered when computing the fraction of holes
+        out of tolerance.
+
+    Returns
+    -------
+    analysis : `numpy.ndarray`
+        A structured array with dtype ``ANALYSIS_DTYPE`` and one row per
+        `.CmmMeas`, in the same order as the input. The ``fit*`` fields
+        can be compared with the values stored in `.CmmMeas`; see
+        `fit_transformation` for their definitions.
+
+    """
+
+    cmm_pks = get_pks(cmm_meas)
+    columns = get_hole_measurements(cmm_pks)
+
+    n_groups = len(cmm_pks)
+    sorter = numpy.argsort(cmm_pks)
+    groups = sorter[numpy.searchsorted(cmm_pks, columns['cmm_meas'], sorter=sorter)] \
+        if n_groups > 0 else numpy.zeros(0, dtype=numpy.intp)
+
+    residr = numpy.where(numpy.isfinite(columns['residr']), columns['residr'],
+                         numpy.hypot(columns['residx'], columns['residy']))
+    diaerr = numpy.abs(columns['diaerr'])
+
+    out_of_tolerance = residr > position_tolerance
+    if diameter_tolerance is not None:
+        out_of_tolerance |= diaerr > diameter_tolerance
+
+    fit, fit_residuals = fit_transformation(columns['nomx'], columns['nomy'],
+                                            columns['measx'], columns['measy'],
+                                            groups=groups, n_groups=n_groups)
+    fit_resid2 = (fit_residuals ** 2).sum(axis=1)
+
+    n_holes = numpy.bincount(groups, minlength=n_groups)
+    n_residr = _group_reduce(numpy.isfinite(residr).astype(float), groups, n_groups, numpy.add)
+    n_residx = _group_reduce(numpy.isfinite(columns['residx']).astype(float),
+                             groups, n_groups, numpy.add)
+    n_residy = _group_reduce(numpy.isfinite(columns['residy']).astype(float),
+                             groups, n_groups, numpy.add)
+    n_diaerr = _group_reduce(numpy.isfinite(diaerr).astype(float), groups, n_groups, numpy.add)
+    n_fit = _group_reduce(numpy.isfinite(fit_resid2).astype(float), groups, n_groups, numpy.add)
+
+    analysis = numpy.zeros(n_groups, dtype=ANALYSIS_DTYPE)
+    analysis['cmm_meas_pk'] = cmm_pks
+    analysis['n_holes'] = n_holes
+
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+
+        analysis['mean_residx'] = _group_reduce(columns['residx'], groups,
+                                                n_groups, numpy.add) / n_residx
+        analysis['mean_residy'] = _group_reduce(columns['residy'], groups,
+                                                n_groups, numpy.add) / n_residy
+        analysis['rms_residr'] = numpy.sqrt(_group_reduce(residr ** 2, groups,
+                                                          n_groups, numpy.add) / n_residr)
+        analysis['max_residr'] = numpy.where(n_residr > 0,
+                                             _group_reduce(residr, groups, n_groups, numpy.fmax),
+                                             numpy.nan)
+        analysis['rms_diaerr'] = numpy.sqrt(_group_reduce(diaerr ** 2, groups,
+                                                          n_groups, numpy.add) / n_diaerr)
+        analysis['max_diaerr'] = numpy.where(n_diaerr > 0,
+                                             _group_reduce(diaerr, groups, n_groups, numpy.fmax),
+                                             numpy.nan)
+        analysis['frac_out_of_tolerance'] = \
+            numpy.bincount(groups, weights=out_of_tolerance, minlength=n_groups) / n_holes
+        analysis['rms_fit_resid'] = numpy.sqrt(_group_reduce(fit_resid2, groups,
+                                                             n_groups, numpy.add) / n_fit)
+
+    for ii, name in enumerate(('fitoffsetx', 'fitoffsety', 'fitrot',
+                               'fitscale', 'fitqpmag', 'fitqpang')):
+        analysis[name] = fit[:, ii]
+
+    return analysis
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# history.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Helpers to query status history tables as of a certain time.
+
+
+from __future__ import absolute_import, division, print_function
+
+import datetime
+
+from peewee import PostgresqlDatabase, fn
+
+from sdssdb.database.index_advisor import get_live_indexes
+from sdssdb.database.utils import get_pks
+
+
+__all__ = ('as_of', 'status_as_of', 'get_history_index_sql')
+
+
+def as_of(model, entity_field, timestamp=None, entities=None, timestamp_field=None):
+    """Returns a query with the latest history row per entity at a time.
+
+    On PostgreSQL the query uses ``DISTINCT ON (entity)``, which can be
+    resolved with an index scan over ``(entity, timestamp)``. For other
+    databases a ``row_number()`` window function is used instead. Ties in
+    the timestamp are resolved using the history row with the largest pk.
+
+    Parameters
+    ----------
+    model : `peewee.Model`
+        The history model, e.g., `.PlateCompletionStatusHistory`.
+    entity_field : `peewee.ForeignKeyField`
+        The field in ``model`` pointing to the entity whose status is
+        tracked (e.g., ``PlateCompletionStatusHistory.plate``).
+    timestamp : `datetime.datetime` or None
+        The time at which to resolve the status. If `None`, the current
+        UTC time is used.
+    entities : list or None
+        A list of entity instances or pks to which to restrict the query.
+        If `None`, all entities with history at ``timestamp`` are returned.
+    timestamp_field : `peewee.Field` or None
+        The timestamp field. Defaults to ``model.timestamp``.
+
+    Returns
+    -------
+    query : `peewee.ModelSelect`
+        A query returning one ``model`` instance per entity.
+
+    """
+
+    if timestamp is None:
+        timestamp = datetime.datetime.utcnow()
+
+    if timestamp_field is None:
+        timestamp_field = model.timestamp
+
+    conditions = [timestamp_field <= timestamp]
+    if entities is not None:
+        conditions.append(entity_field << get_pks(entities))
+
+    if isinstance(model._meta.database, PostgresqlDatabase):
+        return (model
+                .select()
+                .where(*conditions)
+                .distinct(entity_field)
+                .order_by(entity_field, timestamp_field.desc(), model._meta.primary_key.desc()))
+
+    row_number = fn.ROW_NUMBER().over(partition_by=[entity_field],
+                                      order_by=[timestamp_field.desc(),
+                                                model._meta.primary_key.desc()])
+
+    latest = (model
+              .select(model._meta.primary_key.alias('history_pk'),
+                      row_number.alias('row_number'))
+              .where(*conditions)
+              .alias('latest'))
+
+    return (model
+            .select()
+            .join(latest, on=((model._meta.primary_key == latest.c.history_pk) &
+                              (latest.c.row_number == 1)))
+            .order_by(entity_field))
+
+
+def status_as_of(model, entity_field, status_field, timestamp=None, entities=None):
+    """Returns a mapping of entity pk to status pk at a given time.
+
+    All the statuses are resolved with a single query. See `as_of` for
+    details on the parameters.
+
+    """
+
+    query = as_of(model, entity_field, timestamp=timestamp, entities=entities)
+
+    return dict(query.select(entity_field, status_field).tuples())
+
+
+def get_history_index_sql(model, entity_field, timestamp_field=None):
+    """Checks whether a history table is indexed for as-of queries.
+
+    Looks for a live index whose leading columns are ``(entity,
+    timestamp)``. This is the access pattern used by `as_of`. For a
+    review of all the models, see `sdssdb.database.index_advisor`.
+
+    Returns
+    -------
+    sql : str or None
+        `None` if a suitable index exists, otherwise the ``CREATE INDEX``
+        statement that would create it.
+
+    """
+
+    if timestamp_field is None:
+        timestamp_field = model.timestamp
+
+    database = model._meta.database
+    if not isinstance(database, PostgresqlDatabase):
+        raise RuntimeError('the index advisor requires a PostgreSQL database.')
+
+    schema = model._meta.schema or 'public'
+    table = model._meta.table_name
+    columns = (entity_field.column_name, timestamp_field.column_name)
+
+    for index in get_live_indexes(database, [schema])[(schema, table)]:
+        if index.columns[:2] == columns:
+            return None
+
+    return ('CREATE INDEX CONCURRENTLY {table}_{0}_{1}_idx ON {schema}.{table} '
+            'USING btree ({0}, {1} DESC);'.format(*columns, schema=schema, table=table))
@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# hole_cache.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# A versioned, memory-mapped columnar cache of the plate hole catalog.
+
+
+from __future__ import absolute_import, division, print_function
+
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import warnings
+
+import numpy
+from peewee import fn
+
+from sdssdb.database.utils import get_checksum_columns
+
+from . import platedb
+
+
+__all__ = ('PlateHoleCache', 'export_plate_holes', 'get_plate_hole_cache',
+           'get_database_stamp', 'COLUMNS')
+
+
+#: The cached columns and their dtypes. Null floats are stored as NaN. Null
+#: integers are masked: they are stored as -1, with the mask of each integer
+#: column saved as ``<column>_null.npy``.
+COLUMNS = (('pk', numpy.int64),
+           ('plate_holes_file_pk', numpy.int64),
+           ('catalog_object_pk', numpy.int64),
+           ('apogee_target1', numpy.int64),
+           ('apogee_target2', numpy.int64),
+           ('tmass_j', numpy.float64),
+           ('tmass_h', numpy.float64),
+           ('tmass_k', numpy.float64),
+           ('xfocal', numpy.float64),
+           ('yfocal', numpy.float64))
+
+_INT_NULL = -1
+
+
+def get_database_stamp(checksum=True):
+    """Returns the number of plate holes, their maximum pk, and a checksum.
+
+    The checksum (see `~sdssdb.database.utils.get_checksum_columns`) covers
+    all the cached columns, so that updates to existing rows also make
+    the cache stale. It requires a scan of the table, so it can be left out
+    with ``checksum=False``, in which case the stamp only has the
+    ``count`` and ``max_pk``.
+
+    """
+
+    PlateHole = platedb.PlateHole
+
+    columns = [fn.COUNT(PlateHole.pk), fn.MAX(PlateHole.pk)]
+    if checksum:
+        columns += get_checksum_columns([PlateHole._meta.columns[name]
+                                         for name, __ in COLUMNS[1:]])
+
+    row = PlateHole.select(*columns).tuples().get()
+
+    stamp = {'count': row[0], 'max_pk': row[1]}
+    if checksum:
+        # Sums may be returned as Decimal; store plain integers in JSON.
+        stamp['checksum'] = [None if value is None else int(value) for value in row[2:]]
+
+    return stamp
+
+
+def _to_column(values, dtype):
+    """Converts a list of values, which may contain `None`, to an array."""
+
+    if numpy.dtype(dtype).kind == 'f':
+        return numpy.array(values, dtype=dtype)
+
+    return numpy.array([_INT_NULL if value is None else value for value in values], dtype=dtype)
+
+
+def _to_null_mask(values):
+    """Returns a boolean array that is `True` where ``values`` is `None`."""
+
+    return numpy.array([value is None for value in values], dtype=bool)
+
+
+def export_plate_holes(path, batch_size=100000, keep=2):
+    """Exports the plate holes to a new version of the columnar cache.
+
+    Each column is written as a ``.npy`` file in a new version directory
+    inside ``path``, along with the permutation that sorts the rows by
+    ``catalog_object_pk``. Rows are read in pages of ``batch_size``
+    ordered by pk, and only up to the maximum pk at the time the export
+    started, so that the refresh stamp matches the data exported. Once
+    written, the version becomes the current one; processes that have the
+    previous version open are not affected.
+
+    Parameters
+    ----------
+    path : str
+        The root directory of the cache.
+    batch_size : int
+        Number of rows to read per query.
+    keep : int
+        Number of versions to keep, including the new one. The new and
+        the current versions are never removed.
+
+    Returns
+    -------
+    cache : `PlateHoleCache`
+        The new version of the cache.
+
+    """
+
+    PlateHole = platedb.PlateHole
+
+    path = os.path.realpath(os.path.expanduser(path))
+    if not os.path.exists(path):
+        os.makedirs(path)
+
+    stamp = get_database_stamp()
+
+    fields = [PlateHole._meta.columns[name] for name, __ in COLUMNS]
+    batches = {name: [] for name, __ in COLUMNS}
+    null_batches = {name: [] for name, dtype in COLUMNS if numpy.dtype(dtype).kind == 'i'}
+
+    last_pk = -1
+    n_rows = 0
+    while stamp['max_pk'] is not None:
+
+        rows = list(PlateHole
+                    .select(*fields)
+                    .where((PlateHole.pk > last_pk) & (PlateHole.pk <= stamp['max_pk']))
+                    .order_by(PlateHole.pk)
+                    .limit(batch_size)
+                    .tuples())
+
+        if len(rows) == 0:
+            break
+
+        for (name, dtype), values in zip(COLUMNS, zip(*rows)):
+            batches[name].append(_to_column(values, dtype))
+            if name in null_batches:
+                null_batches[name].append(_to_null_mask(values))
+
+        last_pk = rows[-1][0]
+        n_rows += len(rows)
+
+    tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=path)
+
+    try:
+
+        for name, dtype in COLUMNS:
+            column = (numpy.concatenate(batches.pop(name)) if n_rows > 0
+                      else numpy.zeros(0, dtype=dtype))
+            null = None
+            if name in null_batches:
+                null = (numpy.concatenate(null_batches.pop(name)) if n_rows > 0
+                        else numpy.zeros(0, dtype=bool))
+                numpy.save(os.path.join(tmp_dir, name + '_null.npy'), null)
+            if name == 'catalog_object_pk':
+                # Rows with a null catalogue object are left out of the index.
+                valid = numpy.nonzero(~null)[0]
+                order = valid[numpy.argsort(column[valid], kind='mergesort')]
+                numpy.save(os.path.join(tmp_dir, 'catalog_object_pk_order.npy'), order)
+                numpy.save(os.path.join(tmp_dir, 'catalog_object_pk_sorted.npy'), column[order])
+            numpy.save(os.path.join(tmp_dir, name + '.npy'), column)
+
+        # The stamp does not change with every update, and a version with
+        # the same stamp may be open, so the name always gets a unique suffix.
+        digest = hashlib.sha1(json.dumps(stamp, sort_keys=True).encode()).hexdigest()
+        version = 'v{0}_{1}_{2}_{3}'.format(stamp['max_pk'], stamp['count'], digest[:12],
+                                            os.path.basename(tmp_dir)[len('.tmp-'):])
+
+        meta = {'version': version,
+                'stamp': stamp,
+                'n_rows': n_rows,
+                'columns': [name for name, __ in COLUMNS],
+                'created': datetime.datetime.utcnow().isoformat()}
+
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as fd:
+            json.dump(meta, fd)
+
+        os.rename(tmp_dir, os.path.join(path, version))
+
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # Switch the pointer to the current version atomically.
+    current_tmp = os.path.join(path, '.current.tmp')
+    with open(current_tmp, 'w') as fd:
+        fd.write(version)
+    os.rename(current_tmp, os.path.join(path, 'current'))
+
+    # Another export may have made its own version current in the meantime.
+    with open(os.path.join(path, 'current')) as fd:
+        current = fd.read().strip()
+
+    versions = sorted((os.path.getmtime(os.path.join(path, name)), name)
+                      for name in os.listdir(path)
+                      if name.startswith('v') and os.path.isdir(os.path.join(path, name)))
+    for __, name in versions[:-max(keep, 1)]:
+        if name not in (version, current):
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+    return PlateHoleCache(path, version=version)
+
+
+class PlateHoleCache(object):
+    """A read-only, memory-mapped version of the plate hole cache.
+
+    Columns are loaded lazily with ``mmap_mode='r'``, so any number of
+    processes can open the same version and share the pages through the
+    OS page cache without copying. Access columns as ``cache['tmass_j']``.
+    Integer columns are returned as masked arrays in which nulls are
+    masked.
+
+    Parameters
+    ----------
+    path : str
+        The root directory of the cache.
+    version : str or None
+        The version to open. Defaults to the current one.
+
+    """
+
+    def __init__(self, path, version=None):
+
+        self.path = os.path.realpath(os.path.expanduser(path))
+
+        if version is None:
+            current = os.path.join(self.path, 'current')
+            if not os.path.exists(current):
+                raise ValueError('no plate hole cache found in {0!r}.'.format(self.path))
+            with open(current) as fd:
+                version = fd.read().strip()
+
+        self.version = version
+        self.version_dir = os.path.join(self.path, version)
+
+        with open(os.path.join(self.version_dir, 'meta.json')) as fd:
+            self.meta = json.load(fd)
+
+        self._columns = {}
+
+    def __repr__(self):
+        return '<PlateHoleCache (version={0!r}, n_rows={1})>'.format(self.version, len(self))
+
+    def __len__(self):
+        return self.meta['n_rows']
+
+    def __getitem__(self, name):
+
+        if name not in self._columns:
+            column = numpy.load(os.path.join(self.version_dir, name + '.npy'), mmap_mode='r')
+            null_path = os.path.join(self.version_dir, name + '_null.npy')
+            if os.path.exists(null_path):
+                column = numpy.ma.array(column, mask=numpy.load(null_path, mmap_mode='r'),
+                                        copy=False)
+            self._columns[name] = column
+
+        return self._columns[name]
+
+    @property
+    def columns(self):
+        return list(self.meta['columns'])
+
+    @property
+    def stamp(self):
+        return self.meta['stamp']
+
+    def is_stale(self, full=False):
+        """Checks the refresh stamp against the database.
+
+        By default only the number of rows and the maximum pk are
+        compared, which detects new and deleted rows. With ``full=True``
+        the checksum of the cached columns is compared too, which also
+        detects updates to existing rows but requires a scan of the table.
+
+        """
+
+        if full:
+            return get_database_stamp() != self.stamp
+
+        stamp = get_database_stamp(checksum=False)
+
+        return any(stamp[key] != self.stamp[key] for key in stamp)
+
+    def find(self, catalog_object_pks):
+        """Finds the rows for a list of ``catalog_object_pk``.
+
+        A catalogue object can have holes in several plates, so each
+        requested value can match zero or more rows. The search uses the
+        sorted index and does not scan the columns.
+
+        Returns
+        -------
+        query_index, row_index : `numpy.ndarray`
+            For each match, the index of the value in ``catalog_object_pks``
+            and the index of the matched row in the cache columns.
+
+        """
+
+        values = numpy.atleast_1d(numpy.asarray(catalog_object_pks, dtype=numpy.int64))
+
+        sorted_pks = self['catalog_object_pk_sorted']
+        left = numpy.searchsorted(sorted_pks, values, side='left')
+        right = numpy.searchsorted(sorted_pks, values, side='right')
+
+        counts = right - left
+        query_index = numpy.repeat(numpy.arange(len(values)), counts)
+
+        # Positions in the sorted index of each match.
+        offsets = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        sorted_index = numpy.repeat(left, counts) + offsets
+
+        return query_index, numpy.asarray(self['catalog_object_pk_order'][sorted_index])
+
+    def get(self, catalog_object_pks, columns=None):
+        """Returns the cached columns for a list of ``catalog_object_pk``.
+
+        Returns
+        -------
+        data : `numpy.ma.MaskedArray`
+            A masked structured array with one row per match, with a
+            ``query_index`` field and the requested ``columns`` (all of
+            them by default). Null integers are masked.
+
+        """
+
+        columns = columns or self.columns
+
+        query_index, row_index = self.find(catalog_object_pks)
+
+        dtype = [('query_index', numpy.int64)] + [(name, self[name].dtype) for name in columns]
+        data = numpy.ma.zeros(len(row_index), dtype=dtype)
+
+        data['query_index'] = query_index
+        for name in columns:
+            data[name] = self[name][row_index]
+
+        return data
+
+
+def get_plate_hole_cache(path, refresh=False, check=True, full_check=False):
+    """Returns the current version of the cache, exporting a new one if needed.
+
+    Parameters
+    ----------
+    path : str
+        The root directory of the cache.
+    refresh : bool
+        If `True`, a new version is exported if the cache is stale or does
+        not exist. Otherwise, a stale cache is returned with a warning.
+    check : bool
+        Whether to check the number of rows and maximum pk against the
+        database. See `PlateHoleCache.is_stale`.
+    full_check : bool
+        Whether to also check the checksum of the cached columns, which
+        detects updated rows but scans the table.
+
+    """
+
+    try:
+        cache = PlateHoleCache(path)
+    except ValueError:
+        if not refresh:
+            raise
+        return export_plate_holes(path)
+
+    if (check or full_check) and cache.is_stale(full=full_check):
+        if refresh:
+            return export_plate_holes(path)
+        warnings.warn('the plate hole cache in {0!r} is stale.'.format(cache.path), UserWarning)
+
+    return cache
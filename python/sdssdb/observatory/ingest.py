@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# ingest.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# A parallel pipeline to bulk load plate hole and plugmap files.
+
+
+from __future__ import absolute_import, division, print_function
+
+import multiprocessing
+import threading
+import time
+import traceback
+
+from . import platedb
+
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+__all__ = ('IngestPipeline', 'IngestStats', 'PLATE_HOLES', 'PLUGMAPS')
+
+
+#: Parent model, child model, and child foreign key name for each file type.
+PLATE_HOLES = (platedb.PlateHolesFile, platedb.PlateHole, 'plate_holes_file')
+PLUGMAPS = (platedb.PlPlugmapM, platedb.Fiber, 'pl_plugmap_m')
+
+
+class IngestStats(object):
+    """Throughput statistics for an `IngestPipeline` run."""
+
+    def __init__(self):
+
+        self.n_files = 0
+        self.n_rows = 0
+        self.parse_time = 0.
+        self.write_time = 0.
+        self.elapsed = 0.
+        self.errors = []
+
+        self._lock = threading.Lock()
+
+    def add(self, n_rows=0, parse_time=0., write_time=0.):
+
+        with self._lock:
+            self.n_files += 1
+            self.n_rows += n_rows
+            self.parse_time += parse_time
+            self.write_time += write_time
+
+    def add_error(self, path, error):
+
+        with self._lock:
+            self.errors.append((path, error))
+
+    @property
+    def files_per_second(self):
+        return self.n_files / self.elapsed if self.elapsed > 0 else 0.
+
+    @property
+    def rows_per_second(self):
+        return self.n_rows / self.elapsed if self.elapsed > 0 else 0.
+
+    def __str__(self):
+
+        return ('{0} files ({1} failed), {2} rows in {3:.1f} s: '
+                '{4:.1f} files/s, {5:.1f} rows/s; parse time {6:.1f} s, '
+                'write time {7:.1f} s'.format(self.n_files, len(self.errors), self.n_rows,
+                                              self.elapsed, self.files_per_second,
+                                              self.rows_per_second, self.parse_time,
+                                              self.write_time))
+
+
+def _parse_file(args):
+    """Runs the parser on a file in a worker process, catching errors."""
+
+    parser, path = args
+
+    t0 = time.time()
+
+    try:
+        parent_row, child_rows = parser(path)
+        return path, parent_row, child_rows, time.time() - t0, None
+    except Exception:
+        return path, None, None, time.time() - t0, traceback.format_exc()
+
+
+class IngestPipeline(object):
+    """Parses files in a process pool and bulk loads them into the database.
+
+    Files are parsed by ``n_workers`` processes. Each parsed file is put
+    in a bounded queue of size ``queue_size``, from which ``n_writers``
+    threads, each with its own database connection, insert the parent row
+    and bulk insert the child rows in a single transaction per file.
+
+    The process pool is created before the writer threads start, and the
+    workers must not use the database. The connection of the calling
+    thread, if any, is left open.
+
+    Errors are handled per file: a file that fails to parse or to load is
+    recorded in ``IngestStats.errors`` and the pipeline continues. A
+    writer thread that fails (e.g., it cannot connect) is recorded with a
+    `None` path; if all of them fail, or any parsed file is left unwritten,
+    `run` raises `RuntimeError` once the writers have finished.
+
+    Parameters
+    ----------
+    file_type : tuple
+        A tuple of parent model, child model, and name of the child foreign
+        key to the parent. Use `PLATE_HOLES` or `PLUGMAPS`.
+    parser : callable
+        A function that receives a path and returns a tuple with a
+        dictionary of values for the parent model and a list of
+        dictionaries for the child rows. It must be picklable, i.e., a
+        module-level function.
+    n_workers : int or None
+        Number of parser processes. Defaults to the number of CPUs.
+    n_writers : int
+        Number of writer threads (and database connections).
+    queue_size : int
+        Maximum number of parsed files waiting to be written.
+    batch_size : int
+        Maximum number of child rows per ``INSERT``.
+    put_timeout : float
+        How often, in seconds, to check that the writers are alive while
+        waiting for room in the queue.
+
+    """
+
+    def __init__(self, file_type, parser, n_workers=None, n_writers=2,
+                 queue_size=32, batch_size=1000, put_timeout=1.):
+
+        self.parent_model, self.child_model, self.child_fk = file_type
+        self.parser = parser
+
+        self.n_workers = n_workers or multiprocessing.cpu_count()
+        self.n_writers = n_writers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+
+        self.database = self.parent_model._meta.database
+
+    def _write(self, parent_row, child_rows):
+        """Inserts a parsed file. Returns the number of rows inserted."""
+
+        with self.database.atomic():
+
+            parent_pk = self.parent_model.insert(**parent_row).execute()
+
+            rows = [dict(row, **{self.child_fk: parent_pk}) for row in child_rows]
+            for ii in range(0, len(rows), self.batch_size):
+                self.child_model.insert_many(rows[ii:ii + self.batch_size]).execute()
+
+        return len(rows) + 1
+
+    def _writer(self, parsed, stats):
+        """Drains the queue of parsed files until it receives `None`."""
+
+        # Each writer thread has its own connection, opened and closed here.
+        opened = self.database.is_closed()
+
+        try:
+
+            if opened:
+                self.database.connect()
+
+            while True:
+
+                item = parsed.get()
+                if item is None:
+                    break
+
+                path, parent_row, child_rows, parse_time = item
+
+                t0 = time.time()
+                try:
+                    n_rows = self._write(parent_row, child_rows)
+                    stats.add(n_rows=n_rows, parse_time=parse_time,
+                              write_time=time.time() - t0)
+                except Exception:
+                    stats.add_error(path, traceback.format_exc())
+
+        except Exception:
+            # Recorded with no path; run() raises if no writer is left.
+            stats.add_error(None, traceback.format_exc())
+
+        finally:
+            if opened and not self.database.is_closed():
+                self.database.close()
+
+    def _put(self, parsed, item, writers):
+        """Puts an item in the queue, unless all the writers have died."""
+
+        while True:
+            try:
+                parsed.put(item, timeout=self.put_timeout)
+                return True
+            except queue.Full:
+                if not any(writer.is_alive() for writer in writers):
+                    return False
+
+    def run(self, paths):
+        """Loads a list of files. Returns an `IngestStats` instance.
+
+        Raises
+        ------
+        RuntimeError
+            If all the writer threads fail, e.g., because they cannot
+            connect to the database, or if parsed files are left in the
+            queue because the writers that would have written them failed.
+
+        """
+
+        stats = IngestStats()
+        t0 = time.time()
+
+        # Fork the workers before any thread of ours is running or has a
+        # connection open. The workers do not use the database.
+        pool = multiprocessing.Pool(self.n_workers)
+
+        parsed = queue.Queue(maxsize=self.queue_size)
+
+        writers = [threading.Thread(target=self._writer, args=(parsed, stats))
+                   for __ in range(self.n_writers)]
+        for writer in writers:
+            writer.daemon = True
+            writer.start()
+
+        failed = False
+
+        try:
+            tasks = ((self.parser, path) for path in paths)
+            for path, parent_row, child_rows, parse_time, error in \
+                    pool.imap_unordered(_parse_file, tasks):
+                if error is not None:
+                    stats.add_error(path, error)
+                elif not self._put(parsed, (path, parent_row, child_rows, parse_time),
+                                   writers):
+                    failed = True
+                    break
+        except BaseException:
+            pool.terminate()
+            raise
+        else:
+            if failed:
+                pool.terminate()
+            else:
+                pool.close()
+        finally:
+            pool.join()
+
+            for __ in writers:
+                self._put(parsed, None, writers)
+            for writer in writers:
+                writer.join()
+
+        stats.elapsed = time.time() - t0
+
+        # Files still in the queue were parsed but never written.
+        n_unwritten = 0
+        while True:
+            try:
+                item = parsed.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                n_unwritten += 1
+
+        writer_errors = [error for path, error in stats.errors if path is None]
+
+        if failed or len(writer_errors) == len(writers):
+            raise RuntimeError('all the writers failed. The first error was:\n' +
+                               writer_errors[0])
+        elif n_unwritten > 0:
+            raise RuntimeError('{0} parsed files were not written because the writers '
+                               'failed. The first error was:\n{1}'.format(n_unwritten,
+                                                                          writer_errors[0]))
+
+        return stats
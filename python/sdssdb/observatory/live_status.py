@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# live_status.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# An in-process cache of the current status and active pluggings.
+
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import os
+import select
+import threading
+import time
+import warnings
+
+from peewee import PostgresqlDatabase
+
+from . import mangadb, platedb
+
+
+__all__ = ('LiveStatus', 'LiveState', 'get_live_status', 'get_trigger_sql',
+           'install_triggers', 'triggers_installed', 'NOTIFY_CHANNEL', 'NOTIFY_TABLES')
+
+
+#: The channel on which the triggers notify changes.
+NOTIFY_CHANNEL = 'sdssdb_live_status'
+
+#: The tables whose changes invalidate the cache.
+NOTIFY_TABLES = (('mangadb', 'current_status'), ('platedb', 'active_plugging'),
+                 ('platedb', 'plugging'), ('platedb', 'cartridge'), ('platedb', 'plate'))
+
+_trigger_name = 'sdssdb_live_status_notify'
+
+#: The cached state. ``current_status`` is a list of `.CurrentStatus` rows
+#: as named tuples. ``active_pluggings`` is a dictionary of cartridge
+#: number to a named tuple with the ``plugging_pk``, ``plate_pk``,
+#: ``plate_id``, ``fscan_id``, and ``fscan_mjd`` of the active plugging.
+#: Active pluggings without a cartridge are not included.
+LiveState = collections.namedtuple('LiveState', ['current_status', 'active_pluggings',
+                                                 'loaded_at'])
+
+
+def get_trigger_sql(channel=NOTIFY_CHANNEL):
+    """Returns the SQL that installs the notification triggers.
+
+    A statement-level trigger on each of `NOTIFY_TABLES` sends
+    ``NOTIFY channel, 'schema.table'`` after any insert, update, delete,
+    or truncate. The statements can be run again safely.
+
+    """
+
+    statements = [
+        'CREATE OR REPLACE FUNCTION platedb.{0}() RETURNS trigger AS $$\n'
+        'BEGIN\n'
+        "    PERFORM pg_notify('{1}', TG_TABLE_SCHEMA || '.' || TG_TABLE_NAME);\n"
+        '    RETURN NULL;\n'
+        'END;\n'
+        '$$ LANGUAGE plpgsql;'.format(_trigger_name, channel)]
+
+    for schema, table in NOTIFY_TABLES:
+        statements.append('DROP TRIGGER IF EXISTS {0} ON {1}.{2};'.format(_trigger_name,
+                                                                          schema, table))
+        statements.append('CREATE TRIGGER {0} AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE '
+                          'ON {1}.{2} FOR EACH STATEMENT '
+                          'EXECUTE PROCEDURE platedb.{0}();'.format(_trigger_name,
+                                                                    schema, table))
+
+    return '\n'.join(statements)
+
+
+def install_triggers(database, channel=NOTIFY_CHANNEL):
+    """Installs the notification triggers. Requires owner privileges."""
+
+    with database.atomic():
+        database.execute_sql(get_trigger_sql(channel=channel))
+
+
+def triggers_installed(database):
+    """Returns `True` if the triggers exist on all `NOTIFY_TABLES`."""
+
+    if not isinstance(database, PostgresqlDatabase):
+        return False
+
+    tables = database.execute_sql(
+        'SELECT n.nspname, c.relname FROM pg_trigger t '
+        'JOIN pg_class c ON c.oid = t.tgrelid '
+        'JOIN pg_namespace n ON n.oid = c.relnamespace '
+        'WHERE t.tgname = %s', (_trigger_name, )).fetchall()
+
+    return set(NOTIFY_TABLES) <= set(tables)
+
+
+class LiveStatus(object):
+    """A cache of `.CurrentStatus` and the active pluggings.
+
+    The state is loaded on first access and reused until it changes. If
+    the notification triggers are installed (see `install_triggers`), a
+    background thread listens for ``NOTIFY`` on its own connection and
+    invalidates the state when one of `NOTIFY_TABLES` changes; the next
+    access reloads it. Otherwise, or if the listener loses its
+    connection, the state is reloaded when it is older than ``ttl``
+    seconds.
+
+    Parameters
+    ----------
+    ttl : float
+        The maximum age, in seconds, of the state when not listening.
+    listen : bool
+        Whether to start the listener if the triggers are installed.
+    channel : str
+        The notification channel.
+    poll_timeout : float
+        How often, in seconds, the listener checks whether it must stop.
+
+    """
+
+    def __init__(self, ttl=5., listen=True, channel=NOTIFY_CHANNEL, poll_timeout=1.):
+
+        self.ttl = ttl
+        self.channel = channel
+        self.poll_timeout = poll_timeout
+
+        self.loads = 0
+        self.notifications = 0
+
+        self._state = None
+        self._generation = 0
+        self._loaded_generation = -1
+        self._listening = False
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._pid = os.getpid()
+
+        if listen:
+            self.start()
+
+    @property
+    def database(self):
+        return platedb.ActivePlugging._meta.database
+
+    @property
+    def listening(self):
+        """Whether changes are being received through ``NOTIFY``."""
+
+        return self._listening
+
+    def start(self):
+        """Starts the listener, if the triggers are installed."""
+
+        if self._thread is not None and self._thread.is_alive():
+            return True
+
+        try:
+            if not triggers_installed(self.database):
+                return False
+        except Exception:
+            return False
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._listen, name='sdssdb-live-status')
+        self._thread.daemon = True
+        self._thread.start()
+
+        return True
+
+    def stop(self):
+        """Stops the listener. The cache falls back to TTL polling."""
+
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def invalidate(self):
+        """Marks the state as changed."""
+
+        with self._lock:
+            self._generation += 1
+
+    def _connect(self):
+        """Opens a psycopg2 connection of our own, outside the peewee pool."""
+
+        import psycopg2
+
+        database = self.database
+
+        return psycopg2.connect(database=database.database, **database.connect_params)
+
+    def _listen(self):
+
+        while not self._stop_event.is_set():
+
+            conn = None
+
+            try:
+                conn = self._connect()
+                conn.autocommit = True
+                conn.cursor().execute('LISTEN {0}'.format(self.channel))
+
+                # Anything may have changed while we were not listening.
+                self._listening = True
+                self.invalidate()
+
+                while not self._stop_event.is_set():
+                    if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if len(conn.notifies) > 0:
+                        self.notifications += len(conn.notifies)
+                        del conn.notifies[:]
+                        self.invalidate()
+
+            except Exception as ee:
+                warnings.warn('live status listener failed: {0}. '
+                              'Falling back to polling.'.format(ee), UserWarning)
+                self._stop_event.wait(max(self.ttl, self.poll_timeout))
+
+            finally:
+                self._listening = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def _is_valid(self):
+
+        if self._pid != os.getpid():
+            # The listener thread does not survive a fork. Poll in the child
+            # until start() is called there.
+            self._lock = threading.Lock()
+            self._thread = None
+            self._listening = False
+            self._pid = os.getpid()
+
+        if self._state is None or self._loaded_generation != self._generation:
+            return False
+
+        if self._listening:
+            return True
+
+        return time.time() - self._state.loaded_at < self.ttl
+
+    def load(self):
+        """Loads the state from the database."""
+
+        with self._lock:
+            generation = self._generation
+
+        CurrentStatus = mangadb.CurrentStatus
+        ActivePlugging = platedb.ActivePlugging
+        Plugging = platedb.Plugging
+        Plate = platedb.Plate
+        Cartridge = platedb.Cartridge
+
+        current_status = list(CurrentStatus
+                              .select(CurrentStatus.pk, CurrentStatus.camera,
+                                      CurrentStatus.exposure_no, CurrentStatus.flavor,
+                                      CurrentStatus.mjd, CurrentStatus.unpluggedifu)
+                              .order_by(CurrentStatus.pk)
+                              .namedtuples())
+
+        active = (ActivePlugging
+                  .select(Cartridge.number.alias('cartridge'),
+                          Plugging.pk.alias('plugging_pk'),
+                          Plate.pk.alias('plate_pk'),
+                          Plate.plate_id,
+                          Plugging.fscan.alias('fscan_id'),
+                          Plugging.fscan_mjd)
+                  .join(Plugging)
+                  .join(Plate)
+                  .switch(Plugging)
+                  .join(Cartridge)
+                  .namedtuples())
+
+        state = LiveState(current_status, {row.cartridge: row for row in active}, time.time())
+
+        with self._lock:
+            self._state = state
+            self._loaded_generation = generation
+            self.loads += 1
+
+        return state
+
+    def get(self):
+        """Returns the current `LiveState`, reloading it if it has changed."""
+
+        state = self._state
+        if not self._is_valid():
+            state = self.load()
+
+        return state
+
+    @property
+    def current_status(self):
+        return self.get().current_status
+
+    @property
+    def active_pluggings(self):
+        return self.get().active_pluggings
+
+    def get_active_plugging(self, cartridge):
+        """Returns the active plugging for a cartridge number, or `None`."""
+
+        return self.get().active_pluggings.get(cartridge, None)
+
+
+_live_status = None
+
+
+def get_live_status(ttl=5., listen=True):
+    """Returns the shared `LiveStatus`, creating it on first use."""
+
+    global _live_status
+
+    if _live_status is None:
+        _live_status = LiveStatus(ttl=ttl, listen=listen)
+
+    return _live_status
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# lookup.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Resolves lists of natural keys to model instances in bulk.
+
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+
+from peewee import Tuple
+
+from sdssdb.core.cache import LRUCache
+from sdssdb.core.compat import string_types
+from sdssdb.core.metrics import registry
+
+
+__all__ = ('BulkLookup', 'get_many', 'get_plates', 'get_exposures', 'plate_cache',
+           'exposure_cache')
+
+
+#: The result of a bulk lookup. ``instances`` is a list with the same
+#: length and order as the input keys, with `None` for the keys that were
+#: not found. ``missing`` is the list of keys not found, in input order and
+#: without duplicates.
+BulkLookup = collections.namedtuple('BulkLookup', ['instances', 'missing'])
+
+#: Plates by ``plate_id``, filled by `get_plates` with ``use_cache=True``.
+plate_cache = LRUCache(maxsize=10000)
+
+#: Exposures by ``(exposure_no, survey_pk)``, filled by `get_exposures`
+#: with ``use_cache=True``.
+exposure_cache = LRUCache(maxsize=10000)
+
+registry.register_cache('plate_lookup', plate_cache)
+registry.register_cache('exposure_lookup', exposure_cache)
+
+
+def _get_key(instance, fields):
+    """Returns the natural key of an instance, using the raw FK values."""
+
+    values = tuple(instance.__data__.get(field.name, None) for field in fields)
+
+    return values[0] if len(fields) == 1 else values
+
+
+def get_many(model, fields, keys, chunk_size=1000, cache=None):
+    """Resolves a list of natural keys to instances of ``model``.
+
+    The keys are resolved in chunks of ``chunk_size`` using
+    ``field IN (...)`` or, for composite keys, ``(field1, field2) IN
+    ((...), ...)``, so that thousands of keys take a handful of queries
+    that can use the unique index on ``fields``.
+
+    Parameters
+    ----------
+    model : `peewee.Model`
+        The model to query.
+    fields : list
+        The fields that form the natural key. For a foreign key the key
+        value is the pk of the related row.
+    keys : list
+        The keys to resolve. Each key is a value if ``fields`` has a single
+        field, or a tuple of values otherwise. Duplicates are allowed.
+    chunk_size : int
+        The maximum number of keys per query.
+    cache : `~sdssdb.core.cache.LRUCache` or None
+        If set, keys are first looked up in the cache, and the instances
+        retrieved from the database are added to it. Cached instances are
+        not refreshed; call ``cache.clear()`` if the rows may have changed.
+
+    Returns
+    -------
+    result : `BulkLookup`
+        The instances, in input order, and the keys that were not found.
+
+    """
+
+    keys = list(keys)
+    unique_keys = list(collections.OrderedDict.fromkeys(keys))
+
+    found = {}
+    pending = []
+
+    for key in unique_keys:
+        instance = cache.get(key) if cache is not None else None
+        if instance is None:
+            pending.append(key)
+        else:
+            found[key] = instance
+
+    lhs = fields[0] if len(fields) == 1 else Tuple(*fields)
+
+    for ii in range(0, len(pending), chunk_size):
+        chunk = pending[ii:ii + chunk_size]
+        for instance in model.select().where(lhs << chunk):
+            key = _get_key(instance, fields)
+            found[key] = instance
+            if cache is not None:
+                cache.set(key, instance)
+
+    return BulkLookup([found.get(key, None) for key in keys],
+                      [key for key in unique_keys if key not in found])
+
+
+def get_plates(plate_ids, chunk_size=1000, use_cache=False):
+    """Resolves a list of ``plate_id`` to `.Plate` instances.
+
+    See `get_many`. If ``use_cache=True``, `plate_cache` is used.
+
+    """
+
+    from .platedb import Plate
+
+    return get_many(Plate, [Plate.plate_id], [int(plate_id) for plate_id in plate_ids],
+                    chunk_size=chunk_size, cache=plate_cache if use_cache else None)
+
+
+def _get_survey_pks(surveys):
+    """Returns a mapping of survey (instance, pk, or label) to survey pk."""
+
+    from .platedb import Survey
+
+    labels = set(survey for survey in surveys if isinstance(survey, string_types))
+
+    survey_pks = {}
+    if len(labels) > 0:
+        survey_pks.update(Survey.select(Survey.label, Survey.pk)
+                                .where(Survey.label << list(labels))
+                                .tuples())
+
+    for survey in surveys:
+        if isinstance(survey, Survey):
+            survey_pks[survey] = survey.pk
+        elif survey is not None and not isinstance(survey, string_types):
+            survey_pks[survey] = int(survey)
+
+    return survey_pks
+
+
+def get_exposures(keys, chunk_size=1000, use_cache=False):
+    """Resolves a list of ``(exposure_no, survey)`` to `.Exposure` instances.
+
+    The survey can be a `.Survey` instance, its pk, or its label. Labels
+    are resolved with a single query; an unknown label makes the key
+    missing. The keys reported in ``missing`` are the input keys. If
+    ``use_cache=True``, `exposure_cache` is used. See `get_many`.
+
+    """
+
+    from .platedb import Exposure
+
+    keys = [(int(exposure_no), survey) for exposure_no, survey in keys]
+    survey_pks = _get_survey_pks(set(survey for __, survey in keys))
+
+    resolved = [(exposure_no, survey_pks.get(survey, None)) for exposure_no, survey in keys]
+
+    result = get_many(Exposure, [Exposure.exposure_no, Exposure.survey],
+                      [key for key in resolved if key[1] is not None],
+                      chunk_size=chunk_size, cache=exposure_cache if use_cache else None)
+
+    by_key = dict(zip([key for key in resolved if key[1] is not None], result.instances))
+    instances = [by_key.get(key, None) for key in resolved]
+
+    missing = collections.OrderedDict()
+    for key, instance in zip(keys, instances):
+        if instance is None:
+            missing[key] = True
+
+    return BulkLookup(instances, list(missing))
@@ -12,9 +12,11 @@
 
 from __future__ import absolute_import, division, print_function
 
+import numpy
 from peewee import (BooleanField, FloatField, ForeignKeyField, IntegerField,
                     PrimaryKeyField, TextField)
 
+from sdssdb.database.fields import NumpyArrayField
 from sdssdb.observatory import BaseModel, database
 
 from .platedb import Exposure as PlatedbExposure
@@ -118,7 +120,7 @@ class Exposure(BaseModel):
                                 backref='exposures',
                                 field='pk')
     dither_dec = FloatField(null=True)
-    dither_position = UnknownField(null=True)  # ARRAY
+    dither_position = NumpyArrayField(field_class=FloatField, dtype=numpy.float64, null=True)
     dither_ra = FloatField(null=True)
     status = ForeignKeyField(column_name='exposure_status_pk',
                              null=True,
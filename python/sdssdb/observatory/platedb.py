@@ -14,8 +14,10 @@ from __future__ import absolute_import, division, print_function
 
 from peewee import (BigIntegerField, BooleanField, CharField, CompositeKey, DateField,
                     DateTimeField, DeferredThroughModel, FloatField, ForeignKeyField,
-                    IntegerField, ManyToManyField, PrimaryKeyField, TextField)
+                    IntegerField, ManyToManyField, PrimaryKeyField, SQL, TextField)
 
+from sdssdb.database.fields import EnumField
+from sdssdb.database.templates import Param, QueryTemplate
 from sdssdb.observatory import BaseModel, database
 
 from . import mangadb
@@ -41,6 +43,39 @@ class Cartridge(BaseModel):
         db_table = 'cartridge'
         schema = 'platedb'
 
+    def save(self, *args, **kwargs):
+
+        from .cartridge import invalidate
+
+        result = super(Cartridge, self).save(*args, **kwargs)
+        invalidate()
+
+        return result
+
+    def delete_instance(self, *args, **kwargs):
+
+        from .cartridge import invalidate
+
+        result = super(Cartridge, self).delete_instance(*args, **kwargs)
+        invalidate()
+
+        return result
+
+    @property
+    def broken_fiber_mask(self):
+        """A cached, read-only boolean mask of broken fibers, indexed by fiber id."""
+
+        from .cartridge import get_broken_fiber_mask
+
+        return get_broken_fiber_mask(self.broken_fibers)
+
+    def is_fiber_usable(self, fiber_ids):
+        """Returns a boolean array indicating which ``fiber_ids`` are not broken."""
+
+        from .cartridge import is_usable
+
+        return is_usable(self.broken_fiber_mask, fiber_ids)
+
 
 class Design(BaseModel):
     comment = TextField(null=True)
@@ -53,12 +88,11 @@ class Design(BaseModel):
     def get_value_for_field(self, field):
         """Returns the value of a design field."""
 
-        design_field = DesignField.select().where(DesignField.label == field.lower()).first()
+        design_field = _design_field_by_label.first(label=field.lower())
         if design_field is None:
             raise ValueError('invalid field name')
 
-        return DesignValue.select().where((DesignValue.design == self) &
-                                          (DesignValue.field == design_field)).first()
+        return _design_value_by_field.first(design=self, field=design_field)
 
 
 class PlateCompletionStatus(BaseModel):
@@ -196,8 +230,50 @@ class Plate(BaseModel):
     def mangadb_plate(self):
         """One-to-one backref for mangadb.plate.platedb_plate."""
 
-        return mangadb.Plate.get_or_none(platedb_plate_pk=self.pk)
+        return _mangadb_plate_by_plate.first(plate=self.pk)
+
+    @classmethod
+    def cone_search(cls, ra, dec, radius):
+        """Returns a query for the plates with a pointing within a cone.
 
+        ``ra``, ``dec``, and ``radius`` must be in degrees. The search uses
+        the in-process `~sdssdb.observatory.spatial.PointingIndex`, which
+        is refreshed incrementally before the search.
+
+        """
+
+        from .spatial import get_pointing_index
+
+        matches = get_pointing_index().cone_search(ra, dec, radius)
+        plate_pks = sorted(set(matches['plate_pk'].tolist()))
+
+        if len(plate_pks) == 0:
+            # Avoid an empty IN list, which not all backends accept.
+            return cls.select().where(SQL('1 = 0'))
+
+        return cls.select().where(cls.pk << plate_pks)
+
+    @classmethod
+    def get_many(cls, plate_ids, chunk_size=1000, use_cache=False):
+        """Resolves a list of ``plate_id`` in bulk.
+
+        Returns a `~sdssdb.observatory.lookup.BulkLookup` with the plates
+        in input order (`None` if not found) and the missing plate ids.
+        See `sdssdb.observatory.lookup.get_plates`.
+
+        """
+
+        from .lookup import get_plates
+
+        return get_plates(plate_ids, chunk_size=chunk_size, use_cache=use_cache)
+
+    @property
+    def focal_plane_index(self):
+        """The cached `~sdssdb.observatory.spatial.FocalPlaneIndex` of holes."""
+
+        from .spatial import get_focal_plane_index
+
+        return get_focal_plane_index(self)
 
     class Meta:
         db_table = 'plate'
@@ -248,6 +324,18 @@ class Plugging(BaseModel):
                                   through_model=PluggingInstrumentDeferred,
                                   backref='pluggings')
 
+    @property
+    def fiber_map(self):
+        """The cached fiber-to-hole mapping array for this plugging.
+
+        See `sdssdb.observatory.plugmap.get_fiber_map`.
+
+        """
+
+        from .plugmap import get_fiber_map
+
+        return get_fiber_map(self)
+
     class Meta:
         db_table = 'plugging'
         schema = 'platedb'
@@ -411,6 +499,20 @@ class Exposure(BaseModel):
     survey = ForeignKeyField(column_name='survey_pk', null=True,
                              model=Survey, backref='exposures', field='pk')
 
+    @classmethod
+    def get_many(cls, keys, chunk_size=1000, use_cache=False):
+        """Resolves a list of ``(exposure_no, survey)`` in bulk.
+
+        Returns a `~sdssdb.observatory.lookup.BulkLookup` with the
+        exposures in input order (`None` if not found) and the missing
+        keys. See `sdssdb.observatory.lookup.get_exposures`.
+
+        """
+
+        from .lookup import get_exposures
+
+        return get_exposures(keys, chunk_size=chunk_size, use_cache=use_cache)
+
     class Meta:
         db_table = 'exposure'
         indexes = (
@@ -621,7 +723,7 @@ class Gprobe(BaseModel):
     cartridge = ForeignKeyField(column_name='cartridge_pk', null=True, model=Cartridge,
                                 backref='gprobes', field='pk')
     exists = IntegerField(null=True)
-    fiber_type = UnknownField()  # USER-DEFINED
+    fiber_type = EnumField()
     focus_offset = FloatField(null=True)
     gprobe = IntegerField(column_name='gprobe_id', null=True)
     pk = PrimaryKeyField()
@@ -678,6 +780,27 @@ class PlateCompletionStatusHistory(BaseModel):
         db_table = 'plate_completion_status_history'
         schema = 'platedb'
 
+    @classmethod
+    def as_of(cls, timestamp=None, plates=None):
+        """Returns a query with the latest history row per plate at a time.
+
+        See `sdssdb.observatory.history.as_of`.
+
+        """
+
+        from .history import as_of
+
+        return as_of(cls, cls.plate, timestamp=timestamp, entities=plates)
+
+    @classmethod
+    def status_as_of(cls, timestamp=None, plates=None):
+        """Returns a mapping of plate pk to completion status pk at a time."""
+
+        from .history import status_as_of
+
+        return status_as_of(cls, cls.plate, cls.plate_completion_status,
+                            timestamp=timestamp, entities=plates)
+
 
 class PlateInput(BaseModel):
     comment = TextField(null=True)
@@ -884,7 +1007,41 @@ class TileStatusHistory(BaseModel):
         db_table = 'tile_status_history'
         schema = 'platedb'
 
+    @classmethod
+    def as_of(cls, timestamp=None, tiles=None):
+        """Returns a query with the latest history row per tile at a time.
+
+        See `sdssdb.observatory.history.as_of`.
+
+        """
+
+        from .history import as_of
+
+        return as_of(cls, cls.tile, timestamp=timestamp, entities=tiles)
+
+    @classmethod
+    def status_as_of(cls, timestamp=None, tiles=None):
+        """Returns a mapping of tile pk to tile status pk at a time."""
+
+        from .history import status_as_of
+
+        return status_as_of(cls, cls.tile, cls.tile_status,
+                            timestamp=timestamp, entities=tiles)
+
 
 PlateSurveyThroughModel.set_model(PlateToSurvey)
 PlateStatusThroughModel.set_model(PlateToPlateStatus)
 PluggingInstrumentDeferred.set_model(PluggingToInstrument)
+
+
+# Templates for the lookups in the model methods, which are called often
+# enough for building the query on each call to be noticeable.
+_design_field_by_label = QueryTemplate(
+    lambda: DesignField.select().where(DesignField.label == Param('label')).limit(1))
+
+_design_value_by_field = QueryTemplate(
+    lambda: DesignValue.select().where((DesignValue.design == Param('design')) &
+                                       (DesignValue.field == Param('field'))).limit(1))
+
+_mangadb_plate_by_plate = QueryTemplate(
+    lambda: mangadb.Plate.select().where(mangadb.Plate.platedb_plate == Param('plate')).limit(1))
@@ -0,0 +1,395 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# plugmap.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Tools to work with plugmaps and the mapping between fibers and holes.
+
+
+from __future__ import absolute_import, division, print_function
+
+import glob
+import hashlib
+import os
+import re
+
+import numpy
+from peewee import JOIN, PostgresqlDatabase
+
+from sdssdb.core.cache import LRUCache
+from sdssdb.core.metrics import registry
+from sdssdb.database.utils import get_pks
+
+from . import platedb
+
+
+__all__ = ('FIBER_MAP_DTYPE', 'get_fiber_map', 'get_fiber_maps', 'md5sum',
+           'get_stored_checksums', 'check_unique_index', 'ingest_plugmaps',
+           'ingest_plugmap_directory', 'PLUGMAP_UNIQUE_INDEX_SQL')
+
+
+#: The dtype of the arrays returned by `get_fiber_maps`.
+FIBER_MAP_DTYPE = [('fiber_id', numpy.int32),
+                   ('plate_hole_pk', numpy.int64),
+                   ('pl_plugmap_m_pk', numpy.int64),
+                   ('object_type', 'U32'),
+                   ('plate_hole_type', 'U32'),
+                   ('xfocal', numpy.float64),
+                   ('yfocal', numpy.float64),
+                   ('tmass_j', numpy.float64),
+                   ('tmass_h', numpy.float64),
+                   ('tmass_k', numpy.float64)]
+
+_NULL_ROW = (-1, -1, -1, '', '', numpy.nan, numpy.nan, numpy.nan, numpy.nan, numpy.nan)
+
+
+#: The cache of fiber maps, keyed by plugging pk.
+fiber_map_cache = LRUCache(maxsize=256)
+registry.register_cache('fiber_map', fiber_map_cache)
+
+
+def _fetch_fiber_maps(plugging_pks):
+    """Queries the fiber-to-hole mapping for several pluggings at once."""
+
+    Fiber = platedb.Fiber
+    PlPlugmapM = platedb.PlPlugmapM
+    PlateHole = platedb.PlateHole
+    ObjectType = platedb.ObjectType
+    PlateHoleType = platedb.PlateHoleType
+
+    query = (Fiber
+             .select(PlPlugmapM.plugging, PlPlugmapM.pointing_name,
+                     PlPlugmapM.fscan_mjd, PlPlugmapM.fscan,
+                     Fiber.fiber, PlateHole.pk, PlPlugmapM.pk,
+                     ObjectType.label, PlateHoleType.label,
+                     PlateHole.xfocal, PlateHole.yfocal,
+                     PlateHole.tmass_j, PlateHole.tmass_h, PlateHole.tmass_k)
+             .join(PlPlugmapM)
+             .switch(Fiber)
+             .join(PlateHole)
+             .join(ObjectType, join_type=JOIN.LEFT_OUTER)
+             .switch(PlateHole)
+             .join(PlateHoleType, join_type=JOIN.LEFT_OUTER)
+             .where(PlPlugmapM.plugging << list(plugging_pks)))
+
+    # For each plugging and pointing, the rows of each scan, keyed by
+    # (fscan_mjd, fscan_id, plugmap pk) so that the latest scan sorts last.
+    scans = {pk: {} for pk in plugging_pks}
+    for row in query.tuples():
+        plugging_pk, pointing_name, fscan_mjd, fscan_id, fiber_id = row[:5]
+        scan = (-1 if fscan_mjd is None else fscan_mjd,
+                -1 if fscan_id is None else fscan_id, row[6])
+        scan_rows = scans[plugging_pk].setdefault(pointing_name, {}).setdefault(scan, [])
+        # A fiber without an id cannot be placed in the map.
+        if fiber_id is None:
+            continue
+        scan_rows.append(tuple(_NULL_ROW[ii] if value is None else value
+                               for ii, value in enumerate(row[4:])))
+
+    fiber_maps = {}
+    for plugging_pk, pointing_scans in scans.items():
+
+        # Rescans of a pointing replace the earlier scans; different
+        # pointings are merged.
+        plugging_rows = [row
+                         for scan_rows in pointing_scans.values()
+                         for row in scan_rows[max(scan_rows)]]
+
+        data = numpy.array(plugging_rows, dtype=FIBER_MAP_DTYPE)
+        size = data['fiber_id'].max() + 1 if len(data) > 0 else 0
+
+        fiber_ids, counts = numpy.unique(data['fiber_id'], return_counts=True)
+        if (counts > 1).any():
+            duplicated = data[numpy.isin(data['fiber_id'], fiber_ids[counts > 1])]
+            raise ValueError('plugging {0} maps the same fiber ids more than once, in '
+                             'plugmaps {1}.'.format(plugging_pk, ', '.join(
+                                 map(str, numpy.unique(duplicated['pl_plugmap_m_pk'])))))
+
+        fiber_map = numpy.array([_NULL_ROW] * size, dtype=FIBER_MAP_DTYPE)
+        fiber_map[data['fiber_id']] = data
+        fiber_map.flags.writeable = False
+
+        fiber_maps[plugging_pk] = fiber_map
+
+    return fiber_maps
+
+
+def get_fiber_maps(pluggings, use_cache=True):
+    """Returns the fiber-to-hole mapping for several pluggings.
+
+    The mappings for all the pluggings not already in the cache are
+    retrieved with a single query joining `.Fiber`, `.PlPlugmapM`, and
+    `.PlateHole`.
+
+    Parameters
+    ----------
+    pluggings : list
+        A list of `.Plugging` instances or plugging pks.
+    use_cache : bool
+        Whether to use (and fill) the fiber map cache.
+
+    Returns
+    -------
+    fiber_maps : dict
+        A dictionary of plugging pk to a read-only structured array with
+        dtype `FIBER_MAP_DTYPE`, indexed by fiber id. Fiber ids that are
+        not present in the plugmap have ``plate_hole_pk=-1``; fibers
+        with a null fiber id are left out. If a pointing of the plugging
+        was scanned more than once, only the plugmap of the latest scan
+        (by ``fscan_mjd``, ``fscan_id``, and pk) is used. The plugmaps of
+        different pointings are merged, and `ValueError` is raised if
+        more than one maps the same fiber id.
+
+    """
+
+    plugging_pks = get_pks(pluggings)
+
+    fiber_maps = {}
+    if use_cache:
+        for plugging_pk in plugging_pks:
+            fiber_map = fiber_map_cache.get(plugging_pk)
+            if fiber_map is not None:
+                fiber_maps[plugging_pk] = fiber_map
+
+    missing = [pk for pk in plugging_pks if pk not in fiber_maps]
+
+    if len(missing) > 0:
+        new_maps = _fetch_fiber_maps(missing)
+        if use_cache:
+            for plugging_pk, fiber_map in new_maps.items():
+                fiber_map_cache.set(plugging_pk, fiber_map)
+        fiber_maps.update(new_maps)
+
+    return fiber_maps
+
+
+def get_fiber_map(plugging, use_cache=True):
+    """Returns the fiber-to-hole mapping for a plugging.
+
+    See `get_fiber_maps` for details.
+
+    """
+
+    plugging_pk = get_pks(plugging)[0]
+
+    return get_fiber_maps([plugging_pk], use_cache=use_cache)[plugging_pk]
+
+
+#: The migration that creates the unique index on which plugmap upserts
+#: resolve conflicts. It must be run once, by the owner of the table, before
+#: `ingest_plugmaps` is used on a database. ``CONCURRENTLY`` avoids locking
+#: the table against writes, but cannot run inside a transaction block.
+#: It fails if the table already contains duplicated file names, which must
+#: be removed first.
+PLUGMAP_UNIQUE_INDEX_SQL = ('CREATE UNIQUE INDEX CONCURRENTLY plplugmapm_filename '
+                            'ON platedb.pl_plugmap_m (filename);')
+
+_unique_filename_re = re.compile(r'^CREATE UNIQUE INDEX .* \(\s*"?filename"?\s*\)$',
+                                 re.IGNORECASE)
+
+
+def md5sum(path, block_size=2**20):
+    """Returns the hex MD5 checksum of a file, reading it in blocks."""
+
+    md5 = hashlib.md5()
+    with open(path, 'rb') as unit:
+        for block in iter(lambda: unit.read(block_size), b''):
+            md5.update(block)
+
+    return md5.hexdigest()
+
+
+def check_unique_index(database=None):
+    """Checks that ``pl_plugmap_m.filename`` has the unique index upserts need.
+
+    On PostgreSQL, the index definitions are read from ``pg_indexes``.
+    Other databases are not checked. The index is not declared in the
+    `.PlPlugmapM` model; it is created by the ``PLUGMAP_UNIQUE_INDEX_SQL``
+    migration.
+
+    Raises
+    ------
+    RuntimeError
+        If the index does not exist.
+
+    """
+
+    PlPlugmapM = platedb.PlPlugmapM
+
+    database = database or PlPlugmapM._meta.database
+    if not isinstance(database, PostgresqlDatabase):
+        return
+
+    indexdefs = database.execute_sql('SELECT indexdef FROM pg_indexes '
+                                     'WHERE schemaname = %s AND tablename = %s',
+                                     (PlPlugmapM._meta.schema,
+                                      PlPlugmapM._meta.table_name)).fetchall()
+
+    if not any(_unique_filename_re.match(indexdef) for (indexdef, ) in indexdefs):
+        raise RuntimeError('{0}.{1} has no unique index on filename, which plugmap '
+                           'ingestion requires. Create it with: {2}'.format(
+                               PlPlugmapM._meta.schema, PlPlugmapM._meta.table_name,
+                               PLUGMAP_UNIQUE_INDEX_SQL))
+
+
+def get_stored_checksums(paths):
+    """Returns the ``md5_checksum`` of the stored plugmaps with a file name in ``paths``.
+
+    All the file names are checked with a single query. The result is
+    keyed by the absolute path of each stored plugmap, built from its
+    ``dirname`` and ``filename``, so a plugmap stored from a different
+    directory does not match a path with the same file name. Paths whose
+    file name is not in the database are not included in the result.
+
+    """
+
+    PlPlugmapM = platedb.PlPlugmapM
+
+    if len(paths) == 0:
+        return {}
+
+    filenames = sorted(set(os.path.basename(path) for path in paths))
+
+    query = (PlPlugmapM
+             .select(PlPlugmapM.dirname, PlPlugmapM.filename, PlPlugmapM.md5_checksum)
+             .where(PlPlugmapM.filename << filenames)
+             .tuples())
+
+    return {os.path.join(dirname or '', filename): checksum
+            for dirname, filename, checksum in query}
+
+
+def ingest_plugmaps(paths, parser, batch_size=1000, dry_run=False):
+    """Idempotently loads plPlugMapM files into `.PlPlugmapM` and `.Fiber`.
+
+    The MD5 checksums of all the files are compared in bulk with the
+    ``md5_checksum`` values already stored for the same paths. Files
+    whose checksum has not changed are skipped without being parsed. New
+    and changed files, and files stored from a different directory, are
+    parsed and upserted with
+    ``INSERT ... ON CONFLICT (filename) DO UPDATE``, which requires a
+    unique index on ``pl_plugmap_m.filename`` (see
+    ``PLUGMAP_UNIQUE_INDEX_SQL`` and `check_unique_index`), and their
+    `.Fiber` rows are replaced. All the writes happen in a single
+    transaction.
+
+    Plugmaps are identified by their file name, so paths with the same
+    file name and contents are loaded once, and the others reported as
+    skipped. Paths with the same file name and different contents raise
+    a `ValueError`.
+
+    Parameters
+    ----------
+    paths : list
+        The paths to the plPlugMapM files.
+    parser : callable
+        A function called as ``parser(path, content)`` for each new or
+        changed file, with ``content`` the file contents as bytes. It must
+        return a tuple ``(fields, fibers)``, where ``fields`` is a
+        dictionary of extra `.PlPlugmapM` values (e.g., ``plugging``,
+        ``fscan``, ``fscan_mjd``, ``pointing_name``) and ``fibers`` a list
+        of dictionaries with the ``fiber`` id and ``plate_hole`` pk of
+        each fiber. ``dirname``, ``filename``, ``file``, and
+        ``md5_checksum`` are filled automatically.
+    batch_size : int
+        The maximum number of rows per ``INSERT``.
+    dry_run : bool
+        If `True`, only determines which files would be loaded.
+
+    Returns
+    -------
+    result : dict
+        A dictionary with the lists of ``skipped``, ``inserted``, and
+        ``updated`` paths.
+
+    """
+
+    PlPlugmapM = platedb.PlPlugmapM
+    Fiber = platedb.Fiber
+
+    if not dry_run:
+        check_unique_index()
+
+    stored = get_stored_checksums(paths)
+    stored_filenames = set(os.path.basename(stored_path) for stored_path in stored)
+
+    result = {'skipped': [], 'inserted': [], 'updated': []}
+
+    changed = []
+    seen = {}
+    for path in paths:
+        filename = os.path.basename(path)
+        checksum = md5sum(path)
+        if filename in seen:
+            if seen[filename][1] != checksum:
+                raise ValueError('{0!r} and {1!r} have the same file name but different '
+                                 'contents.'.format(seen[filename][0], path))
+            result['skipped'].append(path)
+            continue
+        seen[filename] = (path, checksum)
+        if stored.get(os.path.abspath(path), None) == checksum:
+            result['skipped'].append(path)
+        else:
+            result['updated' if filename in stored_filenames else 'inserted'].append(path)
+            changed.append((path, checksum))
+
+    if dry_run or len(changed) == 0:
+        return result
+
+    plugmap_rows = []
+    fiber_rows = []
+    for path, checksum in changed:
+        with open(path, 'rb') as unit:
+            content = unit.read()
+        fields, fibers = parser(path, content)
+        row = dict(fields)
+        row.update({'dirname': os.path.dirname(os.path.abspath(path)),
+                    'filename': os.path.basename(path),
+                    'file': content.decode('utf-8', 'replace'),
+                    'md5_checksum': checksum})
+        plugmap_rows.append(row)
+        fiber_rows.append((row['filename'], fibers))
+
+    update_fields = sorted(set(name for row in plugmap_rows for name in row) - {'filename'})
+
+    with PlPlugmapM._meta.database.atomic():
+
+        # The order of the RETURNING rows is not guaranteed, so the
+        # fibers are matched to their plugmap by file name.
+        plugmap_pks = {}
+        for ii in range(0, len(plugmap_rows), batch_size):
+            query = (PlPlugmapM
+                     .insert_many(plugmap_rows[ii:ii + batch_size])
+                     .on_conflict(conflict_target=[PlPlugmapM.filename],
+                                  preserve=[getattr(PlPlugmapM, name) for name in update_fields])
+                     .returning(PlPlugmapM.filename, PlPlugmapM.pk)
+                     .tuples())
+            plugmap_pks.update(query.execute())
+
+        Fiber.delete().where(Fiber.pl_plugmap_m << list(plugmap_pks.values())).execute()
+
+        rows = [dict(fiber, pl_plugmap_m=plugmap_pks[filename])
+                for filename, fibers in fiber_rows
+                for fiber in fibers]
+        for ii in range(0, len(rows), batch_size):
+            Fiber.insert_many(rows[ii:ii + batch_size]).execute()
+
+    # The fibers of any plugging may have changed.
+    fiber_map_cache.clear()
+
+    return result
+
+
+def ingest_plugmap_directory(directory, parser, pattern='plPlugMapM-*.par', **kwargs):
+    """Runs `ingest_plugmaps` on all the plugmap files in a directory.
+
+    ``pattern`` is a glob pattern, relative to ``directory``. Other
+    keyword arguments are passed to `ingest_plugmaps`.
+
+    """
+
+    paths = sorted(glob.glob(os.path.join(directory, pattern)))
+
+    return ingest_plugmaps(paths, parser, **kwargs)
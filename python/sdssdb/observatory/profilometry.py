@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# profilometry.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Bulk checking of profilometry measurements against their tolerances.
+
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import threading
+
+import numpy
+
+from sdssdb.database.utils import get_pks
+
+from . import platedb
+
+
+__all__ = ('get_tolerances', 'check_profilometries', 'ToleranceCheck')
+
+
+RADII = ('r1', 'r2', 'r3', 'r4', 'r5')
+
+
+ToleranceCheck = collections.namedtuple(
+    'ToleranceCheck', ['measurement_pk', 'profilometry_pk', 'passed_values', 'passed',
+                       'profilometries', 'profilometry_passed', 'pluggings', 'plugging_passed'])
+ToleranceCheck.__doc__ = """The result of `check_profilometries`.
+
+Attributes
+----------
+measurement_pk, profilometry_pk : `numpy.ndarray`
+    The pk of each `.ProfMeasurement` and of its `.Profilometry`.
+passed_values : `numpy.ndarray`
+    A boolean array of shape ``(n_measurements, 5)`` indicating whether
+    each of ``r1`` to ``r5`` is within tolerance. Null values pass.
+passed : `numpy.ndarray`
+    Whether all the radii of each measurement are within tolerance.
+profilometries, profilometry_passed : `numpy.ndarray`
+    The unique profilometry pks and whether all their measurements pass.
+pluggings, plugging_passed : `numpy.ndarray`
+    The unique plugging pks and whether their most recent profilometry
+    passes.
+
+"""
+
+
+class _ToleranceCache(object):
+    """In-memory copy of the `.ProfTolerances` table."""
+
+    def __init__(self):
+
+        self.pks = None
+        self.low = None
+        self.high = None
+
+        self._lock = threading.Lock()
+
+    def load(self):
+
+        ProfTolerances = platedb.ProfTolerances
+
+        fields = [ProfTolerances.pk]
+        for radius in RADII:
+            fields += [getattr(ProfTolerances, radius + '_low'),
+                       getattr(ProfTolerances, radius + '_high')]
+
+        rows = list(ProfTolerances.select(*fields).order_by(ProfTolerances.pk).tuples())
+        data = numpy.array(rows, dtype=numpy.float64).reshape(-1, len(fields))
+
+        with self._lock:
+            self.pks = data[:, 0].astype(numpy.int64)
+            self.low = data[:, 1::2]
+            self.high = data[:, 2::2]
+
+    def clear(self):
+
+        with self._lock:
+            self.pks = None
+
+
+_tolerance_cache = _ToleranceCache()
+
+
+def get_tolerances(refresh=False):
+    """Returns the cached tolerance vectors.
+
+    The `.ProfTolerances` table is loaded on first use and kept in memory.
+
+    Parameters
+    ----------
+    refresh : bool
+        If `True`, reloads the tolerances from the database.
+
+    Returns
+    -------
+    pks, low, high : `numpy.ndarray`
+        The sorted pks of the `.ProfTolerances` rows and two arrays of
+        shape ``(n_tolerances, 5)`` with the low and high limits of
+        ``r1`` to ``r5``.
+
+    """
+
+    if refresh or _tolerance_cache.pks is None:
+        _tolerance_cache.load()
+
+    return _tolerance_cache.pks, _tolerance_cache.low, _tolerance_cache.high
+
+
+def check_profilometries(profilometries=None, pluggings=None):
+    """Checks many profilometries against their tolerances in one pass.
+
+    The measurements of all the requested profilometries are retrieved
+    with a single query and compared, using broadcasting, with the
+    tolerances of the `.ProfTolerances` version linked to each
+    `.Profilometry`.
+
+    Parameters
+    ----------
+    profilometries : list or None
+        A list of `.Profilometry` instances or pks to check.
+    pluggings : list or None
+        A list of `.Plugging` instances or pks. All the profilometries
+        for these pluggings are checked.
+
+    Returns
+    -------
+    check : `ToleranceCheck`
+        The per-measurement, per-profilometry, and per-plugging results.
+
+    """
+
+    ProfMeasurement = platedb.ProfMeasurement
+    Profilometry = platedb.Profilometry
+
+    if profilometries is None and pluggings is None:
+        raise ValueError('either profilometries or pluggings must be defined.')
+
+    query = (ProfMeasurement
+             .select(ProfMeasurement.pk, Profilometry.pk, Profilometry.plugging,
+                     Profilometry.prof_tolerances, Profilometry.timestamp,
+                     *[getattr(ProfMeasurement, radius) for radius in RADII])
+             .join(Profilometry))
+
+    if profilometries is not None:
+        query = query.where(Profilometry.pk << get_pks(profilometries))
+    if pluggings is not None:
+        query = query.where(Profilometry.plugging << get_pks(pluggings))
+
+    rows = list(query.tuples())
+
+    ids = numpy.array([row[0:4] for row in rows], dtype=numpy.int64).reshape(-1, 4)
+    timestamps = numpy.array([row[4] for row in rows], dtype='datetime64[us]')
+    values = numpy.array([row[5:] for row in rows], dtype=numpy.float64).reshape(-1, 5)
+
+    measurement_pk, profilometry_pk, plugging_pk, tolerance_pk = ids.T
+
+    tolerance_pks, low, high = get_tolerances()
+    if not numpy.isin(tolerance_pk, tolerance_pks).all():
+        tolerance_pks, low, high = get_tolerances(refresh=True)
+
+    # searchsorted would silently pick a neighbouring version, or run off
+    # the end of the array, for a pk that is not in the table.
+    unknown = ~numpy.isin(tolerance_pk, tolerance_pks)
+    if unknown.any():
+        raise ValueError('profilometries {0} refer to unknown prof_tolerances pks {1}.'.format(
+            sorted(set(profilometry_pk[unknown].tolist())),
+            sorted(set(tolerance_pk[unknown].tolist()))))
+
+    tolerance_idx = numpy.searchsorted(tolerance_pks, tolerance_pk)
+
+    with numpy.errstate(invalid='ignore'):
+        failed = (values < low[tolerance_idx]) | (values > high[tolerance_idx])
+
+    passed_values = ~failed
+    passed = passed_values.all(axis=1)
+
+    profilometries, prof_idx = numpy.unique(profilometry_pk, return_inverse=True)
+    profilometry_passed = numpy.bincount(prof_idx, weights=~passed,
+                                         minlength=len(profilometries)) == 0
+
+    # For each plugging, use the profilometry with the latest timestamp.
+    prof_plugging = numpy.zeros(len(profilometries), dtype=numpy.int64)
+    prof_plugging[prof_idx] = plugging_pk
+    prof_timestamp = numpy.zeros(len(profilometries), dtype='datetime64[us]')
+    prof_timestamp[prof_idx] = timestamps
+
+    order = numpy.lexsort((prof_timestamp, prof_plugging))
+    pluggings, last = numpy.unique(prof_plugging[order][::-1], return_index=True)
+    plugging_passed = profilometry_passed[order][::-1][last]
+
+    return ToleranceCheck(measurement_pk, profilometry_pk, passed_values, passed,
+                          profilometries, profilometry_passed, pluggings, plugging_passed)
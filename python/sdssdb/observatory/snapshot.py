@@ -0,0 +1,488 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# snapshot.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# Copies a subset of platedb and mangadb into a local SQLite snapshot.
+
+
+from __future__ import absolute_import, division, print_function
+
+import datetime
+import decimal
+import enum
+import functools
+import json
+import operator
+import re
+import time
+
+from sdssdb.core.compat import FixedOffset, string_types
+from sdssdb.database.database import SnapshotDatabase
+
+from . import database, mangadb, platedb
+
+
+__all__ = ('create_snapshot', 'select_plates', 'sync_snapshot', 'SNAPSHOT_SCOPE',
+           'SYNC_WATERMARKS')
+
+
+#: Defines which rows of each model are part of a snapshot. Each entry is
+#: ``(model, field, source_model, source_field)`` and means that the rows of
+#: ``model`` whose ``field`` is in the values of ``source_field`` for the
+#: rows of ``source_model`` already in the snapshot are copied. The root is
+#: `.Plate`. Models not listed here are small lookup tables that are copied
+#: in full.
+SNAPSHOT_SCOPE = (
+    (platedb.Design, platedb.Design.pk, platedb.Plate, platedb.Plate.design),
+    (platedb.DesignValue, platedb.DesignValue.design, platedb.Design, platedb.Design.pk),
+    (platedb.PlateInput, platedb.PlateInput.design, platedb.Design, platedb.Design.pk),
+    (platedb.Tile, platedb.Tile.pk, platedb.Plate, platedb.Plate.tile),
+    (platedb.TileStatusHistory, platedb.TileStatusHistory.tile, platedb.Tile, platedb.Tile.pk),
+    (platedb.PlateToSurvey, platedb.PlateToSurvey.plate, platedb.Plate, platedb.Plate.pk),
+    (platedb.PlateToPlateStatus, platedb.PlateToPlateStatus.plate,
+     platedb.Plate, platedb.Plate.pk),
+    (platedb.PlateCompletionStatusHistory, platedb.PlateCompletionStatusHistory.plate,
+     platedb.Plate, platedb.Plate.pk),
+    (platedb.PlatePointing, platedb.PlatePointing.plate, platedb.Plate, platedb.Plate.pk),
+    (platedb.Pointing, platedb.Pointing.pk, platedb.PlatePointing, platedb.PlatePointing.pointing),
+    (platedb.Plugging, platedb.Plugging.plate, platedb.Plate, platedb.Plate.pk),
+    (platedb.ActivePlugging, platedb.ActivePlugging.plugging,
+     platedb.Plugging, platedb.Plugging.pk),
+    (platedb.BossPluggingInfo, platedb.BossPluggingInfo.plugging,
+     platedb.Plugging, platedb.Plugging.pk),
+    (platedb.PluggingToInstrument, platedb.PluggingToInstrument.plugging,
+     platedb.Plugging, platedb.Plugging.pk),
+    (platedb.PluggingToBossSn2Threshold, platedb.PluggingToBossSn2Threshold.plugging_pk,
+     platedb.Plugging, platedb.Plugging.pk),
+    (platedb.Profilometry, platedb.Profilometry.plugging, platedb.Plugging, platedb.Plugging.pk),
+    (platedb.ProfMeasurement, platedb.ProfMeasurement.profilometry,
+     platedb.Profilometry, platedb.Profilometry.pk),
+    (platedb.PlPlugmapM, platedb.PlPlugmapM.plugging, platedb.Plugging, platedb.Plugging.pk),
+    (platedb.Observation, platedb.Observation.plugging, platedb.Plugging, platedb.Plugging.pk),
+    (platedb.Exposure, platedb.Exposure.observation,
+     platedb.Observation, platedb.Observation.pk),
+    (platedb.CameraFrame, platedb.CameraFrame.exposure, platedb.Exposure, platedb.Exposure.pk),
+    (platedb.ExposureHeaderValue, platedb.ExposureHeaderValue.exposure,
+     platedb.Exposure, platedb.Exposure.pk),
+    (platedb.PlateHolesFile, platedb.PlateHolesFile.plate, platedb.Plate, platedb.Plate.pk),
+    (platedb.PlateHole, platedb.PlateHole.plate_holes_file,
+     platedb.PlateHolesFile, platedb.PlateHolesFile.pk),
+    (platedb.Fiber, platedb.Fiber.pl_plugmap_m, platedb.PlPlugmapM, platedb.PlPlugmapM.pk),
+    (platedb.CmmMeas, platedb.CmmMeas.plate, platedb.Plate, platedb.Plate.pk),
+    (platedb.HoleMeas, platedb.HoleMeas.cmm_meas, platedb.CmmMeas, platedb.CmmMeas.pk),
+    (mangadb.Plate, mangadb.Plate.platedb_plate, platedb.Plate, platedb.Plate.pk),
+    (mangadb.DataCube, mangadb.DataCube.platedb_plate, platedb.Plate, platedb.Plate.pk),
+    (mangadb.Exposure, mangadb.Exposure.platedb_exposure, platedb.Exposure, platedb.Exposure.pk),
+    (mangadb.Set, mangadb.Set.pk, mangadb.Exposure, mangadb.Exposure.set),
+    (mangadb.Sn2Values, mangadb.Sn2Values.exposure, mangadb.Exposure, mangadb.Exposure.pk),
+    (mangadb.Spectrum, mangadb.Spectrum.exposure, mangadb.Exposure, mangadb.Exposure.pk),
+    (mangadb.ExposureToDataCube, mangadb.ExposureToDataCube.exposure,
+     mangadb.Exposure, mangadb.Exposure.pk),
+)
+
+
+#: The models refreshed by `sync_snapshot` and the field used as their
+#: watermark. Append-mostly tables use their pk, history tables their
+#: timestamp. Listed in dependency order.
+SYNC_WATERMARKS = (
+    (platedb.Plugging, platedb.Plugging.pk),
+    (platedb.Observation, platedb.Observation.pk),
+    (platedb.Exposure, platedb.Exposure.pk),
+    (platedb.CameraFrame, platedb.CameraFrame.pk),
+    (platedb.ExposureHeaderValue, platedb.ExposureHeaderValue.pk),
+    (platedb.PlPlugmapM, platedb.PlPlugmapM.pk),
+    (platedb.Fiber, platedb.Fiber.pk),
+    (platedb.PlateHolesFile, platedb.PlateHolesFile.pk),
+    (platedb.PlateHole, platedb.PlateHole.pk),
+    (mangadb.Exposure, mangadb.Exposure.pk),
+    (platedb.PlateCompletionStatusHistory, platedb.PlateCompletionStatusHistory.timestamp),
+    (platedb.TileStatusHistory, platedb.TileStatusHistory.timestamp),
+)
+
+
+def select_plates(plates=None, surveys=None, mjd_range=None):
+    """Returns a query for the pks of the plates matching all the criteria.
+
+    Parameters
+    ----------
+    plates : list or None
+        A list of plate ids (not pks).
+    surveys : list or None
+        A list of survey labels, e.g., ``['MaNGA', 'APOGEE-2']``.
+    mjd_range : tuple or None
+        A tuple ``(min_mjd, max_mjd)``. Plates with at least one
+        observation within the range, both ends included, are selected.
+
+    """
+
+    Plate = platedb.Plate
+
+    query = Plate.select(Plate.pk)
+
+    if plates is not None:
+        query = query.where(Plate.plate_id << list(plates))
+
+    if surveys is not None:
+        in_surveys = (platedb.PlateToSurvey
+                      .select(platedb.PlateToSurvey.plate)
+                      .join(platedb.Survey)
+                      .where(platedb.Survey.label << list(surveys)))
+        query = query.where(Plate.pk << in_surveys)
+
+    if mjd_range is not None:
+        in_range = (platedb.Plugging
+                    .select(platedb.Plugging.plate)
+                    .join(platedb.Observation,
+                          on=(platedb.Observation.plugging == platedb.Plugging.pk))
+                    .where(platedb.Observation.mjd.between(*mjd_range)))
+        query = query.where(Plate.pk << in_range)
+
+    return query.order_by(Plate.pk)
+
+
+def _field_index(model, field):
+    """Returns the position of ``field`` in the sorted fields of ``model``."""
+
+    return [sorted_field.name for sorted_field in model._meta.sorted_fields].index(field.name)
+
+
+def _to_sqlite(value):
+    """Converts a value returned by the source driver to a SQLite type."""
+
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    elif isinstance(value, (list, tuple)):
+        return json.dumps(list(value))
+    elif isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return str(value)
+    elif isinstance(value, enum.Enum):
+        return value.value
+
+    return value
+
+
+_native_types = (int, float, str, bytes, type(None))
+
+
+def _copy_rows(source, snapshot, model, condition, batch_size, collect):
+    """Copies the rows of ``model`` matching ``condition`` in batches.
+
+    ``collect`` is a dictionary of column index to a set, which is updated
+    with the values of that column for all the rows copied. Returns the
+    number of rows copied.
+
+    """
+
+    fields = model._meta.sorted_fields
+    columns = ', '.join('"{0}"'.format(field.column_name) for field in fields)
+    placeholders = ', '.join('?' for __ in fields)
+
+    insert_sql = 'INSERT OR REPLACE INTO "{0}"."{1}" ({2}) VALUES ({3})'.format(
+        model._meta.schema, model._meta.table_name, columns, placeholders)
+
+    query = model.select(*fields)
+    if condition is not None:
+        query = query.where(condition)
+
+    sql, params = source.get_sql_context().sql(query).query()
+    cursor = source.execute_sql(sql, params)
+
+    n_rows = 0
+    while True:
+
+        rows = cursor.fetchmany(batch_size)
+        if len(rows) == 0:
+            break
+
+        # Collect the values as returned by the source, e.g., datetimes.
+        for index, values in collect.items():
+            values.update(row[index] for row in rows if row[index] is not None)
+
+        rows = [tuple(value if type(value) in _native_types else _to_sqlite(value)
+                      for value in row) for row in rows]
+
+        snapshot.connection().executemany(insert_sql, rows)
+
+        n_rows += len(rows)
+
+    return n_rows
+
+
+def create_snapshot(path, plates=None, surveys=None, mjd_range=None, source=None,
+                    batch_size=5000, chunk_size=5000, verbose=False):
+    """Copies a subset of platedb and mangadb into a local SQLite snapshot.
+
+    The selected plates, and all the rows that depend on them (pluggings,
+    observations, exposures, plate holes, MaNGA data cubes, etc.; see
+    `SNAPSHOT_SCOPE`), are copied along with all the lookup tables. Rows
+    are transferred in batches: each table is read with one query per
+    ``chunk_size`` parent keys and written with ``executemany`` in a
+    single transaction. If no criteria are given, all the plates are
+    copied.
+
+    Running the function again on the same path updates the rows already
+    in the snapshot and adds new ones.
+
+    Once created, the snapshot can be used by adding a profile to the
+    configuration file with a ``snapshot`` key pointing to ``path`` (see
+    the ``apo@snapshot`` profile), or with
+    ``database.use_snapshot(path)``.
+
+    Parameters
+    ----------
+    path : str
+        The directory in which to create the snapshot.
+    plates, surveys, mjd_range
+        The criteria to select plates. See `select_plates`.
+    source : `peewee.PostgresqlDatabase` or None
+        The database from which to copy. Defaults to the observatory
+        database.
+    batch_size : int
+        Number of rows per batch.
+    chunk_size : int
+        Maximum number of parent keys in each ``IN`` clause.
+    verbose : bool
+        Whether to print the number of rows copied for each table.
+
+    Returns
+    -------
+    snapshot : `.SnapshotDatabase`
+        The snapshot database.
+
+    """
+
+    source = source or database
+    if isinstance(source, SnapshotDatabase):
+        raise ValueError('cannot create a snapshot from another snapshot.')
+
+    snapshot = SnapshotDatabase(path)
+
+    models = database.get_models()
+    scoped = [entry[0] for entry in SNAPSHOT_SCOPE] + [platedb.Plate]
+    lookups = [model for model in models if model not in scoped]
+
+    snapshot.connect(reuse_if_open=True)
+    snapshot.create_model_tables(models, indexes=False)
+
+    # For each model, the source columns whose values are needed downstream.
+    collected = {}
+    for __, __, source_model, source_field in SNAPSHOT_SCOPE:
+        index = _field_index(source_model, source_field)
+        collected.setdefault(source_model, {})[index] = set()
+
+    t0 = time.time()
+
+    def copy(model, condition):
+        n_rows = _copy_rows(source, snapshot, model, condition, batch_size,
+                            collected.get(model, {}))
+        if verbose:
+            print('{0}.{1}: {2} rows'.format(model._meta.schema, model._meta.table_name, n_rows))
+
+    with snapshot.atomic():
+
+        for model in lookups:
+            copy(model, None)
+
+        plate_pks = [pk for (pk, ) in source.execute(
+            select_plates(plates=plates, surveys=surveys, mjd_range=mjd_range))]
+
+        for ii in range(0, len(plate_pks), chunk_size):
+            copy(platedb.Plate, platedb.Plate.pk << plate_pks[ii:ii + chunk_size])
+
+        for model, field, source_model, source_field in SNAPSHOT_SCOPE:
+            index = _field_index(source_model, source_field)
+            values = sorted(collected[source_model][index])
+            for ii in range(0, len(values), chunk_size):
+                copy(model, field << values[ii:ii + chunk_size])
+
+        snapshot.set_info('created', datetime.datetime.utcnow().isoformat())
+        snapshot.set_info('source', source.database)
+        snapshot.set_info('selection', json.dumps({'plates': plates, 'surveys': surveys,
+                                                   'mjd_range': mjd_range}))
+
+    snapshot.create_model_indexes(models)
+    snapshot.close()
+
+    if verbose:
+        print('snapshot created in {0:.1f} s.'.format(time.time() - t0))
+
+    return snapshot
+
+
+_timestamp_re = re.compile(r'^(\d{4})-(\d{2})-(\d{2})(?:[ T](\d{2}):(\d{2})(?::(\d{2})'
+                           r'(?:\.(\d{1,6})\d*)?)?)?\s*(Z|[+-]\d{2}(?::?\d{2})?)?$')
+
+
+def _parse_timestamp(value):
+    """Parses a timestamp stored as text in a snapshot into a datetime.
+
+    Accepts the formats written by `str` and `~datetime.datetime.isoformat`,
+    with or without a UTC offset. Other values are returned unchanged.
+
+    """
+
+    if not isinstance(value, string_types):
+        return value
+
+    match = _timestamp_re.match(value.strip())
+    if match is None:
+        raise ValueError('cannot parse timestamp {0!r}.'.format(value))
+
+    year, month, day, hour, minute, second, fraction, offset = match.groups()
+
+    timestamp = datetime.datetime(int(year), int(month), int(day), int(hour or 0),
+                                  int(minute or 0), int(second or 0),
+                                  int((fraction or '0').ljust(6, '0')))
+
+    if offset is not None:
+        if offset == 'Z':
+            minutes = 0
+        else:
+            digits = offset[1:].replace(':', '')
+            minutes = int(digits[:2]) * 60 + int(digits[2:] or 0)
+            minutes = -minutes if offset[0] == '-' else minutes
+        timestamp = timestamp.replace(tzinfo=FixedOffset(minutes))
+
+    return timestamp
+
+
+def _get_watermark(snapshot, model, field):
+    """Returns the stored watermark, or the maximum value in the snapshot.
+
+    Timestamps are stored as text, so they are parsed and compared as
+    datetimes rather than as strings.
+
+    """
+
+    key = 'watermark.{0}.{1}'.format(model._meta.schema, model._meta.table_name)
+
+    watermark = snapshot.get_info(key)
+    if watermark is not None:
+        return int(watermark) if field.primary_key else _parse_timestamp(watermark)
+
+    if field.primary_key:
+        return snapshot.execute_sql('SELECT max("{0}") FROM "{1}"."{2}"'.format(
+            field.column_name, model._meta.schema, model._meta.table_name)).fetchone()[0]
+
+    values = snapshot.execute_sql('SELECT DISTINCT "{0}" FROM "{1}"."{2}" '
+                                  'WHERE "{0}" IS NOT NULL'.format(
+                                      field.column_name, model._meta.schema,
+                                      model._meta.table_name)).fetchall()
+
+    return max([_parse_timestamp(value) for (value, ) in values]) if values else None
+
+
+def _get_scope_values(snapshot, model):
+    """Returns the field and the parent keys that restrict ``model``, if any."""
+
+    for scoped_model, field, source_model, source_field in SNAPSHOT_SCOPE:
+        if scoped_model is model:
+            values = snapshot.execute_sql('SELECT DISTINCT "{0}" FROM "{1}"."{2}"'.format(
+                source_field.column_name, source_model._meta.schema,
+                source_model._meta.table_name)).fetchall()
+            return field, sorted(value for (value, ) in values if value is not None)
+
+    return None, None
+
+
+def sync_snapshot(snapshot, source=None, batch_size=5000, chunk_size=5000, verbose=False):
+    """Incrementally refreshes a snapshot with the new rows in the source.
+
+    For each model in `SYNC_WATERMARKS`, only the rows whose watermark
+    field is larger than the stored watermark (for pks) or equal or larger
+    (for timestamps) are pulled, so the cost of a refresh scales with the
+    number of new rows. The first time a model is synced its watermark is
+    the maximum value already in the snapshot. Each model is synced in its
+    own transaction, together with its new watermark, so an interrupted
+    sync can simply be run again.
+
+    If the snapshot was created from a selection of plates, new rows are
+    restricted to those whose parents are in the snapshot (e.g., new
+    exposures of observations already synced). New plates are not added;
+    use `create_snapshot` on the same path for that. Updates to existing
+    rows that do not change the watermark field are not detected.
+
+    Parameters
+    ----------
+    snapshot : `.SnapshotDatabase` or str
+        The snapshot, or its path.
+    source : `peewee.PostgresqlDatabase` or None
+        The database from which to copy. Defaults to the observatory
+        database.
+    batch_size : int
+        Number of rows per batch.
+    chunk_size : int
+        Maximum number of parent keys in each ``IN`` clause.
+    verbose : bool
+        Whether to print the number of rows pulled for each table.
+
+    Returns
+    -------
+    n_rows : dict
+        The number of rows pulled, keyed by ``schema.table``.
+
+    """
+
+    if not isinstance(snapshot, SnapshotDatabase):
+        snapshot = SnapshotDatabase(snapshot)
+
+    source = source or database
+    if isinstance(source, SnapshotDatabase):
+        raise ValueError('cannot sync a snapshot from another snapshot.')
+
+    selection = json.loads(snapshot.get_info('selection') or '{}')
+    restricted = any(value is not None for value in selection.values())
+
+    n_rows = {}
+
+    for model, field in SYNC_WATERMARKS:
+
+        table = '{0}.{1}'.format(model._meta.schema, model._meta.table_name)
+        key = 'watermark.' + table
+
+        watermark = _get_watermark(snapshot, model, field)
+        if watermark is None:
+            conditions = []
+        elif field.primary_key:
+            conditions = [field > watermark]
+        else:
+            conditions = [field >= watermark]
+
+        if restricted:
+            scope_field, values = _get_scope_values(snapshot, model)
+        else:
+            scope_field, values = None, None
+
+        if scope_field is None:
+            chunks = [None]
+        else:
+            chunks = [scope_field << values[ii:ii + chunk_size]
+                      for ii in range(0, len(values), chunk_size)]
+
+        index = _field_index(model, field)
+        collect = {index: set()}
+
+        with snapshot.atomic():
+
+            n_rows[table] = 0
+            for chunk in chunks:
+                chunk_conditions = conditions + ([chunk] if chunk is not None else [])
+                condition = functools.reduce(operator.and_, chunk_conditions) \
+                    if len(chunk_conditions) > 0 else None
+                n_rows[table] += _copy_rows(source, snapshot, model, condition,
+                                            batch_size, collect)
+
+            if len(collect[index]) > 0:
+                snapshot.set_info(key, max(collect[index]))
+            elif watermark is not None:
+                snapshot.set_info(key, watermark)
+
+        if verbose:
+            print('{0}: {1} new rows'.format(table, n_rows[table]))
+
+    snapshot.set_info('synced', datetime.datetime.utcnow().isoformat())
+
+    return n_rows
@@ -0,0 +1,498 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# spatial.py
+#
+# Created by agent on 18 Oct 2026.
+#
+# In-process spatial indices for platedb models.
+
+
+from __future__ import absolute_import, division, print_function
+
+import threading
+
+import numpy
+from peewee import fn
+
+from sdssdb.core.cache import LRUCache
+from sdssdb.core.metrics import registry
+from sdssdb.database.utils import get_checksum_columns
+
+from . import platedb
+
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+__all__ = ('PointingIndex', 'get_pointing_index', 'FocalPlaneIndex', 'get_focal_plane_index')
+
+
+class _BruteForceTree(object):
+    """A minimal stand-in for `scipy.spatial.cKDTree`.
+
+    Implements the subset of the ``cKDTree`` API used in this module with
+    chunked, vectorised distance calculations. Used when scipy is not
+    available.
+
+    """
+
+    chunk_size = 1024
+
+    def __init__(self, data):
+
+        self.data = numpy.asarray(data, dtype=numpy.float64)
+        self.n = len(self.data)
+
+    def _distances(self, points):
+        diff = points[:, numpy.newaxis, :] - self.data[numpy.newaxis, :, :]
+        return numpy.sqrt((diff ** 2).sum(axis=2))
+
+    def query(self, x, k=1):
+
+        x = numpy.atleast_2d(numpy.asarray(x, dtype=numpy.float64))
+        k = min(k, self.n)
+
+        dd = numpy.empty((len(x), k))
+        ii = numpy.empty((len(x), k), dtype=numpy.intp)
+
+        for start in range(0, len(x), self.chunk_size):
+            dist = self._distances(x[start:start + self.chunk_size])
+            idx = numpy.argsort(dist, axis=1)[:, :k]
+            ii[start:start + self.chunk_size] = idx
+            dd[start:start + self.chunk_size] = numpy.take_along_axis(dist, idx, axis=1)
+
+        if k == 1:
+            return dd[:, 0], ii[:, 0]
+
+        return dd, ii
+
+    def query_ball_point(self, x, r):
+
+        x = numpy.atleast_2d(numpy.asarray(x, dtype=numpy.float64))
+
+        result = []
+        for start in range(0, len(x), self.chunk_size):
+            dist = self._distances(x[start:start + self.chunk_size])
+            result += [list(numpy.nonzero(row <= r)[0]) for row in dist]
+
+        return result
+
+
+def _build_tree(points):
+    """Returns a KD-tree for ``points``, falling back to brute force."""
+
+    if cKDTree is not None:
+        return cKDTree(points)
+
+    return _BruteForceTree(points)
+
+
+def radec_to_vector(ra, dec):
+    """Converts RA/Dec in degrees to an array of unit vectors."""
+
+    ra = numpy.radians(numpy.atleast_1d(numpy.asarray(ra, dtype=numpy.float64)))
+    dec = numpy.radians(numpy.atleast_1d(numpy.asarray(dec, dtype=numpy.float64)))
+
+    cos_dec = numpy.cos(dec)
+
+    return numpy.array([cos_dec * numpy.cos(ra),
+                        cos_dec * numpy.sin(ra),
+                        numpy.sin(dec)]).T
+
+
+def _chord_to_degrees(chord):
+    return numpy.degrees(2 * numpy.arcsin(numpy.clip(chord / 2., 0, 1)))
+
+
+def _degrees_to_chord(radius):
+    return 2 * numpy.sin(numpy.radians(radius) / 2.)
+
+
+class PointingIndex(object):
+    """A unit-vector KD-tree over the plate pointing centres.
+
+    Each entry in the index is a `.PlatePointing`, with the centre of its
+    `.Pointing` and the `.Plate` it belongs to. The index is loaded with
+    a single join and can be refreshed incrementally: `.refresh` only
+    fetches plate pointings with a primary key larger than the largest one
+    already indexed, unless the rows already indexed have changed (e.g.,
+    the centre of a pointing was updated or a plate pointing deleted), in
+    which case the whole index is reloaded.
+
+    """
+
+    dtype = [('plate_pointing_pk', numpy.int64),
+             ('pointing_pk', numpy.int64),
+             ('plate_pk', numpy.int64),
+             ('plate_id', numpy.int64),
+             ('ra', numpy.float64),
+             ('dec', numpy.float64)]
+
+    def __init__(self):
+
+        self.data = numpy.zeros(0, dtype=self.dtype)
+        self._tree = None
+        self._watermark = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def watermark(self):
+        """The largest ``plate_pointing.pk`` checked by the last refresh."""
+
+        return self._watermark
+
+    def _get_query(self, *columns):
+
+        PlatePointing = platedb.PlatePointing
+        Pointing = platedb.Pointing
+        Plate = platedb.Plate
+
+        return (PlatePointing
+                .select(*columns)
+                .join(Pointing)
+                .switch(PlatePointing)
+                .join(Plate)
+                .where(Pointing.center_ra.is_null(False),
+                       Pointing.center_dec.is_null(False)))
+
+    def _get_stamps(self):
+        """Returns the largest pk, and the stamps of the indexed and all rows.
+
+        Both stamps are computed in a single query, before the rows are
+        fetched, so that a concurrent change causes a spurious reload
+        rather than a missed one.
+
+        """
+
+        PlatePointing = platedb.PlatePointing
+        Pointing = platedb.Pointing
+        Plate = platedb.Plate
+
+        fields = [PlatePointing.pk, PlatePointing.pointing, PlatePointing.plate,
+                  Plate.plate_id, Pointing.center_ra, Pointing.center_dec]
+
+        indexed = PlatePointing.pk <= (self._watermark if self._watermark is not None else -1)
+
+        row = self._get_query(fn.MAX(PlatePointing.pk).coerce(False),
+                              *(get_checksum_columns(fields, where=indexed) +
+                                get_checksum_columns(fields))).tuples().get()
+
+        return row[0], tuple(row[1:1 + 2 * len(fields)]), tuple(row[1 + 2 * len(fields):])
+
+    def _fetch(self, after=None, until=None):
+
+        PlatePointing = platedb.PlatePointing
+        Pointing = platedb.Pointing
+        Plate = platedb.Plate
+
+        query = self._get_query(PlatePointing.pk, Pointing.pk, Plate.pk, Plate.plate_id,
+                                Pointing.center_ra, Pointing.center_dec)
+
+        if after is not None:
+            query = query.where(PlatePointing.pk > after)
+
+        if until is not None:
+            query = query.where(PlatePointing.pk <= until)
+
+        rows = list(query.tuples())
+
+        return numpy.array(rows, dtype=self.dtype) if rows else numpy.zeros(0, dtype=self.dtype)
+
+    def refresh(self, full=False):
+        """Updates the index with new plate pointings.
+
+        Each refresh runs one aggregate query that checks whether the rows
+        already indexed have changed. If they have not, only the new rows
+        are fetched; otherwise the index is reloaded.
+
+        Parameters
+        ----------
+        full : bool
+            If `True`, reloads the whole index instead of only fetching
+            the rows added since the last refresh.
+
+        Returns
+        -------
+        n_new : int
+            The number of rows added to the index or, if it was reloaded,
+            the number of rows in the index.
+
+        """
+
+        with self._lock:
+
+            max_pk, indexed_stamp, stamp = self._get_stamps()
+
+            if self._stamp is None or indexed_stamp != self._stamp:
+                full = True
+            elif not full and stamp == self._stamp:
+                return 0
+
+            if max_pk is None:
+                new = numpy.zeros(0, dtype=self.dtype)
+            else:
+                new = self._fetch(after=None if full else self._watermark, until=max_pk)
+
+            data = new if full else numpy.concatenate((self.data, new))
+
+            tree = _build_tree(radec_to_vector(data['ra'], data['dec'])) \
+                if len(data) > 0 else None
+
+            # Readers take the tree and the data together, under the lock.
+            self.data, self._tree = data, tree
+            self._watermark = max_pk
+            self._stamp = stamp
+
+            return len(new)
+
+    def cone_search(self, ra, dec, radius):
+        """Returns the index entries within ``radius`` degrees of a position.
+
+        The result is a structured array with the same fields as
+        ``PointingIndex.data`` plus ``separation``, in degrees, sorted by
+        increasing separation.
+
+        """
+
+        data, pos_idx, data_idx, separation = self._crossmatch([ra], [dec], radius)
+
+        order = numpy.argsort(separation)
+
+        return self._with_separation(data, data_idx[order], separation[order])
+
+    def crossmatch(self, ra, dec, radius):
+        """Matches many positions against the index at once.
+
+        Parameters
+        ----------
+        ra, dec : array_like
+            The coordinates, in degrees, of the positions to match.
+        radius : float
+            The match radius, in degrees.
+
+        Returns
+        -------
+        pos_idx, data_idx, separation : `numpy.ndarray`
+            For each match, the index of the input position, the index of
+            the row in ``PointingIndex.data``, and the separation between
+            the two, in degrees.
+
+        """
+
+        return self._crossmatch(ra, dec, radius)[1:]
+
+    def _crossmatch(self, ra, dec, radius):
+
+        vectors = radec_to_vector(ra, dec)
+
+        # refresh() may replace both while we query them.
+        with self._lock:
+            tree, data = self._tree, self.data
+
+        if tree is None:
+            return (data, numpy.zeros(0, dtype=numpy.intp), numpy.zeros(0, dtype=numpy.intp),
+                    numpy.zeros(0, dtype=numpy.float64))
+
+        matches = tree.query_ball_point(vectors, _degrees_to_chord(radius))
+
+        n_matches = numpy.array([len(mm) for mm in matches], dtype=numpy.intp)
+        pos_idx = numpy.repeat(numpy.arange(len(vectors)), n_matches)
+        data_idx = numpy.array([ii for mm in matches for ii in mm], dtype=numpy.intp)
+
+        data_vectors = radec_to_vector(data['ra'][data_idx], data['dec'][data_idx])
+        chord = numpy.sqrt(((vectors[pos_idx] - data_vectors) ** 2).sum(axis=1))
+
+        return data, pos_idx, data_idx, _chord_to_degrees(chord)
+
+    def _with_separation(self, data, data_idx, separation):
+
+        result = numpy.zeros(len(data_idx), dtype=self.dtype + [('separation', numpy.float64)])
+        for name in data.dtype.names:
+            result[name] = data[name][data_idx]
+        result['separation'] = separation
+
+        return result
+
+
+_pointing_index = None
+
+
+def get_pointing_index(refresh=True):
+    """Returns the shared `PointingIndex`, optionally refreshing it first."""
+
+    global _pointing_index
+
+    if _pointing_index is None:
+        _pointing_index = PointingIndex()
+
+    if refresh:
+        _pointing_index.refresh()
+
+    return _pointing_index
+
+
+class FocalPlaneIndex(object):
+    """A KD-tree over the focal plane positions of the holes in a plate.
+
+    The `.PlateHole` rows for the plate are loaded with a single query
+    (through the plate's `.PlateHolesFile`) into a masked structured array
+    in which null foreign keys are masked. Holes with null focal
+    coordinates are not indexed.
+
+    Parameters
+    ----------
+    plate_pk : int
+        The primary key of the `.Plate`.
+
+    """
+
+    dtype = [('pk', numpy.int64),
+             ('xfocal', numpy.float64),
+             ('yfocal', numpy.float64),
+             ('plate_hole_type_pk', numpy.int64),
+             ('object_type_pk', numpy.int64)]
+
+    def __init__(self, plate_pk):
+
+        self.plate_pk = plate_pk
+        self.data = self._fetch()
+        self._tree = _build_tree(numpy.array([self.data['xfocal'], self.data['yfocal']]).T) \
+            if len(self.data) > 0 else None
+
+    def __len__(self):
+        return len(self.data)
+
+    def _fetch(self):
+
+        PlateHole = platedb.PlateHole
+        PlateHolesFile = platedb.PlateHolesFile
+
+        query = (PlateHole
+                 .select(PlateHole.pk, PlateHole.xfocal, PlateHole.yfocal,
+                         PlateHole.plate_hole_type, PlateHole.object_type)
+                 .join(PlateHolesFile)
+                 .where(PlateHolesFile.plate == self.plate_pk,
+                        PlateHole.xfocal.is_null(False),
+                        PlateHole.yfocal.is_null(False)))
+
+        rows = list(query.tuples())
+
+        # Null foreign keys are masked. The -1 below the mask is never a pk.
+        mask = [(False, False, False) + tuple(value is None for value in row[3:])
+                for row in rows]
+        rows = [row[:3] + tuple(-1 if value is None else value for value in row[3:])
+                for row in rows]
+
+        return numpy.ma.array(numpy.array(rows, dtype=self.dtype),
+                              mask=numpy.array(mask, dtype=[(name, bool)
+                                                            for name, __ in self.dtype]))
+
+    def nearest(self, xfocal, yfocal, k=1):
+        """Returns the ``k`` holes nearest to one or many positions.
+
+        Returns
+        -------
+        data_idx, distance : `numpy.ndarray`
+            The indices of the holes in ``FocalPlaneIndex.data`` and their
+            distances, in mm. For scalar inputs and ``k=1`` these are
+            scalars; for array inputs the first axis matches the inputs.
+            ``k`` is clipped to the number of holes in the index.
+
+        """
+
+        if self._tree is None:
+            raise ValueError('plate {0} has no indexed holes'.format(self.plate_pk))
+
+        # cKDTree pads with infinite distances and out-of-range indices.
+        k = min(k, len(self.data))
+
+        scalar = numpy.isscalar(xfocal)
+        points = numpy.array([numpy.atleast_1d(xfocal), numpy.atleast_1d(yfocal)],
+                             dtype=numpy.float64).T
+
+        distance, data_idx = self._tree.query(points, k=k)
+
+        if scalar:
+            return data_idx[0], distance[0]
+
+        return data_idx, distance
+
+    def nearest_hole(self, xfocal, yfocal):
+        """Returns the `.PlateHole` nearest to a position."""
+
+        data_idx, __ = self.nearest(xfocal, yfocal)
+
+        return platedb.PlateHole.get_by_id(int(self.data['pk'][data_idx]))
+
+    def query_radius(self, xfocal, yfocal, radius):
+        """Returns the holes within ``radius`` mm of a position.
+
+        The result is a masked structured array with the same fields as
+        ``FocalPlaneIndex.data`` plus ``distance``, sorted by distance.
+
+        """
+
+        __, data_idx, distance = self.crossmatch([xfocal], [yfocal], radius)
+
+        order = numpy.argsort(distance)
+
+        result = numpy.ma.zeros(len(data_idx), dtype=self.dtype + [('distance', numpy.float64)])
+        for name in self.data.dtype.names:
+            result[name] = self.data[name][data_idx[order]]
+        result['distance'] = distance[order]
+
+        return result
+
+    def crossmatch(self, xfocal, yfocal, radius):
+        """Returns all the holes within ``radius`` mm of many positions.
+
+        Returns
+        -------
+        pos_idx, data_idx, distance : `numpy.ndarray`
+            For each match, the index of the input position, the index of
+            the hole in ``FocalPlaneIndex.data``, and their distance.
+
+        """
+
+        points = numpy.array([numpy.atleast_1d(xfocal), numpy.atleast_1d(yfocal)],
+                             dtype=numpy.float64).T
+
+        if self._tree is None:
+            return (numpy.zeros(0, dtype=numpy.intp), numpy.zeros(0, dtype=numpy.intp),
+                    numpy.zeros(0, dtype=numpy.float64))
+
+        matches = self._tree.query_ball_point(points, radius)
+
+        n_matches = numpy.array([len(mm) for mm in matches], dtype=numpy.intp)
+        pos_idx = numpy.repeat(numpy.arange(len(points)), n_matches)
+        data_idx = numpy.array([ii for mm in matches for ii in mm], dtype=numpy.intp)
+
+        delta = points[pos_idx] - numpy.array([self.data['xfocal'][data_idx],
+                                               self.data['yfocal'][data_idx]]).T
+
+        return pos_idx, data_idx, numpy.sqrt((delta ** 2).sum(axis=1))
+
+
+#: The cache of `FocalPlaneIndex` instances, keyed by plate pk.
+focal_plane_cache = LRUCache(maxsize=64)
+registry.register_cache('focal_plane', focal_plane_cache)
+
+
+def get_focal_plane_index(plate):
+    """Returns the cached `FocalPlaneIndex` for a plate.
+
+    ``plate`` can be a `.Plate` instance or a plate pk.
+
+    """
+
+    plate_pk = plate.pk if isinstance(plate, platedb.Plate) else int(plate)
+
+    return focal_plane_cache.get_or_set(plate_pk, lambda: FocalPlaneIndex(plate_pk))
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# conftest.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Fixtures shared by the tests.
+
+
+from __future__ import absolute_import, division, print_function
+
+import warnings
+
+import pytest
+
+from sdssdb.database.database import SnapshotDatabase
+
+
+@pytest.fixture(scope='session')
+def models():
+    """The observatory models, imported without a server."""
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        from sdssdb.observatory import database
+
+    return database.get_models()
+
+
+@pytest.fixture
+def sqlite_database(tmp_path, models):
+    """A SQLite database with the observatory tables, bound to the models."""
+
+    database = SnapshotDatabase(str(tmp_path / 'sqlite'))
+    database.connect()
+
+    with database.bind_ctx(models):
+        database.create_model_tables(models)
+        yield database
+
+    database.close()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_cache.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the LRU cache.
+
+
+from __future__ import absolute_import, division, print_function
+
+from sdssdb.core.cache import LRUCache
+
+
+def test_evicts_least_recently_used():
+
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    assert cache.get('a') == 1
+
+    cache.set('c', 3)
+
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert 'c' in cache
+    assert len(cache) == 2
+
+
+def test_hits_and_misses():
+
+    cache = LRUCache()
+    cache.set('a', 1)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('b', 5) == 5
+
+    assert cache.hits == 1
+    assert cache.misses == 2
+    assert cache.hit_ratio == 1 / 3.
+
+
+def test_get_or_set():
+
+    cache = LRUCache()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return 'value'
+
+    assert cache.get_or_set('a', factory) == 'value'
+    assert cache.get_or_set('a', factory) == 'value'
+    assert len(calls) == 1
+
+
+def test_unbounded():
+
+    cache = LRUCache(maxsize=None)
+    for ii in range(1000):
+        cache.set(ii, ii)
+
+    assert len(cache) == 1000
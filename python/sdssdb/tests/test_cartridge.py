@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_cartridge.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the cached views of the broken fibers in each cartridge.
+
+
+from __future__ import absolute_import, division, print_function
+
+import warnings
+
+import pytest
+
+from sdssdb.observatory import cartridge, platedb
+
+
+@pytest.mark.parametrize('text, expected', [(None, []),
+                                            ('', []),
+                                            ('3, 1;2', [1, 2, 3]),
+                                            ('5-7 6\n10', [5, 6, 7, 10])])
+def test_parse_broken_fibers(text, expected):
+
+    assert cartridge.parse_broken_fibers(text).tolist() == expected
+
+
+def test_parse_broken_fibers_invalid():
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        assert cartridge.parse_broken_fibers('1, x, 3').tolist() == [1, 3]
+
+    assert len(caught) == 1
+
+
+def test_broken_fiber_mask():
+
+    mask = cartridge.get_broken_fiber_mask('1, 3')
+
+    assert mask.tolist() == [False, True, False, True]
+    assert not mask.flags.writeable
+    assert cartridge.get_broken_fiber_mask('1, 3') is mask
+
+    assert cartridge.is_usable(mask, [0, 1, 3, 4, -1]).tolist() == [True, False, False,
+                                                                    True, True]
+
+
+@pytest.fixture
+def cartridges(sqlite_database, monkeypatch):
+
+    monkeypatch.setattr(cartridge, '_cartridge_table', cartridge._CartridgeTable())
+
+    return [platedb.Cartridge.create(number=1, online=True, broken_fibers='2, 4'),
+            platedb.Cartridge.create(number=2, online=True, broken_fibers='1-5'),
+            platedb.Cartridge.create(number=3, online=True, broken_fibers=None)]
+
+
+def test_cartridge_masks(cartridges):
+
+    masks = cartridge.get_cartridge_masks()
+
+    assert sorted(masks) == [1, 2, 3]
+    assert masks[2].sum() == 5
+    assert cartridge.get_cartridges_with_broken_fibers(1) == [1, 2]
+
+    assert cartridge.usable_fibers(1, [1, 2]).tolist() == [True, False]
+    assert cartridges[0].is_fiber_usable([3, 4]).tolist() == [True, False]
+
+    with pytest.raises(ValueError):
+        cartridge.usable_fibers(4, [1])
+
+
+def test_save_invalidates(cartridges):
+
+    assert cartridge.usable_fibers(3, [1]).tolist() == [True]
+
+    cartridges[2].broken_fibers = '1'
+    cartridges[2].save()
+
+    assert cartridge.usable_fibers(3, [1]).tolist() == [False]
+
+    cartridges[2].delete_instance()
+
+    assert sorted(cartridge.get_cartridge_masks()) == [1, 2]
+
+
+def test_ttl(cartridges, monkeypatch):
+
+    now = [1000.]
+    monkeypatch.setattr(cartridge.time, 'time', lambda: now[0])
+
+    cartridge.get_cartridge_masks()
+
+    # Bulk updates do not invalidate the table, but it expires.
+    platedb.Cartridge.update(broken_fibers='').execute()
+
+    assert cartridge.get_cartridges_with_broken_fibers(0) == [1, 2]
+    assert cartridge.get_cartridges_with_broken_fibers(0, refresh=True) == []
+
+    platedb.Cartridge.update(broken_fibers='1').execute()
+    now[0] += 59.
+
+    assert cartridge.get_cartridges_with_broken_fibers(0) == []
+
+    now[0] += 1.
+
+    assert cartridge.get_cartridges_with_broken_fibers(0) == [1, 2, 3]
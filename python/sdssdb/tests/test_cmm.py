@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_cmm.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the fit of the CMM measurements.
+
+
+from __future__ import absolute_import, division, print_function
+
+import numpy
+import pytest
+
+from sdssdb.observatory.cmm import fit_transformation
+
+
+def transform(x, y, offsetx, offsety, rotation, scale, quad_mag, quad_angle):
+
+    theta = numpy.radians(rotation)
+    phi = numpy.radians(quad_angle)
+
+    measx = (offsetx + scale * (numpy.cos(theta) * x - numpy.sin(theta) * y) +
+             quad_mag * (numpy.cos(2 * phi) * x + numpy.sin(2 * phi) * y))
+    measy = (offsety + scale * (numpy.sin(theta) * x + numpy.cos(theta) * y) +
+             quad_mag * (numpy.sin(2 * phi) * x - numpy.cos(2 * phi) * y))
+
+    return measx, measy
+
+
+@pytest.fixture
+def holes():
+
+    rng = numpy.random.RandomState(42)
+
+    return rng.uniform(-300, 300, 200), rng.uniform(-300, 300, 200)
+
+
+def test_fit(holes):
+
+    nomx, nomy = holes
+    params = (0.01, -0.02, 0.05, 1.0001, 2e-5, 30.)
+
+    measx, measy = transform(nomx, nomy, *params)
+
+    fit, residuals = fit_transformation(nomx, nomy, measx, measy)
+
+    assert fit.shape == (1, 6)
+    numpy.testing.assert_allclose(fit[0], params, rtol=1e-6, atol=1e-9)
+    numpy.testing.assert_allclose(residuals, 0, atol=1e-9)
+
+
+def test_fit_groups(holes):
+
+    nomx, nomy = holes
+    groups = numpy.arange(len(nomx)) % 2
+
+    params = [(0.01, -0.02, 0.05, 1.0001, 2e-5, 30.),
+              (-0.03, 0.01, -0.1, 0.9999, 1e-5, -20.)]
+
+    measx = numpy.zeros_like(nomx)
+    measy = numpy.zeros_like(nomy)
+    for group, group_params in enumerate(params):
+        select = groups == group
+        measx[select], measy[select] = transform(nomx[select], nomy[select], *group_params)
+
+    fit, __ = fit_transformation(nomx, nomy, measx, measy, groups=groups)
+
+    numpy.testing.assert_allclose(fit, params, rtol=1e-6, atol=1e-9)
+
+
+def test_fit_ignores_invalid(holes):
+
+    nomx, nomy = holes
+    params = (0.01, -0.02, 0.05, 1.0001, 2e-5, 30.)
+
+    measx, measy = transform(nomx, nomy, *params)
+    measx[:10] = numpy.nan
+
+    fit, residuals = fit_transformation(nomx, nomy, measx, measy)
+
+    numpy.testing.assert_allclose(fit[0], params, rtol=1e-6, atol=1e-9)
+    assert numpy.isnan(residuals[:10]).all()
+    assert numpy.isfinite(residuals[10:]).all()
+
+
+def test_fit_unsolvable_group(holes):
+
+    nomx, nomy = holes
+    measx, measy = transform(nomx, nomy, 0, 0, 0, 1, 0, 0)
+
+    # The second group has only two holes, not enough for six parameters.
+    groups = numpy.zeros(len(nomx), dtype=int)
+    groups[:2] = 1
+
+    fit, __ = fit_transformation(nomx, nomy, measx, measy, groups=groups)
+
+    assert numpy.isfinite(fit[0]).all()
+    assert numpy.isnan(fit[1]).all()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_database.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the connection state of SDSSDatabase across threads and forks.
+
+
+from __future__ import absolute_import, division, print_function
+
+import gc
+import os
+import socket
+import threading
+
+import pytest
+
+from sdssdb.database.database import SDSSDatabase
+
+
+class FakeConnection(object):
+    """A connection that, like libpq, says goodbye through its socket when closed."""
+
+    def __init__(self):
+
+        self.sock, self.server = socket.socketpair()
+        self.server.setblocking(False)
+
+    @property
+    def closed(self):
+        return 1 if self.sock is None else 0
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def close(self):
+
+        if self.sock is not None:
+            try:
+                os.write(self.sock.fileno(), b'X')
+            finally:
+                self.sock.close()
+                self.sock = None
+
+    __del__ = close
+
+
+class FakeDatabase(SDSSDatabase):
+
+    def _connect(self):
+        return FakeConnection()
+
+    def _set_server_version(self, conn):
+        self.server_version = (120000, )
+
+
+@pytest.fixture
+def database():
+
+    database = FakeDatabase()
+    database.numpy_arrays = False
+    database.init('sdss5db')
+    database.check_connection()
+
+    yield database
+
+    database.close()
+
+
+def test_connected_shared_by_threads(database):
+
+    results = []
+
+    def worker():
+        results.append(database.connected)
+        database.check_connection()
+        results.append(database.connection())
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    assert database.connected
+    assert results[0] is True
+    assert results[1] is not database.connection()
+
+
+def test_reconnects_when_lost(database):
+
+    conn = database.connection()
+    conn.close()
+
+    assert database.check_connection()
+    assert database.connection() is not conn
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires os.fork')
+def test_fork_does_not_close_parent_connections(database):
+
+    parent_conn = database.connection()
+
+    # A second thread with its own connection, alive during the fork.
+    opened = threading.Event()
+    finish = threading.Event()
+    thread_conns = []
+
+    def worker():
+        database.check_connection()
+        thread_conns.append(database.connection())
+        opened.set()
+        finish.wait()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    opened.wait()
+
+    read_fd, write_fd = os.pipe()
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            status = [database.connected, database.is_closed()]
+            database.check_connection()
+            status.append(database.connection() is not parent_conn)
+            # Discard everything inherited, as the interpreter does on exit.
+            database.close()
+            del parent_conn, thread_conns[:]
+            gc.collect()
+            os.write(write_fd, ' '.join(str(value) for value in status).encode())
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+    child_status = os.read(read_fd, 100).decode()
+    os.close(read_fd)
+
+    finish.set()
+    thread.join()
+
+    assert child_status == 'True True True'
+
+    # Neither connection of the parent received the goodbye of the child.
+    for conn in (parent_conn, thread_conns[0]):
+        assert conn.closed == 0
+        with pytest.raises(socket.error):
+            conn.server.recv(1)
+
+    thread_conns[0].close()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_explain.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the capture and comparison of query plans.
+
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import warnings
+
+import pytest
+
+from sdssdb.database import explain as explain_module
+from sdssdb.database.database import SDSSDatabase
+
+
+def make_plan(scan='Index Scan', index='plate_pkey', execution_time=1.5):
+
+    node = {'Node Type': scan, 'Relation Name': 'plate', 'Total Cost': 8.3,
+            'Actual Rows': 1, 'Shared Hit Blocks': 3}
+    if index is not None:
+        node['Index Name'] = index
+
+    return {'Plan': {'Node Type': 'Nested Loop', 'Join Type': 'Inner', 'Total Cost': 10.,
+                     'Plans': [node, {'Node Type': 'Seq Scan', 'Relation Name': 'plugging',
+                                      'Parent Relationship': 'Inner'}]},
+            'Planning Time': 0.1, 'Execution Time': execution_time}
+
+
+class PlanCursor(object):
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append(sql)
+        if sql.startswith('EXPLAIN') and self.conn.fail_explain:
+            raise RuntimeError('EXPLAIN failed.')
+
+    def fetchone(self):
+        return (json.dumps([make_plan()]), )
+
+    def close(self):
+        pass
+
+
+class PlanConnection(object):
+
+    fail_explain = False
+
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return PlanCursor(self)
+
+    def commit(self):
+        self.statements.append('COMMIT')
+
+    def rollback(self):
+        self.statements.append('ROLLBACK')
+
+    def close(self):
+        pass
+
+
+class PlanDatabase(SDSSDatabase):
+
+    def _connect(self):
+        return PlanConnection()
+
+    def _set_server_version(self, conn):
+        self.server_version = (120000, )
+
+
+@pytest.fixture
+def database():
+
+    database = PlanDatabase()
+    database.numpy_arrays = False
+    database.collect_metrics = False
+    database.init('sdss5db')
+    database.connect()
+
+    yield database
+
+    database.close()
+
+
+def test_query_name():
+
+    name = explain_module.query_name("SELECT * FROM plate WHERE plate_id = 1000 AND x = 'a'")
+
+    assert name == explain_module.query_name("SELECT *  FROM plate\nWHERE plate_id = 2 "
+                                             "AND x = 'b'")
+    assert name != explain_module.query_name('SELECT * FROM plugging WHERE pk = 1')
+
+
+def test_normalize_plan():
+
+    normalized = explain_module.normalize_plan(make_plan())
+
+    assert normalized == {'Node Type': 'Nested Loop', 'Join Type': 'Inner',
+                          'Plans': [{'Node Type': 'Index Scan', 'Relation Name': 'plate',
+                                     'Index Name': 'plate_pkey'},
+                                    {'Node Type': 'Seq Scan', 'Relation Name': 'plugging',
+                                     'Parent Relationship': 'Inner'}]}
+
+    assert explain_module.normalize_plan(make_plan(execution_time=100.)) == normalized
+
+
+def test_compare_plans():
+
+    old = explain_module.normalize_plan(make_plan())
+
+    assert explain_module.compare_plans(old, old) == []
+
+    changes = explain_module.compare_plans(old, explain_module.normalize_plan(
+        make_plan('Seq Scan', None)))
+
+    assert changes == [explain_module.PlanChange('plate', ['Index Scan using plate_pkey'],
+                                                 ['Seq Scan'], True)]
+
+    changes = explain_module.compare_plans(old, explain_module.normalize_plan(
+        make_plan('Index Only Scan', 'plate_plate_id_key')))
+
+    assert len(changes) == 1 and not changes[0].regression
+
+    # Only the join changed.
+    hash_join = explain_module.normalize_plan(make_plan())
+    hash_join['Node Type'] = 'Hash Join'
+
+    changes = explain_module.compare_plans(old, hash_join)
+
+    assert changes == [explain_module.PlanChange(None, old, hash_join, False)]
+
+
+def test_plan_store(tmp_path):
+
+    path = str(tmp_path / 'plans.json')
+
+    store = explain_module.PlanStore(path, max_history=2)
+
+    assert store.add('plate', make_plan(), sql='SELECT 1') == []
+    assert store.add('plate', make_plan('Seq Scan', None))[0].regression
+    store.add('plate', make_plan(execution_time=3.))
+
+    reopened = explain_module.PlanStore(path)
+
+    assert 'plate' in reopened
+    assert len(reopened.get_history('plate')) == 2
+    assert reopened.get_baseline('plate')['sql'] == 'SELECT 1'
+    assert reopened.get_history('plate')[-1]['stats']['execution_time'] == 3.
+    assert reopened.regressions() == {}
+    assert reopened.compare('plate', against='previous')[0].regression is False
+
+    reopened.set_baseline('plate', index=0)
+
+    assert list(explain_module.PlanStore(path).regressions()) == []
+
+    with pytest.raises(ValueError):
+        reopened.compare('plate', against='first')
+
+
+def test_explain(database):
+
+    conn = database.connection()
+
+    assert explain_module.explain(database, 'SELECT 1', analyze=False) == make_plan()
+    assert conn.statements == ['EXPLAIN (FORMAT JSON) SELECT 1', 'COMMIT']
+
+    explain_module.explain(database, 'DELETE FROM plate')
+
+    # Writes are rolled back.
+    assert conn.statements[2:4] == ['EXPLAIN (FORMAT JSON, ANALYZE, BUFFERS) DELETE FROM plate',
+                                    'ROLLBACK']
+
+
+def test_explain_requires_postgresql(sqlite_database):
+
+    with pytest.raises(RuntimeError):
+        explain_module.explain(sqlite_database, 'SELECT 1')
+
+
+def test_sample_slow_queries(database, tmp_path):
+
+    store = explain_module.PlanStore(str(tmp_path / 'plans.json'))
+    database.sample_slow_queries(store, threshold=0., sample_rate=1.)
+
+    conn = database.connection()
+
+    with database.atomic():
+        database.execute_sql('SELECT * FROM plate')
+
+    # The plan is captured in a savepoint of the transaction.
+    explain_index = conn.statements.index('EXPLAIN (FORMAT JSON) SELECT * FROM plate')
+    assert conn.statements[explain_index - 1].startswith('SAVEPOINT')
+    assert conn.statements[explain_index + 1].startswith('RELEASE SAVEPOINT')
+    assert conn.statements[-1] == 'COMMIT'
+
+    assert list(store.data) == [explain_module.query_name('SELECT * FROM plate')]
+
+    database.execute_sql('UPDATE plate SET plate_id = 1')
+    assert len(store.data) == 1
+
+    database.sample_slow_queries(None)
+    database.execute_sql('SELECT * FROM plugging')
+    assert len(store.data) == 1
+
+
+def test_sample_slow_queries_failed(database, tmp_path):
+
+    store = explain_module.PlanStore(str(tmp_path / 'plans.json'))
+    database.sample_slow_queries(store, threshold=0., sample_rate=1.)
+
+    conn = database.connection()
+    conn.fail_explain = True
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        with database.atomic():
+            database.execute_sql('SELECT * FROM plate')
+
+    assert len(caught) == 1
+    assert len(store.data) == 0
+
+    # Only the savepoint is rolled back and the transaction is committed.
+    explain_index = conn.statements.index('EXPLAIN (FORMAT JSON) SELECT * FROM plate')
+    assert conn.statements[explain_index + 1].startswith('ROLLBACK TO SAVEPOINT')
+    assert conn.statements[-1] == 'COMMIT'
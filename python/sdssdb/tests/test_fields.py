@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_fields.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the custom peewee fields.
+
+
+from __future__ import absolute_import, division, print_function
+
+import enum
+
+import numpy
+import psycopg2.extensions
+import pytest
+from peewee import IntegrityError, PostgresqlDatabase
+
+from sdssdb.database import database as database_module
+from sdssdb.database.fields import _make_numpy_caster
+from sdssdb.observatory import mangadb, platedb
+
+from .test_database import FakeDatabase
+
+
+@pytest.mark.parametrize('value, expected', [('{1.5,2,-3e2}', [1.5, 2., -300.]),
+                                             ('{}', []),
+                                             ('{{1,2},{3,NULL}}', [[1., 2.], [3., numpy.nan]])])
+def test_numpy_caster(value, expected):
+
+    caster = _make_numpy_caster('NUMPY_FLOATARRAY', psycopg2.extensions.FLOATARRAY,
+                                numpy.dtype(numpy.float64))
+
+    result = caster(value, None)
+
+    assert isinstance(result, numpy.ndarray)
+    assert result.dtype == numpy.float64
+    numpy.testing.assert_array_equal(result, numpy.array(expected, dtype=numpy.float64))
+
+
+def test_numpy_caster_null():
+
+    caster = _make_numpy_caster('NUMPY_INTEGERARRAY', psycopg2.extensions.INTEGERARRAY,
+                                numpy.dtype(numpy.int32))
+
+    assert caster(None, None) is None
+    assert caster('{1,2}', None).dtype == numpy.int32
+
+
+def test_numpy_array_field(sqlite_database):
+
+    Exposure = mangadb.Exposure
+
+    exposure = Exposure.create(dither_position=numpy.array([1., 2.5]))
+    Exposure.create(dither_position=[3, 4])
+    Exposure.create(dither_position=None)
+
+    values = [row.dither_position for row in Exposure.select().order_by(Exposure.pk)]
+
+    assert isinstance(values[0], numpy.ndarray)
+    assert values[0].dtype == numpy.float64
+    assert values[0].tolist() == [1., 2.5]
+    assert values[1].tolist() == [3., 4.]
+    assert values[2] is None
+
+    assert Exposure.get_by_id(exposure.pk).dither_position.tolist() == [1., 2.5]
+
+
+@pytest.mark.parametrize('numpy_arrays', [True, False])
+def test_register_on_connect(monkeypatch, numpy_arrays):
+
+    registered = []
+    monkeypatch.setattr(database_module, 'register_numpy_arrays', registered.append)
+
+    database = FakeDatabase()
+    database.numpy_arrays = numpy_arrays
+    database.init('sdss5db')
+    database.check_connection()
+
+    try:
+        assert registered == ([database.connection()] if numpy_arrays else [])
+    finally:
+        database.close()
+
+
+class EnumCursor(object):
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params):
+        self.conn.queries.append(params)
+
+    def fetchall(self):
+        return [('fiber_type', label) for label in self.conn.labels]
+
+    def close(self):
+        pass
+
+
+class EnumConnection(object):
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.queries = []
+
+    def cursor(self):
+        return EnumCursor(self)
+
+    def close(self):
+        pass
+
+
+class EnumDatabase(PostgresqlDatabase):
+
+    labels = ['GUIDE', 'TRITIUM']
+
+    def _connect(self):
+        return EnumConnection(list(self.labels))
+
+    def _set_server_version(self, conn):
+        self.server_version = 120000
+
+
+@pytest.fixture
+def enum_database(models):
+
+    database = EnumDatabase('sdss5db')
+
+    with database.bind_ctx(models):
+        database.connect()
+        yield database
+        database.close()
+
+
+def test_enum_field(enum_database):
+
+    field = platedb.Gprobe.fiber_type
+
+    enum_class = field.get_enum()
+
+    assert issubclass(enum_class, enum.Enum)
+    assert field.labels == ['GUIDE', 'TRITIUM']
+    assert field.get_enum() is enum_class
+
+    conn = enum_database.connection()
+    assert conn.queries == [('platedb', 'gprobe', 'fiber_type')]
+
+    convert = field.python_value
+    assert convert('GUIDE') is enum_class.GUIDE
+    assert convert('GUIDE') == 'GUIDE'
+    assert convert(None) is None
+    assert field.db_value(enum_class.TRITIUM) == 'TRITIUM'
+    assert len(conn.queries) == 1
+
+    # A label added after the enum was cached triggers a reload.
+    conn.labels.append('ACQUISITION')
+    assert convert('ACQUISITION').value == 'ACQUISITION'
+    assert len(conn.queries) == 2
+
+
+def test_enum_field_per_connection(enum_database):
+
+    field = platedb.Gprobe.fiber_type
+
+    enum_class = field.get_enum()
+    enum_database.close()
+
+    # The enum loaded last is used while the database is closed.
+    assert field.get_enum() is enum_class
+
+    enum_database.connect()
+    assert field.get_enum() is not enum_class
+    assert len(enum_database.connection().queries) == 1
+
+
+def test_enum_field_sqlite(sqlite_database):
+
+    Gprobe = platedb.Gprobe
+
+    assert Gprobe.fiber_type.get_enum() is None
+
+    Gprobe.create(fiber_type='GUIDE')
+
+    assert Gprobe.get(Gprobe.fiber_type == 'GUIDE').fiber_type == 'GUIDE'
+
+    with pytest.raises(IntegrityError):
+        Gprobe.create(fiber_type=None)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_history.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the as-of queries on status history tables.
+
+
+from __future__ import absolute_import, division, print_function
+
+import datetime
+
+import pytest
+from peewee import PostgresqlDatabase
+
+from sdssdb.observatory import history, platedb
+
+
+History = platedb.PlateCompletionStatusHistory
+
+
+def day(day):
+    return datetime.datetime(2020, 1, day)
+
+
+@pytest.fixture
+def statuses(sqlite_database):
+
+    for plate, status, timestamp in ((1, 1, day(1)), (1, 2, day(3)), (1, 3, day(3)),
+                                     (2, 1, day(2)), (2, 4, day(5)), (3, 2, day(4))):
+        History.create(plate=plate, plate_completion_status=status, timestamp=timestamp,
+                       comment='')
+
+
+def test_as_of(statuses):
+
+    rows = list(History.as_of(day(3)))
+
+    assert [(row.plate_pk, row.plate_completion_status_pk) for row in rows] == [(1, 3), (2, 1)]
+
+
+def test_as_of_entities(statuses):
+
+    assert History.status_as_of(day(10), plates=[2, 3]) == {2: 4, 3: 2}
+    assert History.status_as_of(day(2), plates=[3]) == {}
+
+
+def test_as_of_now(statuses):
+
+    assert History.status_as_of() == {1: 3, 2: 4, 3: 2}
+
+
+def test_as_of_postgresql(models):
+
+    with PostgresqlDatabase('sdss5db').bind_ctx(models):
+        sql, params = history.as_of(History, History.plate, timestamp=day(3),
+                                    entities=[1]).sql()
+
+    assert sql.startswith('SELECT DISTINCT ON ("t1"."plate_pk")')
+    assert sql.endswith('ORDER BY "t1"."plate_pk", "t1"."timestamp" DESC, "t1"."pk" DESC')
+    assert params == [day(3), 1]
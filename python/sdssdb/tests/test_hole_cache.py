@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_hole_cache.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the versioned columnar cache of plate holes.
+
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import warnings
+
+import numpy
+import pytest
+
+from sdssdb.observatory import hole_cache, platedb
+
+
+@pytest.fixture
+def holes(sqlite_database):
+
+    for ii, catalog_object_pk in enumerate((30, 10, None, 30, 20)):
+        platedb.PlateHole.create(plate_holes_file=1 + ii % 2, catalog_object_pk=catalog_object_pk,
+                                 xfocal=float(ii), tmass_j=None if ii == 1 else 10. + ii)
+
+
+def get_versions(path):
+
+    return sorted(name for name in os.listdir(path) if name.startswith('v'))
+
+
+def test_export(holes, tmp_path):
+
+    cache = hole_cache.export_plate_holes(str(tmp_path), batch_size=2)
+
+    assert len(cache) == 5
+    assert cache.columns == [name for name, __ in hole_cache.COLUMNS]
+    assert cache.stamp == hole_cache.get_database_stamp()
+    assert cache['xfocal'].tolist() == [0., 1., 2., 3., 4.]
+    assert numpy.isnan(cache['tmass_j'][1])
+
+    # Null integers are masked.
+    assert cache['catalog_object_pk'].mask.tolist() == [False, False, True, False, False]
+
+    reopened = hole_cache.PlateHoleCache(str(tmp_path))
+    assert reopened.version == cache.version
+    assert not reopened.is_stale()
+
+
+def test_find(holes, tmp_path):
+
+    cache = hole_cache.export_plate_holes(str(tmp_path))
+
+    query_index, row_index = cache.find([30, 40, 10])
+
+    assert query_index.tolist() == [0, 0, 2]
+    assert cache['pk'][row_index].tolist() == [1, 4, 2]
+
+    data = cache.get([20, 10], columns=['pk', 'xfocal'])
+
+    assert data.dtype.names == ('query_index', 'pk', 'xfocal')
+    assert data['pk'].tolist() == [5, 2]
+
+
+def test_empty(sqlite_database, tmp_path):
+
+    cache = hole_cache.export_plate_holes(str(tmp_path))
+
+    assert len(cache) == 0
+    assert len(cache.get([1])) == 0
+
+
+def test_is_stale(holes, tmp_path):
+
+    cache = hole_cache.export_plate_holes(str(tmp_path))
+
+    # Updates are only detected by the full check.
+    platedb.PlateHole.update(xfocal=100.).where(platedb.PlateHole.pk == 1).execute()
+
+    assert not cache.is_stale()
+    assert cache.is_stale(full=True)
+
+    platedb.PlateHole.create(catalog_object_pk=40)
+
+    assert cache.is_stale()
+
+
+def test_refresh_after_update(holes, tmp_path):
+
+    path = str(tmp_path)
+    cache = hole_cache.export_plate_holes(path)
+    xfocal = cache['xfocal']
+
+    platedb.PlateHole.update(xfocal=100.).where(platedb.PlateHole.pk == 1).execute()
+
+    assert hole_cache.get_plate_hole_cache(path, refresh=True).version == cache.version
+
+    new_cache = hole_cache.get_plate_hole_cache(path, refresh=True, full_check=True)
+
+    # The stamp has the same count and max pk, but the new version does not
+    # replace the one already open.
+    assert new_cache.version != cache.version
+    assert new_cache['xfocal'][0] == 100.
+    assert xfocal[0] == 0.
+    assert get_versions(path) == sorted([cache.version, new_cache.version])
+
+
+def test_export_same_stamp(holes, tmp_path):
+
+    path = str(tmp_path)
+
+    versions = [hole_cache.export_plate_holes(path).version for __ in range(2)]
+
+    assert versions[0] != versions[1]
+    assert get_versions(path) == sorted(versions)
+
+
+def test_keep(holes, tmp_path):
+
+    path = str(tmp_path)
+
+    for __ in range(3):
+        cache = hole_cache.export_plate_holes(path, keep=1)
+
+    assert get_versions(path) == [cache.version]
+    assert hole_cache.PlateHoleCache(path).version == cache.version
+
+
+def test_keep_current(holes, tmp_path, monkeypatch):
+
+    path = str(tmp_path)
+
+    current = hole_cache.export_plate_holes(path)
+    other = hole_cache.export_plate_holes(path)
+
+    # Another export makes its version current while this one is running.
+    rename = os.rename
+
+    def rename_current(src, dst):
+        rename(src, dst)
+        if os.path.basename(dst) == 'current':
+            with open(dst, 'w') as fd:
+                fd.write(current.version)
+
+    monkeypatch.setattr(hole_cache.os, 'rename', rename_current)
+
+    new = hole_cache.export_plate_holes(path, keep=1)
+
+    assert get_versions(path) == sorted([current.version, new.version])
+    assert other.version not in get_versions(path)
+
+
+def test_get_plate_hole_cache(holes, tmp_path):
+
+    path = str(tmp_path)
+
+    with pytest.raises(ValueError):
+        hole_cache.get_plate_hole_cache(path)
+
+    cache = hole_cache.get_plate_hole_cache(path, refresh=True)
+
+    platedb.PlateHole.create(catalog_object_pk=40)
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        assert hole_cache.get_plate_hole_cache(path).version == cache.version
+        assert hole_cache.get_plate_hole_cache(path, check=False).version == cache.version
+
+    assert len(caught) == 1
+
+    assert len(hole_cache.get_plate_hole_cache(path, refresh=True)) == 6
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_identity_map.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the identity-map sessions of the observatory database.
+
+
+from __future__ import absolute_import, division, print_function
+
+import pytest
+
+from sdssdb.database.identity_map import IdentityMap, get_pk_lookup
+from sdssdb.observatory import database, platedb
+
+
+@pytest.fixture
+def queries(sqlite_database, monkeypatch):
+    """Binds the sessions of the observatory database and records the queries."""
+
+    monkeypatch.setattr(sqlite_database, 'get_session', database.get_session, raising=False)
+
+    queries = []
+    execute_sql = sqlite_database.execute_sql
+
+    def recording_execute_sql(sql, *args, **kwargs):
+        queries.append(sql)
+        return execute_sql(sql, *args, **kwargs)
+
+    monkeypatch.setattr(sqlite_database, 'execute_sql', recording_execute_sql)
+
+    plates = [platedb.Plate.create(plate_id=1000 + ii, plate_location=1) for ii in range(2)]
+    for ii in range(4):
+        platedb.Plugging.create(plate=plates[ii % 2], status=1)
+
+    del queries[:]
+
+    return queries
+
+
+def test_get_pk_lookup():
+
+    Plate = platedb.Plate
+
+    assert get_pk_lookup(Plate, Plate.pk == 5) == 5
+    assert get_pk_lookup(Plate, Plate.plate_id == 5) is None
+    assert get_pk_lookup(Plate, Plate.pk > 5) is None
+    assert get_pk_lookup(Plate, Plate.pk == Plate.plate_id) is None
+
+
+def test_session_foreign_keys(queries):
+
+    with database.session() as session:
+
+        pluggings = list(platedb.Plugging.select().order_by(platedb.Plugging.pk))
+        plate_ids = [plugging.plate.plate_id for plugging in pluggings]
+
+        assert plate_ids == [1000, 1001, 1000, 1001]
+        assert pluggings[0].plate is pluggings[2].plate
+
+        # One query for the pluggings and one for each plate.
+        assert len(queries) == 3
+        assert (session.hits, session.misses) == (2, 2)
+        assert session.hit_ratio == 0.5
+
+    assert database.get_session() is None
+
+
+def test_session_select(queries):
+
+    Plate = platedb.Plate
+
+    with database.session() as session:
+
+        plate = Plate.get_by_id(1)
+
+        assert Plate.get(Plate.pk == 1) is plate
+        assert len(queries) == 1
+
+        assert list(Plate.select().order_by(Plate.pk))[0] is plate
+
+        # Partial rows are not cached.
+        assert Plate.select(Plate.pk).get() is not plate
+
+        assert len(session) == 2
+
+    # Outside a session each lookup returns a new instance.
+    assert Plate.get_by_id(1) is not Plate.get_by_id(1)
+
+
+def test_nested_sessions(sqlite_database):
+
+    with database.session() as outer:
+        with database.session() as inner:
+            assert inner is outer
+            assert database.get_session() is outer
+        assert database.get_session() is outer
+
+    assert database.get_session() is None
+
+
+def test_invalidate_sql():
+
+    identity_map = IdentityMap()
+
+    plate = platedb.Plate(pk=1)
+    plugging = platedb.Plugging(pk=1)
+
+    def fill():
+        identity_map.invalidate()
+        for instance in (plate, plugging):
+            identity_map.add(instance)
+
+    fill()
+
+    assert identity_map.add(platedb.Plate(pk=1)) is plate
+    assert identity_map.add(platedb.Plate()).pk is None
+    assert len(identity_map) == 2
+
+    for sql in ('SELECT * FROM platedb.plate', 'BEGIN', 'UPDATE platedb.cartridge SET x = 1',
+                'INSERT INTO "other"."plate" VALUES (1)'):
+        identity_map.invalidate_sql(sql)
+        assert len(identity_map) == 2
+
+    identity_map.invalidate_sql('UPDATE "platedb"."plate" SET "plate_id" = 1')
+
+    assert identity_map.get(platedb.Plate, 1) is None
+    assert identity_map.get(platedb.Plugging, 1) is plugging
+
+    fill()
+    identity_map.invalidate_sql('DELETE FROM plugging WHERE pk = 1')
+    assert identity_map.get(platedb.Plugging, 1) is None
+    assert identity_map.get(platedb.Plate, 1) is plate
+
+    for sql in ('WITH deleted AS (DELETE FROM platedb.plate) SELECT 1',
+                'TRUNCATE platedb.plugging', 'ALTER TABLE platedb.plate ADD x int'):
+        fill()
+        identity_map.invalidate_sql(sql)
+        assert len(identity_map) == 0
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_index_advisor.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the comparison of the model access paths with the live indexes.
+
+
+from __future__ import absolute_import, division, print_function
+
+import pytest
+from peewee import ForeignKeyField, IntegerField, Model, PostgresqlDatabase, TextField
+
+from sdssdb.database import index_advisor
+
+
+class Plate(Model):
+
+    plate_id = IntegerField(unique=True)
+
+    class Meta:
+        schema = 'platedb'
+        table_name = 'plate'
+
+
+class Plugging(Model):
+
+    plate = ForeignKeyField(Plate, column_name='plate_pk')
+    fscan = IntegerField(index=True)
+    label = TextField()
+
+    class Meta:
+        schema = 'platedb'
+        table_name = 'plugging'
+        indexes = ((('plate', 'fscan'), False),
+                   (('fscan', ), False))
+
+
+class AdvisorDatabase(PostgresqlDatabase):
+
+    def execute_sql(self, sql, params=None, commit=None):
+        raise AssertionError('the catalogue should not be queried.')
+
+
+def test_get_expected_indexes():
+
+    expected = index_advisor.get_expected_indexes([Plate, Plugging])
+
+    assert [(index.table, index.columns, index.unique) for index in expected] == [
+        ('plate', ('plate_id', ), True),
+        ('plugging', ('plate_pk', ), False),
+        ('plugging', ('fscan', ), False),
+        ('plugging', ('plate_pk', 'fscan'), False)]
+
+    assert expected[1].reason == 'foreign key to plate'
+    assert all(index.schema == 'platedb' for index in expected)
+
+
+def test_get_index_sql():
+
+    assert index_advisor.get_index_sql('platedb', 'plugging', ('plate_pk', 'fscan')) == (
+        'CREATE INDEX CONCURRENTLY plugging_plate_pk_fscan_idx ON platedb.plugging '
+        'USING btree (plate_pk, fscan);')
+    assert index_advisor.get_index_sql('platedb', 'plate', ('plate_id', ),
+                                       unique=True).startswith('CREATE UNIQUE INDEX')
+
+
+def live_index(table, name, columns, unique=False, primary=False, scans=0, size=0):
+
+    return index_advisor.LiveIndex('platedb', table, name, tuple(columns), unique, primary,
+                                   scans, size)
+
+
+@pytest.fixture
+def catalogue(monkeypatch):
+
+    live = {('platedb', 'plate'): [live_index('plate', 'plate_pkey', ['pk'], True, True),
+                                   live_index('plate', 'plate_plate_id_key', ['plate_id'],
+                                              True)],
+            ('platedb', 'plugging'): [live_index('plugging', 'plugging_fscan_label_idx',
+                                                 ['fscan', 'label'], size=1024),
+                                      live_index('plugging', 'plugging_label_idx',
+                                                 ['label'], size=10 * 1024 ** 2),
+                                      live_index('plugging', 'plugging_lower_idx',
+                                                 ['lower(label)'], scans=10,
+                                                 size=10 * 1024 ** 2)]}
+
+    stats = {('platedb', 'plate'): dict(seq_scan=1, seq_tup_read=10, idx_scan=5,
+                                        n_live_tup=10),
+             ('platedb', 'plugging'): dict(seq_scan=4, seq_tup_read=400, idx_scan=0,
+                                           n_live_tup=100)}
+
+    statements = [('SELECT * FROM platedb.plugging WHERE plate_pk = $1', 7),
+                  ('SELECT * FROM platedb.plugging WHERE plate_pk = $1 AND fscan = $2', 3),
+                  ('SELECT * FROM platedb.plate WHERE plate_id = $1', 100)]
+
+    monkeypatch.setattr(index_advisor, 'get_live_indexes',
+                        lambda database, schemas: live)
+    monkeypatch.setattr(index_advisor, 'get_table_stats',
+                        lambda database, schemas: stats)
+    monkeypatch.setattr(index_advisor, '_get_statement_calls',
+                        lambda database: statements)
+
+
+def test_advise(catalogue):
+
+    advice = index_advisor.advise(AdvisorDatabase('sdss5db'), [Plate, Plugging])
+
+    # The fscan index is covered by the (fscan, label) index.
+    assert [(item.kind, item.table, item.columns) for item in advice] == [
+        ('missing', 'plugging', ('plate_pk', )),
+        ('missing', 'plugging', ('plate_pk', 'fscan')),
+        ('unused', 'plugging', ('label', ))]
+
+    assert advice[0].details['statement_calls'] == 10
+    assert advice[1].details['statement_calls'] == 3
+    assert advice[0].details['seq_tup_read'] == 400
+    assert advice[2].sql == 'DROP INDEX CONCURRENTLY platedb.plugging_label_idx;'
+
+
+def test_advise_no_statements(catalogue, monkeypatch):
+
+    monkeypatch.setattr(index_advisor, '_get_statement_calls', lambda database: None)
+
+    advice = index_advisor.advise(AdvisorDatabase('sdss5db'), [Plugging], min_size=0)
+
+    assert all('statement_calls' not in item.details for item in advice)
+    assert [item.columns for item in advice if item.kind == 'unused'] == [('fscan', 'label'),
+                                                                         ('label', )]
+
+
+def test_advise_requires_postgresql(sqlite_database):
+
+    with pytest.raises(RuntimeError):
+        index_advisor.advise(sqlite_database, [Plate])
+
+
+def test_print_advice(catalogue, capsys):
+
+    index_advisor.print_advice(index_advisor.advise(AdvisorDatabase('sdss5db'), [Plugging]))
+
+    lines = capsys.readouterr().out.splitlines()
+
+    assert lines[0] == ('-- missing: foreign key to plate (4 seq scans, 400 rows read, '
+                        '10 statement calls)')
+    assert lines[1].startswith('CREATE INDEX CONCURRENTLY plugging_plate_pk_idx')
+    assert lines[-1] == '-- DROP INDEX CONCURRENTLY platedb.plugging_label_idx;'
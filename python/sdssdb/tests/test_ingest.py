@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_ingest.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the parallel ingest pipeline.
+
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import threading
+
+import pytest
+from peewee import OperationalError
+
+from sdssdb.observatory import ingest, platedb
+
+
+def parse_holes(path):
+    """Parses the test files, one ``xfocal yfocal`` per line."""
+
+    if path.endswith('.bad'):
+        raise ValueError('cannot parse {0}'.format(path))
+
+    with open(path) as unit:
+        rows = [dict(zip(('xfocal', 'yfocal'), map(float, line.split()))) for line in unit]
+
+    return {'filename': os.path.basename(path), 'plate': 1}, rows
+
+
+@pytest.fixture
+def paths(sqlite_database, tmp_path):
+
+    paths = []
+    for ii in range(4):
+        path = tmp_path / 'plateHoles-{0:06d}.par'.format(ii)
+        path.write_text(''.join('{0} {1}\n'.format(jj, -jj) for jj in range(ii + 1)))
+        paths.append(str(path))
+
+    return paths
+
+
+def test_run(paths):
+
+    pipeline = ingest.IngestPipeline(ingest.PLATE_HOLES, parse_holes, n_workers=2,
+                                     n_writers=2, batch_size=2)
+    stats = pipeline.run(paths)
+
+    assert stats.n_files == 4
+    assert stats.n_rows == 14
+    assert stats.errors == []
+
+    assert platedb.PlateHolesFile.select().count() == 4
+    assert platedb.PlateHole.select().count() == 10
+
+    holes_file = platedb.PlateHolesFile.get(filename='plateHoles-000003.par')
+    assert sorted(hole.xfocal for hole in holes_file.plate_holes) == [0., 1., 2., 3.]
+
+
+def test_run_parse_error(paths, tmp_path):
+
+    bad_path = tmp_path / 'plateHoles-999999.bad'
+    bad_path.write_text('')
+
+    stats = ingest.IngestPipeline(ingest.PLATE_HOLES, parse_holes, n_workers=1,
+                                  n_writers=1).run(paths + [str(bad_path)])
+
+    assert stats.n_files == 4
+    assert [path for path, __ in stats.errors] == [str(bad_path)]
+    assert 'ValueError' in stats.errors[0][1]
+
+
+def fail_connect(database, monkeypatch, n_failures):
+    """Makes the first ``n_failures`` connections of the writers fail."""
+
+    lock = threading.Lock()
+    failures = [n_failures]
+    connect = database.connect
+
+    def failing_connect(*args, **kwargs):
+        with lock:
+            failures[0] -= 1
+            if failures[0] >= 0:
+                raise OperationalError('cannot connect')
+        return connect(*args, **kwargs)
+
+    monkeypatch.setattr(database, 'connect', failing_connect)
+
+
+def test_run_writers_fail(sqlite_database, paths, monkeypatch):
+
+    fail_connect(sqlite_database, monkeypatch, 2)
+
+    # There is room in the queue for all the files, so they are put in it
+    # even though no writer is left to write them.
+    pipeline = ingest.IngestPipeline(ingest.PLATE_HOLES, parse_holes, n_workers=1,
+                                     n_writers=2, queue_size=10)
+
+    with pytest.raises(RuntimeError, match='all the writers failed'):
+        pipeline.run(paths)
+
+    assert platedb.PlateHolesFile.select().count() == 0
+
+
+def test_run_writers_fail_small_queue(sqlite_database, paths, monkeypatch):
+
+    fail_connect(sqlite_database, monkeypatch, 1)
+
+    pipeline = ingest.IngestPipeline(ingest.PLATE_HOLES, parse_holes, n_workers=1,
+                                     n_writers=1, queue_size=1, put_timeout=0.01)
+
+    with pytest.raises(RuntimeError, match='all the writers failed'):
+        pipeline.run(paths)
+
+
+def test_run_one_writer_fails(sqlite_database, paths, monkeypatch):
+
+    fail_connect(sqlite_database, monkeypatch, 1)
+
+    stats = ingest.IngestPipeline(ingest.PLATE_HOLES, parse_holes, n_workers=1,
+                                  n_writers=2).run(paths)
+
+    # The other writer loads all the files.
+    assert stats.n_files == 4
+    assert [path for path, __ in stats.errors] == [None]
+    assert platedb.PlateHolesFile.select().count() == 4
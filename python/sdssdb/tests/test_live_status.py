@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_live_status.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the cache of the current status and the active pluggings.
+
+
+from __future__ import absolute_import, division, print_function
+
+import socket
+import time
+
+import pytest
+
+from sdssdb.observatory import live_status, mangadb, platedb
+
+
+@pytest.fixture
+def observatory(sqlite_database, monkeypatch):
+
+    now = [1000.]
+    monkeypatch.setattr(live_status.time, 'time', lambda: now[0])
+
+    mangadb.CurrentStatus.create(camera='b1', exposure_no=10, mjd=59000)
+
+    for number, plate_id in ((1, 1000), (2, 1001)):
+        cartridge = platedb.Cartridge.create(number=number, online=True)
+        plate = platedb.Plate.create(plate_id=plate_id, plate_location=1)
+        plugging = platedb.Plugging.create(plate=plate, cartridge=cartridge, status=1,
+                                           fscan=number, fscan_mjd=59000)
+        platedb.ActivePlugging.create(plugging=plugging)
+
+    return now
+
+
+def test_load(observatory):
+
+    status = live_status.LiveStatus(listen=False)
+
+    assert not status.listening
+    assert [row.exposure_no for row in status.current_status] == [10]
+
+    active = status.get_active_plugging(2)
+
+    assert (active.plate_id, active.fscan_id, active.fscan_mjd) == (1001, 2, 59000)
+    assert active.plugging_pk == platedb.Plugging.get(fscan=2).pk
+    assert status.get_active_plugging(3) is None
+    assert sorted(status.active_pluggings) == [1, 2]
+
+    assert status.loads == 1
+
+
+def test_ttl(observatory):
+
+    status = live_status.LiveStatus(ttl=5., listen=False)
+    status.get()
+
+    mangadb.CurrentStatus.update(exposure_no=11).execute()
+    observatory[0] += 4.
+
+    assert status.current_status[0].exposure_no == 10
+
+    observatory[0] += 1.
+
+    assert status.current_status[0].exposure_no == 11
+    assert status.loads == 2
+
+    mangadb.CurrentStatus.update(exposure_no=12).execute()
+    status.invalidate()
+
+    assert status.current_status[0].exposure_no == 12
+    assert status.loads == 3
+
+
+def test_no_triggers(sqlite_database):
+
+    assert not live_status.triggers_installed(sqlite_database)
+
+    status = live_status.LiveStatus()
+
+    assert not status.start()
+    assert not status.listening
+
+
+def test_get_trigger_sql():
+
+    sql = live_status.get_trigger_sql(channel='test_channel')
+
+    assert "pg_notify('test_channel'" in sql
+    for schema, table in live_status.NOTIFY_TABLES:
+        assert 'ON {0}.{1} FOR EACH STATEMENT'.format(schema, table) in sql
+
+
+class NotifyConnection(object):
+    """A connection that receives a notification for each byte sent to it."""
+
+    def __init__(self):
+
+        self.sock, self.server = socket.socketpair()
+        self.notifies = []
+        self.statements = []
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql):
+        self.statements.append(sql)
+
+    def poll(self):
+        self.notifies.extend(self.sock.recv(1024))
+
+    def close(self):
+        self.sock.close()
+        self.server.close()
+
+
+def wait_for(condition, timeout=5.):
+
+    # time.time is patched by the observatory fixture.
+    for __ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        time.sleep(0.01)
+
+    raise AssertionError('timed out.')
+
+
+def test_listen(observatory, monkeypatch):
+
+    connections = []
+
+    def connect(self):
+        connections.append(NotifyConnection())
+        return connections[-1]
+
+    monkeypatch.setattr(live_status, 'triggers_installed', lambda database: True)
+    monkeypatch.setattr(live_status.LiveStatus, '_connect', connect)
+
+    status = live_status.LiveStatus(ttl=5., poll_timeout=0.01)
+
+    try:
+
+        wait_for(lambda: status.listening)
+
+        assert connections[0].statements == ['LISTEN sdssdb_live_status']
+
+        status.get()
+
+        # While listening the state does not expire.
+        mangadb.CurrentStatus.update(exposure_no=11).execute()
+        observatory[0] += 100.
+
+        assert status.current_status[0].exposure_no == 10
+
+        connections[0].server.send(b'x')
+        wait_for(lambda: status.notifications == 1)
+
+        assert status.current_status[0].exposure_no == 11
+        assert status.loads == 2
+
+    finally:
+        status.stop()
+
+    assert not status.listening
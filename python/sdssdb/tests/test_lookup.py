@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_lookup.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the bulk resolution of natural keys.
+
+
+from __future__ import absolute_import, division, print_function
+
+import pytest
+
+from sdssdb.core.cache import LRUCache
+from sdssdb.observatory import lookup, platedb
+
+
+@pytest.fixture
+def queries(sqlite_database, monkeypatch):
+    """Adds plates and exposures and records the queries run afterwards."""
+
+    monkeypatch.setattr(lookup, 'plate_cache', LRUCache(maxsize=100))
+    monkeypatch.setattr(lookup, 'exposure_cache', LRUCache(maxsize=100))
+
+    for plate_id in (1000, 1001, 1002):
+        platedb.Plate.create(plate_id=plate_id, plate_location=1)
+
+    boss = platedb.Survey.create(label='BOSS', plateplan_name='boss')
+    apogee = platedb.Survey.create(label='APOGEE', plateplan_name='apogee')
+
+    for exposure_no in (1, 2):
+        for survey in (boss, apogee):
+            platedb.Exposure.create(exposure_no=exposure_no, survey=survey, exposure_status=1,
+                                    exposure_flavor=1, survey_mode=1)
+
+    queries = []
+    execute_sql = sqlite_database.execute_sql
+
+    def recording_execute_sql(sql, *args, **kwargs):
+        queries.append(sql)
+        return execute_sql(sql, *args, **kwargs)
+
+    monkeypatch.setattr(sqlite_database, 'execute_sql', recording_execute_sql)
+
+    return queries
+
+
+def test_get_plates(queries):
+
+    result = lookup.get_plates(['1001', 999, 1000, 1001, 998], chunk_size=2)
+
+    assert [plate.plate_id if plate else None for plate in result.instances] == [
+        1001, None, 1000, 1001, None]
+    assert result.instances[0] is result.instances[3]
+    assert result.missing == [999, 998]
+
+    # Four unique keys in chunks of two.
+    assert len(queries) == 2
+
+
+def test_get_plates_cache(queries):
+
+    plate = lookup.get_plates([1000], use_cache=True).instances[0]
+
+    assert len(queries) == 1
+
+    result = lookup.get_plates([1000, 1002], use_cache=True)
+
+    assert result.instances[0] is plate
+    assert result.instances[1].plate_id == 1002
+    assert len(queries) == 2
+
+    assert lookup.get_plates([1000, 1002], use_cache=True).instances[1] is result.instances[1]
+    assert len(queries) == 2
+
+    assert lookup.get_plates([1000]).instances[0] is not plate
+
+
+def test_get_plates_empty(queries):
+
+    assert lookup.get_plates([]) == lookup.BulkLookup([], [])
+    assert len(queries) == 0
+
+
+def test_get_many_composite(queries):
+
+    Exposure = platedb.Exposure
+
+    result = lookup.get_many(Exposure, [Exposure.exposure_no, Exposure.survey],
+                             [(2, 1), (1, 2), (3, 1)])
+
+    assert [(exposure.exposure_no, exposure.survey_pk) if exposure else None
+            for exposure in result.instances] == [(2, 1), (1, 2), None]
+    assert result.missing == [(3, 1)]
+
+
+def test_get_exposures(queries):
+
+    boss = platedb.Survey.get(label='BOSS')
+    del queries[:]
+
+    keys = [(1, 'APOGEE'), (2, boss), (2, boss.pk), (1, 'MaNGA'), (5, 'BOSS')]
+
+    result = lookup.get_exposures(keys, use_cache=True)
+
+    assert [(exposure.exposure_no, exposure.survey_pk) if exposure else None
+            for exposure in result.instances] == [(1, 2), (2, 1), (2, 1), None, None]
+    assert result.missing == [(1, 'MaNGA'), (5, 'BOSS')]
+
+    # One query for the labels and one for the exposures.
+    assert len(queries) == 2
+    assert len(lookup.exposure_cache) == 2
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_metrics.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the metrics registry and its Prometheus renderer.
+
+
+from __future__ import absolute_import, division, print_function
+
+import threading
+
+import pytest
+
+from sdssdb.core.cache import LRUCache
+from sdssdb.core.metrics import MetricsRegistry, _Metric
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+def test_counter(registry):
+
+    counter = registry.counter('queries_total', 'Queries.', ('table', ))
+    counter.inc('platedb.plate')
+    counter.inc('platedb.plate', amount=2)
+
+    assert counter.get('platedb.plate') == 3
+    assert counter.get('platedb.exposure') == 0
+    assert registry.counter('queries_total', 'Queries.', ('table', )) is counter
+
+    with pytest.raises(ValueError):
+        registry.histogram('queries_total', 'Queries.')
+
+
+def test_counter_threads(registry):
+
+    counter = registry.counter('events', 'Events.')
+
+    def worker():
+        for __ in range(100):
+            counter.inc()
+
+    threads = [threading.Thread(target=worker) for __ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.get() == 1000
+
+    # The shards of the finished threads are folded on collection.
+    counter.inc()
+    assert counter.get() == 1001
+    assert len(counter._shards._shards) == 1
+
+
+def test_render_prometheus(registry):
+
+    counter = registry.counter('queries_total', 'Queries.', ('table', ))
+    counter.inc('plate')
+
+    histogram = registry.histogram('duration_seconds', 'Duration.', buckets=(0.1, 1.))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5.)
+
+    registry.gauge('temperature', 'Temperature.', lambda: 2.5)
+
+    cache = LRUCache()
+    cache.get('a')
+    registry.register_cache('plates', cache)
+
+    lines = registry.render_prometheus().splitlines()
+
+    assert '# HELP queries_total Queries.' in lines
+    assert '# TYPE queries_total counter' in lines
+    assert 'queries_total{table="plate"} 1' in lines
+
+    assert '# TYPE duration_seconds histogram' in lines
+    assert 'duration_seconds_bucket{le="0.1"} 1' in lines
+    assert 'duration_seconds_bucket{le="1.0"} 2' in lines
+    assert 'duration_seconds_bucket{le="+Inf"} 3' in lines
+    assert 'duration_seconds_sum 5.55' in lines
+    assert 'duration_seconds_count 3' in lines
+
+    assert 'temperature 2.5' in lines
+    assert 'sdssdb_cache_misses{cache="plates"} 1' in lines
+
+
+def test_escape_labels(registry):
+
+    counter = registry.counter('errors_total', 'Errors.', ('message', ))
+    counter.inc('a "quoted"\nvalue')
+
+    assert 'errors_total{message="a \\"quoted\\"\\nvalue"} 1' in \
+        registry.render_prometheus().splitlines()
+
+
+def test_reset(registry):
+
+    counter = registry.counter('events', 'Events.')
+    counter.inc()
+    registry.reset()
+
+    assert counter.get() == 0
+
+
+def test_metric_is_abstract():
+
+    with pytest.raises(TypeError):
+        _Metric('metric', 'A metric.')
+
+    class Constant(_Metric):
+
+        type = 'gauge'
+
+        def samples(self):
+            return [('', {}, 1.)]
+
+    assert Constant('constant', 'A constant.').samples() == [('', {}, 1.)]
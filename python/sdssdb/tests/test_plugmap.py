@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_plugmap.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the fiber maps of pluggings and the ingestion of plugmaps.
+
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import shutil
+
+import pytest
+
+from sdssdb.observatory import platedb, plugmap
+
+
+@pytest.fixture
+def plugging(sqlite_database, monkeypatch):
+
+    monkeypatch.setattr(plugmap, 'fiber_map_cache', plugmap.LRUCache(maxsize=8))
+
+    plate = platedb.Plate.create(plate_id=1000, plate_location=1)
+    holes_file = platedb.PlateHolesFile.create(plate=plate, filename='plateHoles-001000.par')
+
+    object_type = platedb.ObjectType.create(label='STAR')
+    for ii in range(4):
+        platedb.PlateHole.create(plate_holes_file=holes_file, xfocal=ii, yfocal=-ii,
+                                 object_type=object_type if ii % 2 == 0 else None)
+
+    return platedb.Plugging.create(plate=plate, status=1)
+
+
+def add_plugmap(plugging, filename, fibers, pointing_name='A', fscan_mjd=59000, fscan=1):
+
+    plugmap_m = platedb.PlPlugmapM.create(plugging=plugging, filename=filename,
+                                          pointing_name=pointing_name,
+                                          fscan_mjd=fscan_mjd, fscan=fscan)
+
+    for fiber_id, plate_hole_pk in fibers:
+        platedb.Fiber.create(pl_plugmap_m=plugmap_m, fiber=fiber_id, plate_hole=plate_hole_pk)
+
+    return plugmap_m
+
+
+def test_fiber_map(plugging):
+
+    plugmap_m = add_plugmap(plugging, 'plPlugMapM-1000-59000-01.par', [(1, 1), (3, 2)])
+
+    fiber_map = plugging.fiber_map
+
+    assert not fiber_map.flags.writeable
+    assert fiber_map['plate_hole_pk'].tolist() == [-1, 1, -1, 2]
+    assert fiber_map['pl_plugmap_m_pk'][1] == plugmap_m.pk
+    assert fiber_map['object_type'].tolist() == ['', 'STAR', '', '']
+    assert fiber_map['xfocal'][3] == 1.
+
+    assert plugmap.get_fiber_map(plugging.pk) is fiber_map
+    assert plugmap.get_fiber_map(plugging, use_cache=False) is not fiber_map
+
+
+def test_fiber_map_no_plugmap(plugging):
+
+    assert len(plugmap.get_fiber_map(plugging)) == 0
+
+
+def test_fiber_map_rescan(plugging):
+
+    add_plugmap(plugging, 'plPlugMapM-1000-59000-01.par', [(1, 1), (2, 2)], fscan=1)
+    rescan = add_plugmap(plugging, 'plPlugMapM-1000-59000-02.par', [(1, 2), (2, 1)], fscan=2)
+    add_plugmap(plugging, 'plPlugMapM-1000-58999-03.par', [(1, 3)], fscan_mjd=58999, fscan=3)
+
+    fiber_map = plugmap.get_fiber_map(plugging)
+
+    # The latest scan replaces the others.
+    assert fiber_map['plate_hole_pk'].tolist() == [-1, 2, 1]
+    assert set(fiber_map['pl_plugmap_m_pk'][1:]) == {rescan.pk}
+
+
+def test_fiber_map_pointings(plugging):
+
+    add_plugmap(plugging, 'plPlugMapM-1000-59000-01A.par', [(1, 1)], pointing_name='A')
+    add_plugmap(plugging, 'plPlugMapM-1000-59000-01B.par', [(2, 2)], pointing_name='B')
+
+    assert plugmap.get_fiber_map(plugging)['plate_hole_pk'].tolist() == [-1, 1, 2]
+
+    add_plugmap(plugging, 'plPlugMapM-1000-59000-02B.par', [(1, 3)], pointing_name='B', fscan=2)
+
+    with pytest.raises(ValueError):
+        plugmap.get_fiber_map(plugging, use_cache=False)
+
+
+def test_get_fiber_maps(plugging):
+
+    other = platedb.Plugging.create(plate=plugging.plate, status=1)
+
+    add_plugmap(plugging, 'plPlugMapM-1000-59000-01.par', [(1, 1)])
+    add_plugmap(other, 'plPlugMapM-1000-59001-01.par', [(2, 4)], fscan_mjd=59001)
+
+    fiber_maps = plugmap.get_fiber_maps([plugging, other.pk])
+
+    assert sorted(fiber_maps) == [plugging.pk, other.pk]
+    assert fiber_maps[plugging.pk]['plate_hole_pk'].tolist() == [-1, 1]
+    assert fiber_maps[other.pk]['plate_hole_pk'].tolist() == [-1, -1, 4]
+
+
+def parse_plugmap(path, content):
+    """Parses the test plugmaps, one ``fiber_id plate_hole_pk`` per line."""
+
+    fibers = [dict(zip(('fiber', 'plate_hole'), map(int, line.split())))
+              for line in content.decode().splitlines()]
+
+    return {'plugging': 1, 'pointing_name': 'A'}, fibers
+
+
+@pytest.fixture
+def plugmap_dir(plugging, sqlite_database, tmp_path):
+
+    sqlite_database.execute_sql('CREATE UNIQUE INDEX platedb.plplugmapm_filename '
+                                'ON pl_plugmap_m (filename)')
+
+    for name, content in (('plPlugMapM-1000-59000-01.par', '1 1\n2 2\n'),
+                          ('plPlugMapM-1001-59000-01.par', '1 3\n')):
+        tmp_path.joinpath(name).write_text(content)
+
+    return tmp_path
+
+
+def test_ingest_plugmaps(plugmap_dir):
+
+    paths = sorted(str(path) for path in plugmap_dir.glob('plPlugMapM-*.par'))
+
+    assert plugmap.ingest_plugmaps(paths, parse_plugmap, dry_run=True)['inserted'] == paths
+    assert platedb.PlPlugmapM.select().count() == 0
+
+    result = plugmap.ingest_plugmap_directory(str(plugmap_dir), parse_plugmap)
+
+    assert result == {'skipped': [], 'inserted': paths, 'updated': []}
+    assert platedb.Fiber.select().count() == 3
+
+    stored = plugmap.get_stored_checksums(paths)
+    assert stored == {path: plugmap.md5sum(path) for path in paths}
+
+    # Unchanged files are skipped; changed files replace their fibers.
+    plugmap_dir.joinpath('plPlugMapM-1001-59000-01.par').write_text('3 4\n4 1\n')
+
+    result = plugmap.ingest_plugmaps(paths, parse_plugmap)
+
+    assert result == {'skipped': paths[:1], 'inserted': [], 'updated': paths[1:]}
+    assert platedb.PlPlugmapM.select().count() == 2
+    assert sorted(fiber.fiber for fiber in platedb.Fiber.select()) == [1, 2, 3, 4]
+
+
+def test_ingest_moved_plugmap(plugmap_dir):
+
+    path = str(plugmap_dir / 'plPlugMapM-1000-59000-01.par')
+    plugmap.ingest_plugmaps([path], parse_plugmap)
+
+    moved = plugmap_dir / 'moved'
+    moved.mkdir()
+    moved_path = str(moved / 'plPlugMapM-1000-59000-01.par')
+    os.rename(path, moved_path)
+
+    # The checksums are keyed by path, so the stored directory is updated.
+    assert list(plugmap.get_stored_checksums([moved_path])) == [path]
+    assert plugmap.ingest_plugmaps([moved_path], parse_plugmap)['updated'] == [moved_path]
+    assert platedb.PlPlugmapM.get().dirname == str(moved)
+    assert plugmap.ingest_plugmaps([moved_path], parse_plugmap)['skipped'] == [moved_path]
+
+
+def test_ingest_same_filename(plugmap_dir):
+
+    path = str(plugmap_dir / 'plPlugMapM-1000-59000-01.par')
+
+    copy = plugmap_dir / 'copy'
+    copy.mkdir()
+    copy_path = str(copy / 'plPlugMapM-1000-59000-01.par')
+    shutil.copy(path, copy_path)
+
+    assert plugmap.ingest_plugmaps([path, copy_path], parse_plugmap)['skipped'] == [copy_path]
+
+    copy.joinpath('plPlugMapM-1000-59000-01.par').write_text('5 1\n')
+
+    with pytest.raises(ValueError):
+        plugmap.ingest_plugmaps([path, copy_path], parse_plugmap)
+
+
+def test_plugmap_model_has_no_index():
+
+    # The unique index is created by a migration, not by the model.
+    assert platedb.PlPlugmapM._meta.indexes == []
+    assert 'UNIQUE INDEX' in plugmap.PLUGMAP_UNIQUE_INDEX_SQL
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_profilometry.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the bulk check of profilometries against their tolerances.
+
+
+from __future__ import absolute_import, division, print_function
+
+import datetime
+
+import pytest
+
+from sdssdb.observatory import platedb, profilometry
+
+
+def add_tolerances(version, low, high):
+
+    values = {}
+    for radius in profilometry.RADII:
+        values.update({radius + '_low': low, radius + '_high': high})
+
+    return platedb.ProfTolerances.create(survey=1, version=version, **values)
+
+
+def add_profilometry(plugging, tolerances, day, measurements):
+
+    prof = platedb.Profilometry.create(plugging=plugging, prof_tolerances=tolerances,
+                                       timestamp=datetime.datetime(2020, 1, day))
+
+    for number, values in enumerate(measurements):
+        platedb.ProfMeasurement.create(profilometry=prof, number=number,
+                                       **dict(zip(profilometry.RADII, values)))
+
+    return prof
+
+
+@pytest.fixture
+def tolerances(sqlite_database, monkeypatch):
+
+    monkeypatch.setattr(profilometry, '_tolerance_cache', profilometry._ToleranceCache())
+
+    return [add_tolerances(1, -1., 1.), add_tolerances(2, -2., 2.)]
+
+
+def test_get_tolerances(tolerances):
+
+    pks, low, high = profilometry.get_tolerances()
+
+    assert pks.tolist() == [tolerances[0].pk, tolerances[1].pk]
+    assert low.shape == (2, 5)
+    assert high[1].tolist() == [2.] * 5
+
+    add_tolerances(3, 0., 0.)
+
+    assert len(profilometry.get_tolerances()[0]) == 2
+    assert len(profilometry.get_tolerances(refresh=True)[0]) == 3
+
+
+def test_check_profilometries(tolerances):
+
+    strict, loose = tolerances
+
+    first = add_profilometry(1, strict, 1, [(0., 0., 0., 0., 0.), (1.5, 0., 0., 0., 0.)])
+    last = add_profilometry(1, loose, 2, [(1.5, None, 0., 0., 0.)])
+    other = add_profilometry(2, strict, 1, [(0., 0., 0., 0., -1.5)])
+
+    check = profilometry.check_profilometries(pluggings=[1, 2])
+
+    assert len(check.measurement_pk) == 4
+    assert check.passed.tolist() == [True, False, True, False]
+    assert check.passed_values[1].tolist() == [False, True, True, True, True]
+
+    assert check.profilometries.tolist() == [first.pk, last.pk, other.pk]
+    assert check.profilometry_passed.tolist() == [False, True, False]
+
+    # Plugging 1 passes because its latest profilometry does.
+    assert check.pluggings.tolist() == [1, 2]
+    assert check.plugging_passed.tolist() == [True, False]
+
+    assert profilometry.check_profilometries([first]).profilometries.tolist() == [first.pk]
+
+
+def test_check_new_tolerances(tolerances):
+
+    profilometry.get_tolerances()
+
+    prof = add_profilometry(1, add_tolerances(3, -3., 3.), 1, [(2.5, 0., 0., 0., 0.)])
+
+    assert profilometry.check_profilometries([prof]).passed.tolist() == [True]
+
+
+def test_check_unknown_tolerances(tolerances):
+
+    prof = add_profilometry(1, 100, 1, [(0., 0., 0., 0., 0.)])
+
+    with pytest.raises(ValueError):
+        profilometry.check_profilometries([prof])
+
+
+def test_check_no_arguments(tolerances):
+
+    with pytest.raises(ValueError):
+        profilometry.check_profilometries()
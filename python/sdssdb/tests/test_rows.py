@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_rows.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the read-only rows result mode of the model queries.
+
+
+from __future__ import absolute_import, division, print_function
+
+import pytest
+
+from sdssdb.database.rows import get_row_class
+from sdssdb.observatory import mangadb, platedb
+
+
+Plate = platedb.Plate
+
+
+@pytest.fixture
+def plates(sqlite_database):
+
+    return [Plate.create(plate_id=plate_id, plate_location=1, comment='plate')
+            for plate_id in (1000, 1001)]
+
+
+def test_rows(plates):
+
+    rows = list(Plate.select().order_by(Plate.pk).rows())
+
+    assert len(rows) == 2
+    assert type(rows[0]).__name__ == 'PlateRow'
+    assert rows[0].plate_id == 1000
+    assert rows[1][rows[1]._fields.index('plate_id')] == 1001
+    assert rows[0].plate_location == 1
+    assert repr(rows[0]) == '<PlateRow: pk=1, plate_id=1000>'
+
+    with pytest.raises(AttributeError):
+        rows[0].plate_id = 1
+
+    with pytest.raises(AttributeError):
+        rows[0].__dict__
+
+
+def test_rows_columns(plates):
+
+    rows = list(Plate.select(Plate.plate_id, Plate.comment).order_by(Plate.plate_id).rows())
+
+    assert rows[0]._fields == ('plate_id', 'comment')
+    assert repr(rows[0]) == '<PlateRow: plate_id=1000>'
+    assert type(rows[0]) is type(rows[1])
+
+
+def test_rows_off(plates):
+
+    query = Plate.select().rows()
+
+    assert isinstance(query.rows(False).first(), Plate)
+    assert not isinstance(query.first(), Plate)
+
+
+def test_rows_converters(sqlite_database):
+
+    mangadb.Exposure.create(dither_position=[1., 2.])
+
+    row = mangadb.Exposure.select(mangadb.Exposure.dither_position).rows().get()
+
+    assert row.dither_position.tolist() == [1., 2.]
+
+
+def test_get_row_class():
+
+    row_class = get_row_class(Plate, ('pk', 'plate_id', 'label'))
+
+    assert get_row_class(Plate, ['pk', 'plate_id', 'label']) is row_class
+    assert get_row_class(Plate, ('pk', )) is not row_class
+    assert row_class._model is Plate
+
+    assert repr(row_class(1, 1000, 'a')) == "<PlateRow: pk=1, plate_id=1000, label='a'>"
+    assert row_class.__slots__ == ()
+
+
+def test_model_str(plates):
+
+    assert str(plates[0]) == str(plates[0]) == 'pk=1, plate_id=1000'
+    assert Plate.print_fields == ['plate_id']
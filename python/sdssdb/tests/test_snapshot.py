@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_snapshot.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the creation of SQLite snapshots.
+
+
+from __future__ import absolute_import, division, print_function
+
+import datetime
+
+import pytest
+
+from sdssdb.core.compat import FixedOffset
+from sdssdb.database.database import SnapshotDatabase
+from sdssdb.observatory import platedb, snapshot as snapshot_module
+from sdssdb.observatory.snapshot import _copy_rows, _field_index, _parse_timestamp
+
+
+UTC = FixedOffset(0)
+
+
+@pytest.fixture
+def snapshot(tmp_path, models):
+
+    snapshot = SnapshotDatabase(str(tmp_path / 'snapshot'))
+    snapshot.connect()
+    snapshot.create_model_tables(models, indexes=False)
+
+    yield snapshot
+
+    snapshot.close()
+
+
+@pytest.fixture
+def exposures(sqlite_database):
+
+    observation_status = platedb.ObservationStatus.create(label='Pending')
+    exposure_status = platedb.ExposureStatus.create(label='Good')
+
+    observations = [platedb.Observation.create(observation_status=observation_status,
+                                               mjd=59000 + ii) for ii in range(3)]
+
+    return [platedb.Exposure.create(observation=observations[ii % 3],
+                                    exposure_status=exposure_status,
+                                    exposure_no=ii, exposure_time=900. + ii,
+                                    comment='exposure {0}'.format(ii))
+            for ii in range(7)]
+
+
+def test_field_index():
+
+    fields = platedb.Exposure._meta.sorted_fields
+
+    for index, field in enumerate(fields):
+        assert _field_index(platedb.Exposure, field) == index
+
+
+def test_copy_rows(sqlite_database, snapshot, exposures):
+
+    Exposure = platedb.Exposure
+
+    index = _field_index(Exposure, Exposure.observation)
+    collect = {index: set()}
+
+    n_rows = _copy_rows(sqlite_database, snapshot, Exposure, Exposure.exposure_no >= 2,
+                        2, collect)
+
+    assert n_rows == 5
+    assert collect[index] == set(exposure.observation.pk for exposure in exposures[2:])
+
+    columns = ['pk', 'exposure_no', 'exposure_time', 'comment', 'observation_pk']
+    rows = snapshot.execute_sql('SELECT {0} FROM platedb.exposure ORDER BY pk'.format(
+        ', '.join(columns))).fetchall()
+
+    assert rows == [(exposure.pk, exposure.exposure_no, exposure.exposure_time,
+                     exposure.comment, exposure.observation.pk)
+                    for exposure in exposures[2:]]
+
+
+class TargetSnapshot(SnapshotDatabase):
+    """A snapshot that can be filled from the SQLite test database."""
+
+
+@pytest.fixture
+def plates(sqlite_database, monkeypatch):
+    """Two plates, each with a plugging, an observation, and two exposures."""
+
+    # Only the snapshot being created is rejected as a source.
+    monkeypatch.setattr(snapshot_module, 'SnapshotDatabase', TargetSnapshot)
+
+    observation_status = platedb.ObservationStatus.create(label='Pending')
+    exposure_status = platedb.ExposureStatus.create(label='Good')
+    survey = platedb.Survey.create(label='MaNGA', plateplan_name='manga')
+
+    plates = []
+    for ii in range(2):
+        plate = platedb.Plate.create(plate_id=1000 + ii, plate_location=1)
+        platedb.PlateToSurvey.create(plate=plate, survey=survey)
+        plugging = platedb.Plugging.create(plate=plate, status=1)
+        observation = platedb.Observation.create(plugging=plugging, mjd=59000 + ii,
+                                                 observation_status=observation_status)
+        for jj in range(2):
+            platedb.Exposure.create(observation=observation, exposure_status=exposure_status,
+                                    exposure_no=10 * ii + jj)
+        plates.append(plate)
+
+    return plates
+
+
+def get_pks(database, table):
+
+    return [pk for (pk, ) in database.execute_sql(
+        'SELECT pk FROM platedb.{0} ORDER BY pk'.format(table)).fetchall()]
+
+
+def test_select_plates(plates):
+
+    def plate_ids(**kwargs):
+        return [platedb.Plate.get_by_id(pk).plate_id
+                for (pk, ) in snapshot_module.select_plates(**kwargs).tuples()]
+
+    assert plate_ids() == [1000, 1001]
+    assert plate_ids(plates=[1001, 2000]) == [1001]
+    assert plate_ids(surveys=['MaNGA']) == [1000, 1001]
+    assert plate_ids(surveys=['APOGEE-2']) == []
+    assert plate_ids(mjd_range=(59001, 59010)) == [1001]
+
+
+def test_create_snapshot(sqlite_database, plates, tmp_path):
+
+    path = str(tmp_path / 'snapshot')
+
+    snapshot = snapshot_module.create_snapshot(path, plates=[1000], source=sqlite_database)
+
+    assert isinstance(snapshot, TargetSnapshot)
+    assert snapshot.is_closed()
+
+    snapshot.connect()
+
+    assert get_pks(snapshot, 'plate') == [plates[0].pk]
+    assert get_pks(snapshot, 'exposure') == [1, 2]
+    assert get_pks(snapshot, 'exposure_status') == [1]
+    assert snapshot.get_info('source') == sqlite_database.database
+    assert snapshot.get_info('selection') == ('{"plates": [1000], "surveys": null, '
+                                              '"mjd_range": null}')
+
+    snapshot.close()
+
+    # Creating it again on the same path adds the new plates.
+    snapshot_module.create_snapshot(path, source=sqlite_database)
+    snapshot.connect()
+
+    assert get_pks(snapshot, 'plate') == [plate.pk for plate in plates]
+    assert get_pks(snapshot, 'exposure') == [1, 2, 3, 4]
+
+    snapshot.close()
+
+
+def test_create_snapshot_from_snapshot(sqlite_database, tmp_path):
+
+    with pytest.raises(ValueError):
+        snapshot_module.create_snapshot(str(tmp_path / 'snapshot'), source=sqlite_database)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2021-03-04', datetime.datetime(2021, 3, 4)),
+    ('2021-03-04 05:06:07', datetime.datetime(2021, 3, 4, 5, 6, 7)),
+    ('2021-03-04T05:06:07.25', datetime.datetime(2021, 3, 4, 5, 6, 7, 250000)),
+    ('2021-03-04 05:06:07Z',
+     datetime.datetime(2021, 3, 4, 5, 6, 7, tzinfo=UTC)),
+    ('2021-03-04 05:06:07-04:00',
+     datetime.datetime(2021, 3, 4, 9, 6, 7, tzinfo=UTC)),
+    (None, None)])
+def test_parse_timestamp(value, expected):
+
+    assert _parse_timestamp(value) == expected
+
+
+def test_parse_timestamp_offset():
+
+    timestamp = _parse_timestamp('2021-03-04 05:06:07+0530')
+
+    assert timestamp.utcoffset() == datetime.timedelta(hours=5, minutes=30)
+    assert timestamp.tzname() == 'UTC+05:30'
+    assert _parse_timestamp(timestamp.isoformat()) == timestamp
+    assert _parse_timestamp(str(timestamp)) == timestamp
+
+
+def test_parse_timestamp_invalid():
+
+    with pytest.raises(ValueError):
+        _parse_timestamp('yesterday')
+
+
+def test_sync_snapshot(sqlite_database, plates, tmp_path):
+
+    path = str(tmp_path / 'snapshot')
+    snapshot_module.create_snapshot(path, plates=[1000], source=sqlite_database)
+
+    # New exposures of both plates; only those of plate 1000 are synced.
+    for plate in plates:
+        observation = plate.pluggings.get().observations.get()
+        platedb.Exposure.create(observation=observation, exposure_status=1, exposure_no=99)
+
+    n_rows = snapshot_module.sync_snapshot(path, source=sqlite_database)
+
+    assert n_rows['platedb.exposure'] == 1
+    assert n_rows['platedb.plugging'] == 0
+
+    snapshot = TargetSnapshot(path)
+    snapshot.connect()
+
+    assert get_pks(snapshot, 'exposure') == [1, 2, 5]
+    assert snapshot.get_info('watermark.platedb.exposure') == '5'
+    assert snapshot.get_info('synced') is not None
+
+    snapshot.close()
+
+    assert snapshot_module.sync_snapshot(path, source=sqlite_database)['platedb.exposure'] == 0
+
+
+def test_sync_timestamp_watermark(sqlite_database, plates, tmp_path):
+
+    History = platedb.PlateCompletionStatusHistory
+
+    path = str(tmp_path / 'snapshot')
+    snapshot_module.create_snapshot(path, source=sqlite_database)
+
+    for plate, day in ((plates[0], 1), (plates[1], 3), (plates[0], 3)):
+        History.create(plate=plate, plate_completion_status=1, comment='',
+                       timestamp=datetime.datetime(2021, 1, day))
+
+    table = 'platedb.plate_completion_status_history'
+
+    assert snapshot_module.sync_snapshot(path, source=sqlite_database)[table] == 3
+
+    # Rows with the same timestamp as the watermark are pulled again, in
+    # case some were committed after the last sync.
+    History.create(plate=plates[1], plate_completion_status=2, comment='',
+                   timestamp=datetime.datetime(2021, 1, 3))
+    History.create(plate=plates[1], plate_completion_status=2, comment='',
+                   timestamp=datetime.datetime(2021, 1, 2))
+
+    assert snapshot_module.sync_snapshot(path, source=sqlite_database)[table] == 3
+
+    snapshot = TargetSnapshot(path)
+    snapshot.connect()
+
+    assert get_pks(snapshot, 'plate_completion_status_history') == [1, 2, 3, 4]
+    assert _parse_timestamp(snapshot.get_info('watermark.' + table)) == \
+        datetime.datetime(2021, 1, 3)
+
+    snapshot.close()
+
+
+def test_sync_parses_timestamps(sqlite_database, plates, tmp_path):
+
+    History = platedb.PlateCompletionStatusHistory
+
+    path = str(tmp_path / 'snapshot')
+    snapshot = snapshot_module.create_snapshot(path, source=sqlite_database)
+
+    # As text, the first timestamp would be the largest.
+    snapshot.connect()
+    for pk, timestamp in ((1, '2021-01-10T00:00:00'), (2, '2021-01-10 06:00:00')):
+        snapshot.execute_sql('INSERT INTO platedb.plate_completion_status_history '
+                             '(pk, plate_pk, plate_completion_status_pk, comment, timestamp) '
+                             'VALUES (?, 1, 1, \'\', ?)', (pk, timestamp))
+    snapshot.close()
+
+    History.create(plate=plates[0], plate_completion_status=1, comment='',
+                   timestamp=datetime.datetime(2021, 1, 10, 3))
+    History.create(plate=plates[0], plate_completion_status=1, comment='',
+                   timestamp=datetime.datetime(2021, 1, 10, 6))
+
+    n_rows = snapshot_module.sync_snapshot(path, source=sqlite_database)
+
+    assert n_rows['platedb.plate_completion_status_history'] == 1
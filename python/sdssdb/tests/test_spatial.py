@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_spatial.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the in-process pointing and focal plane indices.
+
+
+from __future__ import absolute_import, division, print_function
+
+import numpy
+import pytest
+
+from sdssdb.observatory import platedb, spatial
+
+
+def add_plate(plate_id, ra, dec):
+
+    design = platedb.Design.create()
+    plate = platedb.Plate.create(plate_id=plate_id, design=design, plate_location=1)
+    pointing = platedb.Pointing.create(design=design, center_ra=ra, center_dec=dec)
+    platedb.PlatePointing.create(plate=plate, pointing=pointing,
+                                 pointing_name='A', priority=1)
+
+    return plate, pointing
+
+
+@pytest.fixture
+def plates(sqlite_database):
+
+    return [add_plate(1000, 10., 20.), add_plate(1001, 10.5, 20.), add_plate(1002, 200., -30.)]
+
+
+def test_cone_search(plates):
+
+    index = spatial.PointingIndex()
+
+    assert index.refresh() == 3
+    assert len(index) == 3
+
+    matches = index.cone_search(10., 20., 1.)
+
+    assert matches['plate_id'].tolist() == [1000, 1001]
+    assert matches['separation'][0] == pytest.approx(0.)
+    assert matches['separation'][1] == pytest.approx(0.5 * numpy.cos(numpy.radians(20.)),
+                                                      rel=1e-3)
+
+
+def test_cone_search_empty():
+
+    index = spatial.PointingIndex()
+
+    assert len(index.cone_search(10., 20., 1.)) == 0
+
+
+def test_crossmatch(plates):
+
+    index = spatial.PointingIndex()
+    index.refresh()
+
+    pos_idx, data_idx, separation = index.crossmatch([10., 200., 100.], [20., -30., 0.], 0.1)
+
+    assert pos_idx.tolist() == [0, 1]
+    assert index.data['plate_id'][data_idx].tolist() == [1000, 1002]
+    assert numpy.allclose(separation, 0.)
+
+
+def test_refresh_incremental(plates):
+
+    index = spatial.PointingIndex()
+    index.refresh()
+
+    assert index.refresh() == 0
+
+    add_plate(1003, 10.2, 20.)
+
+    assert index.refresh() == 1
+    assert len(index) == 4
+    assert index.watermark == platedb.PlatePointing.select().count()
+
+
+def test_refresh_updated_pointing(plates):
+
+    index = spatial.PointingIndex()
+    index.refresh()
+
+    __, pointing = plates[2]
+    pointing.center_ra = 10.
+    pointing.center_dec = 20.
+    pointing.save()
+
+    # The rows already indexed changed, so the index is reloaded.
+    assert index.refresh() == 3
+    assert index.cone_search(10., 20., 0.1)['plate_id'].tolist() == [1000, 1002]
+
+
+def test_refresh_deleted_pointing(plates):
+
+    index = spatial.PointingIndex()
+    index.refresh()
+
+    platedb.PlatePointing.delete().where(platedb.PlatePointing.plate == plates[0][0]).execute()
+
+    assert index.refresh() == 2
+    assert index.cone_search(10., 20., 0.1)['plate_id'].tolist() == []
+
+
+def test_plate_cone_search(plates, monkeypatch):
+
+    monkeypatch.setattr(spatial, '_pointing_index', None)
+
+    assert [plate.plate_id for plate in platedb.Plate.cone_search(10., 20., 1.)] == [1000, 1001]
+    assert list(platedb.Plate.cone_search(100., 0., 1.)) == []
+
+
+@pytest.fixture
+def holes(plates):
+
+    plate = plates[0][0]
+    holes_file = platedb.PlateHolesFile.create(plate=plate, filename='plateHoles-001000.par')
+
+    for xfocal, yfocal, object_type in ((0., 0., 1), (10., 0., None), (0., 20., 2),
+                                        (None, 5., 1)):
+        platedb.PlateHole.create(plate_holes_file=holes_file, xfocal=xfocal, yfocal=yfocal,
+                                 plate_hole_type=1, object_type=object_type)
+
+    return plate
+
+
+def test_focal_plane_index(holes):
+
+    index = spatial.FocalPlaneIndex(holes.pk)
+
+    # The hole with a null xfocal is not indexed.
+    assert len(index) == 3
+    assert index.data['object_type_pk'].mask.tolist() == [False, True, False]
+
+    data_idx, distance = index.nearest(9., 1.)
+
+    assert index.data['pk'][data_idx] == 2
+    assert distance == pytest.approx(numpy.hypot(1., 1.))
+    assert index.nearest_hole(9., 1.).pk == 2
+
+
+def test_focal_plane_nearest_clips_k(holes):
+
+    index = spatial.FocalPlaneIndex(holes.pk)
+
+    data_idx, distance = index.nearest([0.], [0.], k=10)
+
+    assert data_idx.shape == (1, 3)
+    assert numpy.isfinite(distance).all()
+    assert index.data['pk'][data_idx[0]].tolist() == [1, 2, 3]
+
+
+def test_focal_plane_query_radius(holes):
+
+    index = spatial.FocalPlaneIndex(holes.pk)
+
+    result = index.query_radius(0., 1., 15.)
+
+    assert result['pk'].tolist() == [1, 2]
+    assert result['object_type_pk'].mask.tolist() == [False, True]
+    assert result['distance'].tolist() == pytest.approx([1., numpy.hypot(10., 1.)])
+
+
+def test_focal_plane_no_holes(plates):
+
+    index = spatial.FocalPlaneIndex(plates[1][0].pk)
+
+    assert len(index) == 0
+    assert len(index.query_radius(0., 0., 100.)) == 0
+
+    with pytest.raises(ValueError):
+        index.nearest(0., 0.)
+
+
+def test_get_focal_plane_index(holes, monkeypatch):
+
+    monkeypatch.setattr(spatial, 'focal_plane_cache', spatial.LRUCache(maxsize=2))
+
+    index = spatial.get_focal_plane_index(holes)
+
+    assert spatial.get_focal_plane_index(holes.pk) is index
+    assert holes.focal_plane_index is index
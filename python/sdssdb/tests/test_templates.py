@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_templates.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the precompiled query templates.
+
+
+from __future__ import absolute_import, division, print_function
+
+import pytest
+
+from sdssdb.database.database import SDSSDatabase
+from sdssdb.database.templates import Param, QueryTemplate
+from sdssdb.observatory import platedb
+
+
+DesignField = platedb.DesignField
+DesignValue = platedb.DesignValue
+
+
+@pytest.fixture
+def design(sqlite_database):
+
+    design = platedb.Design.create()
+
+    for label, value in (('racen', '10.5'), ('deccen', '-3.2')):
+        field = DesignField.create(label=label)
+        DesignValue.create(design=design, field=field, value=value)
+
+    return design
+
+
+value_by_label = QueryTemplate(
+    lambda: (DesignValue.select()
+                        .join(DesignField)
+                        .where((DesignValue.design == Param('design')) &
+                               (DesignField.label == Param('label')))))
+
+
+def test_template(design, monkeypatch):
+
+    statements = []
+    execute_sql = design._meta.database.execute_sql
+
+    def recording_execute_sql(sql, params=None, *args, **kwargs):
+        statements.append((sql, params))
+        return execute_sql(sql, params, *args, **kwargs)
+
+    monkeypatch.setattr(design._meta.database, 'execute_sql', recording_execute_sql)
+
+    # Model instances are converted to their pk by the field.
+    values = value_by_label.execute(design=design, label='racen')
+
+    assert [value.value for value in values] == ['10.5']
+    assert isinstance(values[0], DesignValue)
+
+    assert value_by_label.first(design=design.pk, label='deccen').value == '-3.2'
+    assert value_by_label.first(design=design.pk, label='ha') is None
+
+    # The SQL is generated once.
+    assert len(set(sql for sql, __ in statements)) == 1
+    assert [params for __, params in statements][:2] == [[design.pk, 'racen'],
+                                                         [design.pk, 'deccen']]
+
+
+def test_template_scalar(design):
+
+    template = QueryTemplate(lambda: DesignField.select(DesignField.pk)
+                             .where(DesignField.label == Param('label')))
+
+    assert template.scalar(label='deccen') == 2
+    assert template.scalar(label='ha') is None
+
+
+def test_template_missing_param(design):
+
+    with pytest.raises(ValueError, match='missing template parameters: label.'):
+        value_by_label.execute(design=design)
+
+
+def test_template_rebind(design, models):
+
+    compiled = value_by_label.compile()
+
+    assert value_by_label.compile() is compiled
+
+    with platedb.database.bind_ctx(models):
+        assert value_by_label.compile() is not compiled
+
+    assert value_by_label.compile() is compiled
+
+
+def test_model_methods(design):
+
+    assert design.get_value_for_field('RACEN').value == '10.5'
+
+    with pytest.raises(ValueError):
+        design.get_value_for_field('ha')
+
+
+class StatementNameError(Exception):
+    """Raised for an ``EXECUTE`` of a statement not prepared in the session."""
+
+    pgcode = '26000'
+
+
+class PreparedCursor(object):
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.row = None
+
+    def execute(self, sql, params=None):
+
+        self.conn.statements.append(sql.split(' ')[0])
+
+        if sql.startswith('PREPARE'):
+            self.conn.prepared.add(sql.split(' ')[1])
+        elif sql.startswith('EXECUTE'):
+            if sql.split(' ')[1] not in self.conn.prepared:
+                raise StatementNameError('prepared statement does not exist.')
+            self.row = (params[0] * 2, )
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+class PreparedConnection(object):
+
+    def __init__(self):
+        self.statements = []
+        self.prepared = set()
+
+    def cursor(self):
+        return PreparedCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.statements.append('ROLLBACK')
+
+    def close(self):
+        pass
+
+
+class PreparedDatabase(SDSSDatabase):
+
+    def _connect(self):
+        return PreparedConnection()
+
+    def _set_server_version(self, conn):
+        self.server_version = (120000, )
+
+
+@pytest.fixture
+def prepared_database(models):
+
+    database = PreparedDatabase()
+    database.numpy_arrays = False
+    database.collect_metrics = False
+    database.init('sdss5db')
+
+    with database.bind_ctx(models):
+        database.connect()
+        yield database
+        database.close()
+
+
+def test_prepared(prepared_database):
+
+    template = QueryTemplate(lambda: DesignField.select(DesignField.pk)
+                             .where(DesignField.pk == Param('pk')), prepare=True)
+
+    conn = prepared_database.connection()
+
+    assert template.scalar(pk=1) == 2
+    assert template.scalar(pk=2) == 4
+    assert conn.statements == ['PREPARE', 'EXECUTE', 'EXECUTE']
+
+    # The statement is prepared again if the session discarded it.
+    conn.prepared.clear()
+    del conn.statements[:]
+
+    assert template.scalar(pk=3) == 6
+    assert conn.statements == ['EXECUTE', 'ROLLBACK', 'PREPARE', 'EXECUTE']
+
+
+def test_prepared_in_transaction(prepared_database):
+
+    template = QueryTemplate(lambda: DesignField.select(DesignField.pk)
+                             .where(DesignField.pk == Param('pk')), prepare=True)
+
+    template.scalar(pk=1)
+    prepared_database.connection().prepared.clear()
+
+    with pytest.raises(StatementNameError):
+        with prepared_database.atomic():
+            template.scalar(pk=1)
+
+    # The next call prepares the statement again.
+    assert template.scalar(pk=2) == 4
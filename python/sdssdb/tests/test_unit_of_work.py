@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_unit_of_work.py
+#
+# Created by agent on 19 Oct 2026.
+#
+# Tests the batched inserts of the unit of work.
+
+
+from __future__ import absolute_import, division, print_function
+
+import sqlite3
+
+import pytest
+from peewee import PostgresqlDatabase
+
+from sdssdb.database.unit_of_work import UnitOfWork
+
+
+@pytest.fixture
+def lookups(sqlite_database):
+
+    from sdssdb.observatory import platedb
+
+    return (platedb.ObservationStatus.create(label='Pending'),
+            platedb.ExposureStatus.create(label='Good'),
+            platedb.Camera.create(label='b1'))
+
+
+def add_exposures(uow, lookups, n_exposures):
+    """Adds the children before their parents, which the flush must reorder."""
+
+    from sdssdb.observatory import platedb
+
+    observation_status, exposure_status, camera = lookups
+
+    frames = []
+    for ii in range(n_exposures):
+        observation = platedb.Observation(observation_status=observation_status, mjd=59000)
+        exposure = platedb.Exposure(observation=observation, exposure_status=exposure_status,
+                                    exposure_no=ii)
+        frames.append(uow.add(platedb.CameraFrame(exposure=exposure, camera=camera, sn2=ii)))
+        uow.add(exposure)
+        uow.add(observation)
+
+    return frames
+
+
+@pytest.mark.parametrize('reserve', [False, True])
+def test_flush_order(sqlite_database, lookups, monkeypatch, reserve):
+
+    from sdssdb.observatory import platedb
+
+    if reserve:
+        # Hands out pks as a PostgreSQL sequence would, in a different order
+        # from the instances, so that the batched inserts are used.
+        pks = iter(range(1000, 0, -1))
+        monkeypatch.setattr(UnitOfWork, '_reserve_pks',
+                            lambda self, model, n_pks: [next(pks) for __ in range(n_pks)])
+
+    with UnitOfWork(sqlite_database) as uow:
+        frames = add_exposures(uow, lookups, 3)
+        assert platedb.Exposure.select().count() == 0
+
+    assert uow.n_flushes == 1
+    assert uow.n_inserted == 9
+    assert len(uow) == 0
+
+    for ii, frame in enumerate(frames):
+        assert frame.pk is not None
+        stored = platedb.CameraFrame.get_by_id(frame.pk)
+        assert stored.sn2 == ii
+        assert stored.exposure.exposure_no == ii
+        assert stored.exposure.observation.pk == frame.exposure.observation.pk
+        assert (frame.pk >= 990) is reserve
+
+
+def test_flush_max_size(sqlite_database, lookups):
+
+    from sdssdb.observatory import platedb
+
+    uow = UnitOfWork(sqlite_database, max_size=3)
+    add_exposures(uow, lookups, 2)
+
+    assert uow.n_flushes == 2
+    assert platedb.CameraFrame.select().count() == 2
+
+
+def test_flush_rollback(sqlite_database, lookups):
+
+    from sdssdb.observatory import platedb
+
+    uow = UnitOfWork(sqlite_database)
+    frames = add_exposures(uow, lookups, 1)
+
+    # A frame without camera violates the NOT NULL constraint.
+    frames[0].camera = None
+
+    with pytest.raises(Exception):
+        uow.flush()
+
+    assert platedb.Exposure.select().count() == 0
+    assert len(uow) == 3
+    assert frames[0].exposure.pk is None
+    assert frames[0].exposure.observation.pk is None
+
+    frames[0].camera = lookups[2]
+    assert uow.flush() == 3
+    assert platedb.CameraFrame.select().count() == 1
+
+
+def test_discard_on_error(sqlite_database, lookups):
+
+    from sdssdb.observatory import platedb
+
+    with pytest.raises(RuntimeError):
+        with UnitOfWork(sqlite_database) as uow:
+            add_exposures(uow, lookups, 1)
+            raise RuntimeError()
+
+    assert len(uow) == 0
+    assert platedb.Exposure.select().count() == 0
+
+
+class SequenceDatabase(PostgresqlDatabase):
+
+    def __init__(self, sequence):
+        super(SequenceDatabase, self).__init__('sdss5db')
+        self.sequence = sequence
+        self.queries = []
+
+    def execute_sql(self, sql, params=None, commit=None):
+
+        self.queries.append((sql, params))
+
+        cursor = sqlite3.connect(':memory:').cursor()
+        if 'pg_get_serial_sequence' in sql:
+            return cursor.execute('SELECT ?', (self.sequence, ))
+
+        return cursor.execute('SELECT 10 UNION SELECT 11 ORDER BY 1')
+
+
+@pytest.mark.parametrize('sequence', ['platedb.exposure_pk_seq', None])
+def test_reserve_pks(models, sequence):
+
+    from sdssdb.observatory import platedb
+
+    database = SequenceDatabase(sequence)
+    uow = UnitOfWork(database)
+
+    pks = uow._reserve_pks(platedb.Exposure, 2)
+
+    assert database.queries[0][1] == ('"platedb"."exposure"', 'pk')
+
+    if sequence is None:
+        assert pks is None
+        assert len(database.queries) == 1
+    else:
+        assert pks == [10, 11]
+        assert database.queries[1][1] == (sequence, 2)
+
+
+def test_reserve_pks_sqlite(sqlite_database):
+
+    from sdssdb.observatory import platedb
+
+    assert UnitOfWork(sqlite_database)._reserve_pks(platedb.Exposure, 2) is None